@@ -0,0 +1,44 @@
+"""Compare the fused order 1.5 Taylor step with the composition of the
+separate coefficient functions.
+
+Run from the repository root with ``python benchmarks/taylor_1_5_step.py``.
+
+"""
+
+import timeit
+import numpy as np
+import pysme.integrate as integrate
+import pysme.sde as sde
+import pysme.system_builder as sb
+
+def composed_step(integrator):
+    return sde.time_ind_taylor_1_5_step(
+            integrator.a_fn, integrator.b_fn, integrator.b_dx_b_fn,
+            integrator.b_dx_a_fn, integrator.a_dx_b_fn, integrator.a_dx_a_fn,
+            integrator.b_dx_b_dx_b_fn, integrator.b_b_dx_dx_b_fn,
+            integrator.b_b_dx_dx_a_fn)
+
+def time_steps(step, rho, n_steps=2000, repeat=5):
+    dt = 1e-4
+    def run():
+        X = rho
+        for n in range(n_steps):
+            X = step(X, n*dt, dt, 0.3, -0.7)
+    return min(timeit.repeat(run, number=1, repeat=repeat))/n_steps
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    row = '{:>4} {:>7} {:>14} {:>14} {:>8}'
+    print(row.format('d', 'sparse', 'composed (us)', 'fused (us)',
+                     'speedup'))
+    for d in [2, 4, 8, 16]:
+        for use_sparse in [False, True]:
+            c_op = np.diag(np.sqrt(np.arange(1, d)), 1).astype(np.complex128)
+            H = np.diag(np.arange(d)).astype(np.complex128)
+            integrator = integrate.Taylor_1_5_HomodyneIntegrator(
+                    c_op, 0.1, 0.2, H, use_sparse=use_sparse)
+            rho = sb.vectorize(np.eye(d)/d, integrator.basis).real
+            composed = time_steps(composed_step(integrator), rho)
+            fused = time_steps(integrator._step_rule(), rho)
+            print('{:>4} {:>7} {:>14.2f} {:>14.2f} {:>8.2f}'.format(
+                d, str(use_sparse), 1e6*composed, 1e6*fused, composed/fused))
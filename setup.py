@@ -1,8 +1,34 @@
-from setuptools import setup
+from setuptools import setup, Extension
+from setuptools.command.build_ext import build_ext
+import warnings
+
+class OptionalBuildExt(build_ext):
+    """Build the compiled kernels if possible, falling back to the pure
+    NumPy integrators if not."""
+    def run(self):
+        try:
+            build_ext.run(self)
+        except Exception as e:
+            warnings.warn('Skipping compiled kernels: {}'.format(e))
+
+    def build_extension(self, ext):
+        try:
+            build_ext.build_extension(self, ext)
+        except Exception as e:
+            warnings.warn('Skipping compiled kernels: {}'.format(e))
+
+try:
+    from Cython.Build import cythonize
+    ext_modules = cythonize([Extension('pysme._kernels',
+                                       ['src/pysme/_kernels.pyx'])])
+except Exception as e:
+    warnings.warn('Skipping compiled kernels: {}'.format(e))
+    ext_modules = []
 
 requires = [
         'Cython',
-        'numpy',
+        # SeedSequence and Philox (used by pysme.noise) arrived in 1.17
+        'numpy>=1.17',
         'scipy',
          ]
 
@@ -13,8 +39,10 @@ setup(name='pysme',
       # https://github.com/numpy/numpy/issues/2434#issuecomment-65252402
       # and
       # https://github.com/h5py/h5py/issues/535#issuecomment-79158166
-      setup_requires=['numpy', 'Cython'],
+      setup_requires=['numpy>=1.17', 'Cython'],
       packages=['pysme'],
       package_dir={'': 'src'},
       extras_require={'SMC': ['qinfer']},
+      ext_modules=ext_modules,
+      cmdclass={'build_ext': OptionalBuildExt},
      )
@@ -1,6 +1,9 @@
+from . import composite
 from . import gellmann
 from . import gramschmidt
 from . import grid_conv
 from . import integrate
+from . import noise
 from . import sde
+from . import structure
 from . import system_builder
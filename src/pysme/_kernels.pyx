@@ -0,0 +1,162 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+r"""Compiled time loops for homodyne integrators with precomputed matrices.
+
+  .. module:: _kernels.pyx
+     :synopsis: Compiled time loops for homodyne integrators
+  .. moduleauthor:: Jonathan Gross <jarthurgross@gmail.com>
+
+Each function runs the whole time loop of the corresponding scheme in
+``sde`` for the vectorized homodyne equation
+:math:`d\vec{\rho}=Q\vec{\rho}\,dt+((\vec{k}^T\vec{\rho})\vec{\rho}+
+G\vec{\rho})\,dW`, without returning to Python between steps. Matrices must be
+dense, C-contiguous, and of type ``float64``.
+
+"""
+
+import numpy as np
+from libc.math cimport sqrt
+from scipy.linalg.cython_blas cimport dgemv, ddot
+
+cdef void matvec(const double[:, ::1] A, const double[::1] x,
+                 double[::1] y) noexcept nogil:
+    """Compute y = A x (A is row-major, so it is A^T to Fortran BLAS)."""
+    cdef int n = A.shape[0]
+    cdef double one = 1.0, zero = 0.0
+    cdef int inc = 1
+    cdef char trans = b'T'
+    dgemv(&trans, &n, &n, &one, <double *> &A[0, 0], &n, <double *> &x[0],
+          &inc, &zero, &y[0], &inc)
+
+cdef double dot(const double[::1] x, double[::1] y) noexcept nogil:
+    cdef int n = x.shape[0]
+    cdef int inc = 1
+    return ddot(&n, <double *> &x[0], &inc, &y[0], &inc)
+
+def euler(const double[:, ::1] Q, const double[:, ::1] G,
+          const double[::1] k_T, const double[::1] rho_0,
+          const double[::1] ts, const double[::1] Us, int save_every=1):
+    """Euler time loop (see ``sde.euler``)."""
+    cdef Py_ssize_t D = rho_0.shape[0], n_steps = ts.shape[0] - 1
+    cdef Py_ssize_t i, mu
+    cdef double dt, dW, k_rho
+    out = np.empty((n_steps // save_every + 1, D))
+    cdef double[:, ::1] Xs = out
+    rho_arr = np.array(rho_0)
+    cdef double[::1] rho = rho_arr
+    cdef double[::1] Q_rho = np.empty(D), G_rho = np.empty(D)
+
+    Xs[0, :] = rho
+    with nogil:
+        for i in range(n_steps):
+            dt = ts[i + 1] - ts[i]
+            dW = sqrt(dt) * Us[i]
+            matvec(Q, rho, Q_rho)
+            matvec(G, rho, G_rho)
+            k_rho = dot(k_T, rho)
+            for mu in range(D):
+                rho[mu] = (rho[mu] + Q_rho[mu] * dt +
+                           (k_rho * rho[mu] + G_rho[mu]) * dW)
+            if (i + 1) % save_every == 0:
+                Xs[(i + 1) // save_every, :] = rho
+
+    return out
+
+def milstein(const double[:, ::1] Q, const double[:, ::1] G,
+             const double[::1] k_T, const double[:, ::1] G2,
+             const double[::1] k_T_G, const double[::1] rho_0,
+             const double[::1] ts, const double[::1] Us, int save_every=1):
+    """Milstein time loop (see ``sde.milstein``)."""
+    cdef Py_ssize_t D = rho_0.shape[0], n_steps = ts.shape[0] - 1
+    cdef Py_ssize_t i, mu
+    cdef double dt, dW, k_rho, k_G_rho
+    out = np.empty((n_steps // save_every + 1, D))
+    cdef double[:, ::1] Xs = out
+    rho_arr = np.array(rho_0)
+    cdef double[::1] rho = rho_arr
+    cdef double[::1] Q_rho = np.empty(D), G_rho = np.empty(D)
+    cdef double[::1] G2_rho = np.empty(D)
+
+    Xs[0, :] = rho
+    with nogil:
+        for i in range(n_steps):
+            dt = ts[i + 1] - ts[i]
+            dW = sqrt(dt) * Us[i]
+            matvec(Q, rho, Q_rho)
+            matvec(G, rho, G_rho)
+            matvec(G2, rho, G2_rho)
+            k_rho = dot(k_T, rho)
+            k_G_rho = dot(k_T_G, rho)
+            for mu in range(D):
+                rho[mu] = (rho[mu] + Q_rho[mu] * dt +
+                           (k_rho * rho[mu] + G_rho[mu]) * dW +
+                           ((k_G_rho + 2 * k_rho * k_rho) * rho[mu] +
+                            G2_rho[mu] + 2 * k_rho * G_rho[mu]) *
+                           (dW * dW - dt) / 2)
+            if (i + 1) % save_every == 0:
+                Xs[(i + 1) // save_every, :] = rho
+
+    return out
+
+def taylor_1_5(const double[:, ::1] Q, const double[:, ::1] G,
+               const double[::1] k_T, const double[:, ::1] G2,
+               const double[::1] k_T_G, const double[:, ::1] G3,
+               const double[::1] k_T_G2, const double[:, ::1] Q2,
+               const double[:, ::1] QG, const double[:, ::1] GQ,
+               const double[::1] k_T_Q, const double[::1] rho_0,
+               const double[::1] ts, const double[::1] U1s,
+               const double[::1] U2s, int save_every=1):
+    """Order 1.5 Taylor time loop (see ``sde.time_ind_taylor_1_5``)."""
+    cdef Py_ssize_t D = rho_0.shape[0], n_steps = ts.shape[0] - 1
+    cdef Py_ssize_t i, mu
+    cdef double dt, sqrtdt, dW, dZ, k_rho, k_G_rho, k_G2_rho, k_Q_rho
+    cdef double a, b, b_dx_b, b_dx_a, a_dx_b, b_dx_b_dx_b, b_b_dx_dx_b
+    cdef double sqrt3 = sqrt(3.)
+    out = np.empty((n_steps // save_every + 1, D))
+    cdef double[:, ::1] Xs = out
+    rho_arr = np.array(rho_0)
+    cdef double[::1] rho = rho_arr
+    cdef double[::1] Q_rho = np.empty(D), G_rho = np.empty(D)
+    cdef double[::1] G2_rho = np.empty(D), G3_rho = np.empty(D)
+    cdef double[::1] Q2_rho = np.empty(D), QG_rho = np.empty(D)
+    cdef double[::1] GQ_rho = np.empty(D)
+
+    Xs[0, :] = rho
+    with nogil:
+        for i in range(n_steps):
+            dt = ts[i + 1] - ts[i]
+            sqrtdt = sqrt(dt)
+            dW = U1s[i] * sqrtdt
+            dZ = (U1s[i] + U2s[i] / sqrt3) * sqrtdt * dt / 2
+            matvec(Q, rho, Q_rho)
+            matvec(G, rho, G_rho)
+            matvec(G2, rho, G2_rho)
+            matvec(G3, rho, G3_rho)
+            matvec(Q2, rho, Q2_rho)
+            matvec(QG, rho, QG_rho)
+            matvec(GQ, rho, GQ_rho)
+            k_rho = dot(k_T, rho)
+            k_G_rho = dot(k_T_G, rho)
+            k_G2_rho = dot(k_T_G2, rho)
+            k_Q_rho = dot(k_T_Q, rho)
+            for mu in range(D):
+                a = Q_rho[mu]
+                b = k_rho * rho[mu] + G_rho[mu]
+                b_dx_b = ((k_G_rho + 2 * k_rho * k_rho) * rho[mu] +
+                          G2_rho[mu] + 2 * k_rho * G_rho[mu])
+                b_dx_a = QG_rho[mu] + k_rho * Q_rho[mu]
+                a_dx_b = GQ_rho[mu] + k_rho * Q_rho[mu] + k_Q_rho * rho[mu]
+                b_dx_b_dx_b = (G3_rho[mu] + 3 * k_rho * G2_rho[mu] +
+                               3 * (k_G_rho + 2 * k_rho * k_rho) * G_rho[mu] +
+                               (k_G2_rho + 6 * k_rho * k_G_rho +
+                                6 * k_rho * k_rho * k_rho) * rho[mu])
+                b_b_dx_dx_b = (2 * (k_G_rho + k_rho * k_rho) *
+                               (G_rho[mu] + k_rho * rho[mu]))
+                rho[mu] = (rho[mu] + a * dt + b * dW +
+                           b_dx_b * (dW * dW - dt) / 2 + b_dx_a * dZ +
+                           (a_dx_b + b_b_dx_dx_b / 2) * (dW * dt - dZ) +
+                           Q2_rho[mu] * dt * dt / 2 +
+                           b_dx_b_dx_b * (dW * dW / 3 - dt) * dW / 2)
+            if (i + 1) % save_every == 0:
+                Xs[(i + 1) // save_every, :] = rho
+
+    return out
@@ -0,0 +1,347 @@
+"""Memoize expensive computations keyed by the contents of their arguments.
+
+  .. module:: cache.py
+     :synopsis: Memoize expensive computations keyed by the contents of their
+                arguments
+  .. moduleauthor:: Jonathan Gross <jarthurgross@gmail.com>
+
+"""
+
+import os
+import json
+import hashlib
+import inspect
+import tempfile
+import functools
+import numbers
+from collections import OrderedDict
+import numpy as np
+from scipy import sparse
+
+#: Version of the on-disk cache format. Increment whenever the meaning of
+#: cached results changes so that stale entries are ignored.
+CACHE_VERSION = 2
+
+def _update_hash(h, obj):
+    if isinstance(obj, np.ndarray):
+        arr = np.ascontiguousarray(obj)
+        h.update('ndarray{}{}'.format(arr.dtype.str, arr.shape).encode())
+        h.update(arr.tobytes())
+    elif sparse.issparse(obj):
+        csr = obj.tocsr()
+        csr.sort_indices()
+        h.update('sparse{}'.format(csr.shape).encode())
+        for arr in (csr.data, csr.indices, csr.indptr):
+            _update_hash(h, arr)
+    elif isinstance(obj, (list, tuple)):
+        h.update('{}{}'.format(type(obj).__name__, len(obj)).encode())
+        for item in obj:
+            _update_hash(h, item)
+    elif isinstance(obj, dict):
+        h.update('dict{}'.format(len(obj)).encode())
+        for key in sorted(obj):
+            _update_hash(h, key)
+            _update_hash(h, obj[key])
+    elif obj is None or isinstance(obj, (bool, int, float, complex, str,
+                                         np.number)):
+        h.update('{}{!r}'.format(type(obj).__name__, obj).encode())
+    else:
+        raise TypeError('Cannot hash argument of type {}'.format(type(obj)))
+
+def content_key(*args, **kwargs):
+    """Return a hex digest identifying the contents of the arguments.
+
+    Arrays are identified by their dtype, shape, and bytes, so equal operators
+    give the same key regardless of identity.
+
+    """
+    h = hashlib.sha256()
+    _update_hash(h, args)
+    _update_hash(h, kwargs)
+    return h.hexdigest()
+
+def _root(array):
+    # Identify the buffer an array (or a view of one) ultimately refers to.
+    while isinstance(array, np.ndarray) and array.base is not None:
+        array = array.base
+    return id(array)
+
+def _sparse_parts(value):
+    return [getattr(value, attr) for attr in
+            ('data', 'indices', 'indptr', 'row', 'col', 'offsets')
+            if isinstance(getattr(value, attr, None), np.ndarray)]
+
+def _roots(value, roots=None):
+    """Return the buffers of all the arrays in `value`."""
+    if roots is None:
+        roots = set()
+    if isinstance(value, np.ndarray):
+        roots.add(_root(value))
+    elif sparse.issparse(value):
+        for part in _sparse_parts(value):
+            roots.add(_root(part))
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _roots(item, roots)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _roots(item, roots)
+    return roots
+
+def _freeze(value, shared=frozenset()):
+    """Mark arrays in a cached value read-only so callers can't corrupt the
+    cache by modifying them in place.
+
+    Arrays sharing a buffer in `shared` (e.g. arguments the caller still
+    owns) are copied first; all others are frozen without copying.
+
+    """
+    if isinstance(value, np.ndarray):
+        if _root(value) in shared:
+            value = value.copy()
+        value.flags.writeable = False
+    elif sparse.issparse(value):
+        if any(_root(part) in shared for part in _sparse_parts(value)):
+            value = value.copy()
+        # Put the matrix in canonical form first, since scipy would otherwise
+        # sort the indices in place the first time it needs them sorted.
+        if hasattr(value, 'sum_duplicates'):
+            value.sum_duplicates()
+        for part in _sparse_parts(value):
+            part.flags.writeable = False
+    elif isinstance(value, (list, tuple)):
+        value = type(value)(_freeze(item, shared) for item in value)
+    elif isinstance(value, dict):
+        value = {key: _freeze(item, shared) for key, item in value.items()}
+    return value
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if sparse.issparse(value):
+        return sum(part.nbytes for part in _sparse_parts(value))
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(item) for item in value.values())
+    return 0
+
+def atomic_write(path, write):
+    """Write a file so that other processes never see it partially written.
+
+    Calls ``write(f)`` on a temporary file in the same directory as `path`
+    and then moves it into place, removing the temporary file if writing
+    fails.
+
+    Parameters
+    ----------
+    path : str
+        The final location of the file
+    write : callable(f)
+        Writes the contents to the binary file object `f`
+
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def _encode(value, arrays):
+    # Describe `value` as JSON, moving its arrays into `arrays` so they can be
+    # stored with numpy.savez and loaded without pickle.
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            raise TypeError('Cannot store arrays of objects')
+        arrays['a{}'.format(len(arrays))] = value
+        return {'array': 'a{}'.format(len(arrays) - 1)}
+    if sparse.issparse(value):
+        csr = value.tocsr()
+        return {'sparse': value.format, 'shape': list(csr.shape),
+                'parts': [_encode(part, arrays)
+                          for part in (csr.data, csr.indices, csr.indptr)]}
+    if isinstance(value, (list, tuple)):
+        return {type(value).__name__: [_encode(item, arrays)
+                                       for item in value]}
+    if isinstance(value, dict):
+        return {'dict': [[_encode(key, arrays), _encode(item, arrays)]
+                         for key, item in value.items()]}
+    if isinstance(value, (complex, np.complexfloating)):
+        return {'complex': [value.real, value.imag]}
+    if isinstance(value, np.generic):
+        return _encode(np.asarray(value), arrays)
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return {'scalar': value}
+    raise TypeError('Cannot store value of type {}'.format(type(value)))
+
+def _decode(desc, arrays):
+    if 'array' in desc:
+        array = arrays[desc['array']]
+        return array[()] if array.ndim == 0 else array
+    if 'sparse' in desc:
+        data, indices, indptr = [_decode(part, arrays)
+                                 for part in desc['parts']]
+        csr = sparse.csr_matrix((data, indices, indptr),
+                                shape=tuple(desc['shape']))
+        return csr.asformat(desc['sparse'])
+    if 'list' in desc:
+        return [_decode(item, arrays) for item in desc['list']]
+    if 'tuple' in desc:
+        return tuple(_decode(item, arrays) for item in desc['tuple'])
+    if 'dict' in desc:
+        return {_decode(key, arrays): _decode(item, arrays)
+                for key, item in desc['dict']}
+    if 'complex' in desc:
+        return complex(*desc['complex'])
+    return desc['scalar']
+
+def save_value(f, value):
+    """Store a cached value (nested lists, tuples, and dicts of arrays,
+    sparse matrices, and scalars) in ``.npz`` format."""
+    arrays = {}
+    desc = _encode(value, arrays)
+    np.savez(f, _desc=np.array(json.dumps(desc)), **arrays)
+
+def load_value(f):
+    """Load a value stored by ``save_value``, never unpickling anything."""
+    with np.load(f, allow_pickle=False) as stored:
+        arrays = {name: stored[name] for name in stored.files}
+    return _decode(json.loads(str(arrays.pop('_desc'))), arrays)
+
+class LRUCache:
+    r"""Least-recently-used cache with an optional on-disk tier.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of entries kept in memory (0 disables the memory
+        tier).
+    cache_dir : str, optional
+        Directory in which to also store entries, so that separate processes
+        can share results.
+    max_bytes : int, optional
+        Maximum total size of the arrays kept in memory (unbounded if
+        ``None``). Entries larger than this on their own aren't kept.
+
+    """
+    def __init__(self, maxsize=32, cache_dir=None, max_bytes=None):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._nbytes = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """Return hit/miss statistics.
+
+        Returns
+        -------
+        dict
+            Counts of memory hits, disk hits, misses, and evictions, along with
+            the current and maximum number of entries and bytes in memory.
+
+        """
+        return {'hits': self.hits, 'disk_hits': self.disk_hits,
+                'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._entries), 'maxsize': self.maxsize,
+                'nbytes': sum(self._nbytes.values()),
+                'max_bytes': self.max_bytes}
+
+    def clear(self):
+        """Remove all entries from memory (the disk tier is left alone)."""
+        self._entries.clear()
+        self._nbytes.clear()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir,
+                            'pysme_v{}_{}.npz'.format(CACHE_VERSION, key))
+
+    def get(self, key):
+        """Return ``(True, value)`` if `key` is cached, else ``(False,
+        None)``."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, self._entries[key]
+        if self.cache_dir is not None and os.path.exists(self._path(key)):
+            value = _freeze(load_value(self._path(key)))
+            self.disk_hits += 1
+            self._store(key, value)
+            return True, value
+        self.misses += 1
+        return False, None
+
+    def put(self, key, value, owned=()):
+        """Cache `value` under `key` and return the cached (read-only) value.
+
+        Arrays in `value` are frozen in place, except for those sharing memory
+        with anything in `owned` (e.g. the arguments of a memoized function,
+        which the caller still owns), which are copied first.
+
+        """
+        value = _freeze(value, _roots(owned))
+        self._store(key, value)
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            atomic_write(self._path(key), lambda f: save_value(f, value))
+        return value
+
+    def _store(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._nbytes[key] = _nbytes(value)
+        while self._entries and (len(self._entries) > self.maxsize or
+                                 (self.max_bytes is not None and
+                                  sum(self._nbytes.values()) >
+                                  self.max_bytes)):
+            old_key, _ = self._entries.popitem(last=False)
+            del self._nbytes[old_key]
+            self.evictions += 1
+
+def _key_scalar(value):
+    # Numbers that compare equal give the same key (e.g. 0, 0.0, and 0j).
+    if isinstance(value, numbers.Number) and not isinstance(value, bool):
+        value = complex(value)
+        return value.real if value.imag == 0 else value
+    return value
+
+def memoize(cache):
+    """Decorator caching a function's results in `cache`.
+
+    Results are keyed by the function name and the contents of the
+    arguments, bound to the function's parameters (with defaults filled in)
+    so that passing an argument by position or by keyword, or as an integer
+    or an equal float, gives the same key. Cached arrays are returned
+    read-only and shared between callers; copy them before modifying them in
+    place.
+
+    """
+    def decorator(fn):
+        name = '{}.{}'.format(fn.__module__, fn.__qualname__)
+        signature = inspect.signature(fn)
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = content_key(name, {param: _key_scalar(value) for param, value
+                                     in bound.arguments.items()})
+            found, value = cache.get(key)
+            if not found:
+                value = cache.put(key, fn(*args, **kwargs),
+                                  owned=(args, kwargs))
+            return value
+        return wrapper
+    return decorator
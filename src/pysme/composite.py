@@ -0,0 +1,236 @@
+"""Build superoperators for composite systems in a product basis.
+
+  .. module:: composite.py
+     :synopsis: Build superoperators for composite systems in a product basis
+  .. moduleauthor:: Jonathan Gross <jarthurgross@gmail.com>
+
+Operators on a composite system are specified in product form, as a list of
+terms, each term being a sequence of operators on the individual subsystems
+(``None`` standing for the identity). For example, the coupling
+:math:`\sigma_-\otimes I+I\otimes a` on a qubit and a cavity is written
+``[(sigma_minus, None), (None, a)]``.
+
+The superoperators are represented in the product of the generalized Gell-Mann
+bases of the subsystems. Multiplication by a product operator is a Kronecker
+product of multiplications on the subsystems, so everything is assembled from
+the structure constants of the subsystem bases without ever computing the
+structure constants of the full basis.
+
+"""
+
+from functools import reduce
+import numpy as np
+from scipy import sparse
+import pysme.gellmann as gm
+import pysme.structure as structure
+import pysme.system_builder as sb
+
+def product_basis(dims):
+    r"""Return the product of generalized Gell-Mann bases.
+
+    The element :math:`\Lambda^{a_1}\otimes\Lambda^{a_2}\otimes\cdots` has
+    index :math:`(\cdots(a_1d_2^2+a_2)d_3^2+\cdots)`, so the identity is in the
+    last place and all other elements are traceless.
+
+    Parameters
+    ----------
+    dims : list of int
+        The dimensions of the subsystems
+
+    Returns
+    -------
+    numpy.array, shape=(prod(dims)**2, prod(dims), prod(dims))
+        The basis
+
+    """
+    def kron_bases(A, B):
+        return np.einsum('aij,bkl->abikjl', A, B).reshape(
+                A.shape[0]*B.shape[0], A.shape[1]*B.shape[1],
+                A.shape[2]*B.shape[2])
+    return reduce(kron_bases, [gm.get_basis_array(d) for d in dims])
+
+def product_op(terms, dims):
+    r"""Return the full matrix of an operator given in product form.
+
+    Parameters
+    ----------
+    terms : list of tuple of numpy.array
+        The operator in product form
+    dims : list of int
+        The dimensions of the subsystems
+
+    Returns
+    -------
+    numpy.array
+        The operator acting on the composite Hilbert space
+
+    """
+    return sum([reduce(np.kron, [np.eye(d) if op is None else op
+                                 for op, d in zip(term, dims)])
+                for term in terms])
+
+def _dagger(terms):
+    return [tuple(None if op is None else op.conj().T for op in term)
+            for term in terms]
+
+def _scale(terms, scalar, dims):
+    return [(scalar * (np.eye(dims[0]) if term[0] is None else term[0]),) +
+            tuple(term[1:]) for term in terms]
+
+def _factor_reps(op, d, use_sparse):
+    if op is None:
+        Id = sparse.identity(d**2, format='csr') if use_sparse else np.eye(d**2)
+        unit = np.zeros(d**2)
+        unit[-1] = 1
+        return unit, Id, Id
+    vec = sb.vectorize(op, gm.get_basis_array(d))
+    S = structure.gellmann_struct_consts(d)
+    return (vec, sb.left_mult_rep(vec, S, use_sparse),
+            sb.right_mult_rep(vec, S, use_sparse))
+
+def _kron(A, B, use_sparse):
+    return sparse.kron(A, B, format='csr') if use_sparse else np.kron(A, B)
+
+def _term_reps(terms, dims, use_sparse):
+    """Return, for each term, lists of the subsystem vectors and left and
+    right multiplication matrices."""
+    reps = []
+    for term in terms:
+        factors = [_factor_reps(op, d, use_sparse)
+                   for op, d in zip(term, dims)]
+        reps.append(tuple([factor[n] for factor in factors]
+                          for n in range(3)))
+    return reps
+
+def _kron_sum(factor_lists, use_sparse):
+    return sum([reduce(lambda A, B: _kron(A, B, use_sparse), factors)
+                for factors in factor_lists])
+
+def _kron_prod_sum(left_lists, right_lists, use_sparse):
+    r"""Return :math:`\left(\sum_s\bigotimes_iX_{si}\right)
+    \left(\sum_t\bigotimes_iY_{ti}\right)`, multiplying within each subsystem
+    rather than in the full space."""
+    return _kron_sum([[X.dot(Y) for X, Y in zip(lefts, rights)]
+                      for lefts in left_lists for rights in right_lists],
+                     use_sparse)
+
+def product_op_reps(terms, dims, use_sparse=False):
+    r"""Vectorize a product-form operator and build its multiplication
+    matrices.
+
+    Parameters
+    ----------
+    terms : list of tuple of numpy.array
+        The operator :math:`A` in product form
+    dims : list of int
+        The dimensions of the subsystems
+    use_sparse : bool, optional
+        Whether to return the matrices as ``scipy.sparse.csr_matrix``.
+
+    Returns
+    -------
+    tuple
+        The components :math:`\vec{A}` in the product basis and the matrices
+        :math:`L_A` and :math:`R_A` representing left and right multiplication
+        by :math:`A` (see ``system_builder.left_mult_rep``).
+
+    """
+    reps = _term_reps(terms, dims, use_sparse)
+    return (reduce(np.add, [reduce(np.kron, rep[0]) for rep in reps]),
+            _kron_sum([rep[1] for rep in reps], use_sparse),
+            _kron_sum([rep[2] for rep in reps], use_sparse))
+
+def construct_product_Q(c_terms, M_sq, N, H_terms, dims, use_sparse=False):
+    r"""Construct the drift matrix for a composite system.
+
+    Gives the same matrix as ``system_builder.construct_Q`` would for the full
+    operators in the basis returned by ``product_basis(dims)``. Products of
+    multiplication matrices are formed subsystem by subsystem, so the cost
+    grows with the squared number of terms rather than with the cube of the
+    full dimension.
+
+    Parameters
+    ----------
+    c_terms : list of tuple of numpy.array
+        The coupling operator in product form
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H_terms : list of tuple of numpy.array
+        The plant Hamiltonian in product form
+    dims : list of int
+        The dimensions of the subsystems
+    use_sparse : bool, optional
+        Whether to return a ``scipy.sparse.csr_matrix``.
+
+    Returns
+    -------
+    numpy.array
+        The matrix :math:`Q`
+
+    """
+    c_reps = _term_reps(c_terms, dims, use_sparse)
+    c_dag_reps = _term_reps(_dagger(c_terms), dims, use_sparse)
+    L_c = [rep[1] for rep in c_reps]
+    R_c = [rep[2] for rep in c_reps]
+    L_c_dag = [rep[1] for rep in c_dag_reps]
+    R_c_dag = [rep[2] for rep in c_dag_reps]
+    prod = lambda X, Y: _kron_prod_sum(X, Y, use_sparse)
+
+    D_c = (prod(L_c, R_c_dag) - 0.5 * prod(L_c_dag, L_c) -
+           0.5 * prod(R_c, R_c_dag))
+    D_c_dag = (prod(L_c_dag, R_c) - 0.5 * prod(L_c, L_c_dag) -
+               0.5 * prod(R_c_dag, R_c))
+    # Same form as system_builder.struct_double_comm_op with u = sqrt(M^*) c
+    E = 1.5 * (np.conj(M_sq) * (prod(L_c, L_c) - prod(L_c, R_c)) +
+               M_sq * (prod(L_c_dag, L_c_dag) - prod(L_c_dag, R_c_dag)))
+    # Only the Hermitian part of H contributes, as in hamiltonian_op.
+    _, L_H, R_H = product_op_reps(H_terms, dims, use_sparse)
+    _, L_H_dag, R_H_dag = product_op_reps(_dagger(H_terms), dims, use_sparse)
+    F = -0.5j * (L_H + L_H_dag - R_H - R_H_dag)
+
+    Q = ((N + 1) * D_c + N * D_c_dag + E + F).real
+    if use_sparse:
+        Q.eliminate_zeros()
+
+    return Q
+
+def construct_product_G_k_T(c_terms, M_sq, N, dims, use_sparse=False):
+    r"""Construct the diffusion matrix and vector for a composite system.
+
+    Gives the same pair as ``system_builder.construct_G_k_T`` would for the
+    full operators in the basis returned by ``product_basis(dims)`` (see
+    ``construct_product_Q``).
+
+    """
+    c_eff_terms = (_scale(c_terms, N + np.conj(M_sq) + 1, dims) +
+                   _scale(_dagger(c_terms), -(N + M_sq), dims))
+    C_vector, L_c, _ = product_op_reps(c_eff_terms, dims, use_sparse)
+    G = 2 * L_c.real
+    if use_sparse:
+        G.eliminate_zeros()
+    norms_sq = reduce(np.kron, [np.append(np.full(d**2 - 1, 2.), d)
+                                for d in dims])
+    k_T = -2.0 * C_vector.real * norms_sq
+
+    return G, k_T
+
+def integrator_kwargs(c_terms, M_sq, N, H_terms, dims, use_sparse=False):
+    r"""Return keyword arguments for constructing an integrator for a
+    composite system.
+
+    Returns
+    -------
+    dict
+        Arguments for the constructor of any integrator in ``integrate``,
+        including the product basis and precomputed superoperators.
+
+    """
+    G, k_T = construct_product_G_k_T(c_terms, M_sq, N, dims, use_sparse)
+    return {'c_op': product_op(c_terms, dims), 'M_sq': M_sq, 'N': N,
+            'H': product_op(H_terms, dims), 'basis': product_basis(dims),
+            'drift_rep': construct_product_Q(c_terms, M_sq, N, H_terms, dims,
+                                             use_sparse),
+            'diffusion_reps': {'G': G, 'k_T': k_T},
+            'use_sparse': use_sparse}
@@ -6,7 +6,10 @@
 
 """
 import numpy as np
-from itertools import product
+from scipy import sparse
+
+_basis_cache = {}
+_entry_mat_cache = {}
 
 def gellmann(j, k, d):
     r"""Returns a generalized Gell-Mann matrix of dimension d.
@@ -50,6 +53,51 @@ def gellmann(j, k, d):
 
     return gjkd
 
+def get_basis_entries(d):
+    r"""Return the nonzero matrix entries of the generalized Gell-Mann basis.
+
+    The basis is ordered as in ``get_basis``, so the element
+    :math:`\Lambda^{jk}` has index :math:`d(j-1)+(k-1)`. Each off-diagonal
+    element has two entries, the diagonal element :math:`\Lambda^j` has
+    :math:`j+1`, and the identity has :math:`d`, for :math:`O(d^2)` entries
+    in total.
+
+    Parameters
+    ----------
+    d : int
+        The dimension of the Hilbert space.
+
+    Returns
+    -------
+    tuple of numpy.array
+        Arrays ``(elements, rows, cols, vals)`` such that basis element
+        ``elements[n]`` has the entry ``vals[n]`` at ``(rows[n], cols[n])``.
+
+    """
+    a, b = np.nonzero(~np.eye(d, dtype=bool))
+    # Off-diagonal elements: symmetric for a > b, antisymmetric for a < b.
+    off_els = np.concatenate([a * d + b, a * d + b])
+    off_rows = np.concatenate([a, b])
+    off_cols = np.concatenate([b, a])
+    off_vals = np.concatenate([np.where(a > b, 1. + 0.j, -1.j),
+                               np.where(a > b, 1. + 0.j, 1.j)])
+
+    # Diagonal element j (1-based, j < d) has sqrt(2/(j(j+1))) on the first j
+    # diagonal entries and -j*sqrt(2/(j(j+1))) on entry j+1.
+    js, ls = np.nonzero(np.tri(d - 1, d, k=1, dtype=bool))
+    js = js + 1
+    diag_vals = np.sqrt(2 / (js * (js + 1))) * np.where(ls < js, 1, -js)
+    diag_els = (js - 1) * (d + 1)
+
+    id_rows = np.arange(d)
+
+    return (np.concatenate([off_els, diag_els,
+                            np.full(d, d**2 - 1)]).astype(np.intp),
+            np.concatenate([off_rows, ls, id_rows]).astype(np.intp),
+            np.concatenate([off_cols, ls, id_rows]).astype(np.intp),
+            np.concatenate([off_vals, diag_vals.astype(np.complex128),
+                            np.ones(d, dtype=np.complex128)]))
+
 def get_basis(d):
     r"""Return a basis of operators.
     
@@ -67,4 +115,99 @@ def get_basis(d):
         The basis of operators.
 
     """
-    return [gellmann(j, k, d) for j, k in product(range(1, d + 1), repeat=2)]
+    return list(np.array(get_basis_array(d)))
+
+def get_basis_array(d):
+    r"""Return the basis of ``get_basis`` as a single array.
+
+    The array is built once per dimension and shared, so it is read-only.
+    Passing it as the basis to ``system_builder.vectorize_stack`` and
+    ``system_builder.dualize_stack`` lets them use the sparse entries of the
+    basis.
+
+    Parameters
+    ----------
+    d : int
+        The dimension of the Hilbert space.
+
+    Returns
+    -------
+    numpy.array, shape=(d**2, d, d)
+        The basis of operators.
+
+    """
+    if d not in _basis_cache:
+        els, rows, cols, vals = get_basis_entries(d)
+        basis = np.zeros((d**2, d, d), dtype=np.complex128)
+        basis[els, rows, cols] = vals
+        basis.flags.writeable = False
+        _basis_cache[d] = basis
+    return _basis_cache[d]
+
+def is_basis(basis):
+    """Return whether `basis` is the (shared) array returned by
+    ``get_basis_array``."""
+    return (isinstance(basis, np.ndarray) and basis.ndim == 3 and
+            _basis_cache.get(basis.shape[-1]) is basis)
+
+def _entry_matrix(d):
+    """Return the sparse matrix with the basis elements flattened into its
+    rows."""
+    if d not in _entry_mat_cache:
+        els, rows, cols, vals = get_basis_entries(d)
+        _entry_mat_cache[d] = sparse.csr_matrix((vals, (els, rows * d + cols)),
+                                                shape=(d**2, d**2))
+    return _entry_mat_cache[d]
+
+def _norms_sq(d):
+    norms_sq = np.full(d**2, 2.)
+    norms_sq[-1] = d
+    return norms_sq
+
+def vectorize_stack(operators):
+    r"""Vectorize a stack of operators in the generalized Gell-Mann basis.
+
+    Gives the same result as ``system_builder.vectorize_stack(operators,
+    get_basis_array(d))`` using the sparse entries of the basis, so it takes
+    :math:`O(d^2)` operations per operator rather than :math:`O(d^4)`.
+
+    Parameters
+    ----------
+    operators : numpy.array, shape=(..., d, d)
+        The operators to vectorize
+
+    Returns
+    -------
+    numpy.array, shape=(..., d**2)
+        The vector components of each operator
+
+    """
+    operators = np.asarray(operators)
+    d = operators.shape[-1]
+    flat_ops = operators.reshape(-1, d**2)
+    vecs = _entry_matrix(d).conj().dot(flat_ops.T).T / _norms_sq(d)
+    return vecs.reshape(operators.shape[:-2] + (d**2,))
+
+def dualize_stack(operators):
+    r"""Take a stack of operators to their dual vectorized forms in the
+    generalized Gell-Mann basis.
+
+    Sparse counterpart of ``system_builder.dualize_stack`` (see
+    ``vectorize_stack``).
+
+    Parameters
+    ----------
+    operators : numpy.array, shape=(..., d, d)
+        The operators to dualize
+
+    Returns
+    -------
+    numpy.array, shape=(..., d**2)
+        The dual vector components of each operator
+
+    """
+    operators = np.asarray(operators)
+    d = operators.shape[-1]
+    flat_ops = operators.reshape(-1, d**2)
+    duals = _entry_matrix(d).dot(flat_ops.conj().T).T
+    return duals.reshape(operators.shape[:-2] + (d**2,))
@@ -6,77 +6,88 @@
 
 """
 import numpy as np
-from itertools import product
 import pysme.gellmann as gm
 
-def orthonormalize(A):
-    """Return an orthonormal basis in which `A` has a sparse representation.
+def orthonormalize(A, return_transform=False, identity_last=False):
+    r"""Return an orthonormal basis in which `A` has a sparse representation.
     
     `A` will have support only on the first three elements. The first element
     is guaranteed to be proportional to the identity. This basis is
     constructed using Gram-Schmidt orthogonalization.
 
+    Several operators :math:`A_1,\ldots,A_m` (e.g. the coupling operator and
+    the Hamiltonian) can be passed at once, in which case all of them have
+    support only on the first :math:`2m+1` elements. The remaining elements
+    are generally dense combinations of Gell-Mann matrices, so compare the
+    sparsity of the superoperators in this basis against the Gell-Mann basis
+    before relying on it for sparse integration.
+
     Parameters
     ----------
     A : numpy.array
-        The operator to be represented sparsely.
+        The operator to be represented sparsely, or a sequence of operators
+    return_transform : bool, optional
+        Whether to also return the orthogonal matrix relating the new basis to
+        the normalized generalized Gell-Mann basis.
+    identity_last : bool, optional
+        Whether to put the element proportional to the identity last instead
+        of first, as the integrators expect.
 
     Returns
     -------
     list of numpy.array
-        A basis in which `A` is represented sparsely.
+        The :math:`d^2` operators of a basis in which `A` is represented
+        sparsely.
+    numpy.array, shape=(d**2, d**2)
+        The orthogonal matrix :math:`T` such that the new basis elements are
+        :math:`\sum_bT_{ab}\Lambda^b/\|\Lambda^b\|` (only returned if
+        `return_transform` is ``True``).
 
     """
 
-    d = max(A.shape) # Code won't currently work unless A is square.
-    G = [ [ gm.gellmann(j, k, d) for k in range(1, d + 1) ] for j in
-        range(1, d + 1) ]
-    ordering = list(product(range(1, d + 1), range(1, d + 1)))
-    hermitian = (A + A.conj().T)/2
-    antiherm = (A - A.conj().T)/2.j
-    hermitian_comps = [np.trace(np.dot(hermitian, G[j - 1][k - 1]))/np.sqrt(2)
-                       if j != d or k!= d else
-                       np.trace(np.dot(hermitian, G[j - 1][k - 1]))/np.sqrt(d)
-                       for j, k in ordering]
-    antiherm_comps = [np.trace(np.dot(antiherm, G[j - 1][k - 1]))/np.sqrt(2)
-                      if j != d or k!= d else
-                      np.trace(np.dot(antiherm, G[j - 1][k - 1]))/np.sqrt(d)
-                      for j, k in ordering]
-
-    # Identify the Gell-Mann matrices that have the most support on the
-    # Hermitian and anti-Hermitian parts of A (other than identity) so that they
-    # can be discarded prior to Gram-Schmidt orthogonalization.
-    max_comps = [max(abs(herm_comp), abs(anti_comp)) if j != d or k != d else 0
-                 for herm_comp, anti_comp, (j, k)
-                 in zip(hermitian_comps, antiherm_comps, ordering)]
-
-    # Ensure the identity is the first element in this list.
-    ordered_max_comps = [list(enumerate(max_comps))[-1]] + \
-        sorted(list(enumerate(max_comps))[0:-1], key=lambda elem: elem[1])
-
-    discarded_indices = [ordered_max_comps[-1][0], ordered_max_comps[-2][0]]
+    G_new, transform = _orthonormal_stack(A, identity_last)
+    if return_transform:
+        return list(G_new), transform
+    return list(G_new)
 
-    other_vectors = [ [ 0 if n != idx else 1 for n in range(d**2) ] for idx in
-        range(d**2) if not idx in discarded_indices ]
+def _orthonormal_stack(A, identity_last=False):
+    r"""Compute the basis of `orthonormalize` as a single stacked array.
 
-    vector_set = np.array([other_vectors[-1], hermitian_comps, antiherm_comps] +
-                          other_vectors[0:-1]).T.real
+    Returns
+    -------
+    numpy.array, shape=(d**2, d, d)
+        The new basis elements.
+    numpy.array, shape=(d**2, d**2)
+        The transformation from the normalized Gell-Mann basis.
 
-    basis, R = np.linalg.qr(vector_set)
-    basis = np.dot(basis, np.diag([1 if elem >= 0 else -1
-                                   for elem in np.diag(R)]))
-    basis = basis.T
+    """
+    ops = np.asarray(A)
+    if ops.ndim == 2:
+        ops = ops[np.newaxis]
+    d = ops.shape[-1] # Code won't currently work unless A is square.
+    dim = d**2
+    norms = np.sqrt(np.append(np.full(dim - 1, 2.), d))
+    parts = np.stack([(ops + ops.conj().swapaxes(-1, -2))/2,
+                      (ops - ops.conj().swapaxes(-1, -2))/2.j],
+                     axis=1).reshape(-1, d, d)
+    # Components of the Hermitian and anti-Hermitian parts of each operator
+    # in the normalized Gell-Mann basis.
+    comps = gm.dualize_stack(parts).real / norms
 
-    G_new = [sum([G[j-1][k-1]*coeff/np.sqrt(2) if j != d or k!= d
-                  else G[j-1][k-1]*coeff/np.sqrt(d) for coeff, (j, k)
-                  in zip(vect, ordering)]) for vect in basis]
+    # Identify the Gell-Mann matrices that have the most support on the
+    # Hermitian and anti-Hermitian parts of A (other than identity) so that they
+    # can be discarded prior to Gram-Schmidt orthogonalization.
+    max_comps = np.max(np.abs(comps[:,:-1]), axis=0)
+    discarded = np.argsort(max_comps, kind='stable')[::-1][:len(comps)]
+    kept = np.setdiff1d(np.arange(dim - 1), discarded)
 
-    A_coeffs = [
-        np.trace(np.dot(G_new[0], A)),
-        np.trace(np.dot(G_new[1], A)),
-        np.trace(np.dot(G_new[2], A)),
-        ]
+    vector_set = np.hstack([np.eye(dim)[:,[-1]], comps.T,
+                            np.eye(dim)[:,kept]])
 
-    A_recon = A_coeffs[0]*G_new[0] + A_coeffs[1]*G_new[1] + A_coeffs[2]*G_new[2]
+    Q, R = np.linalg.qr(vector_set)
+    transform = (Q * np.where(np.diag(R) >= 0, 1, -1)).T
+    if identity_last:
+        transform = np.roll(transform, -1, axis=0)
 
-    return G_new
+    G_normed = gm.get_basis_array(d) / norms[:,np.newaxis,np.newaxis]
+    return np.tensordot(transform, G_normed, axes=1), transform
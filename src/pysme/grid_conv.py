@@ -53,21 +53,52 @@ def double_increments(times, U1s, U2s=None):
     """
 
     new_times = times[::2]
+    if U2s is None:
+        return new_times, double_normals(U1s)
+    else:
+        return (new_times,) + double_normals(U1s, U2s)
+
+def double_normals(U1s, U2s=None):
+    r"""Combine the standard-normal random variables of consecutive pairs of
+    time intervals into those of the doubled intervals.
+
+    Applies the transformation of ``double_increments`` without reference to
+    the times, so it can be used on any even-length block of increments (e.g.
+    chunks of a stream from ``noise.NoiseSource``).
+
+    Parameters
+    ----------
+    U1s : numpy.array
+        Samples used to construct Wiener increments :math:`\Delta W` for an
+        even number of time intervals.
+    U2s : numpy.array, optional
+        Samples used to construct multiple-Ito increments :math:`\Delta Z` for
+        the same time intervals.
+
+    Returns
+    -------
+    U1s : numpy.array
+        Samples for the doubled intervals.
+    U2s : numpy.array, optional
+        Samples for the doubled intervals (not returned if `U2s` is ``None``).
+
+    """
     even_U1s = U1s[::2]
     odd_U1s = U1s[1::2]
     new_U1s = (even_U1s + odd_U1s)/np.sqrt(2)
 
     if U2s is None:
-        return new_times, new_U1s
+        return new_U1s
     else:
         even_U2s = U2s[::2]
         odd_U2s = U2s[1::2]
         new_U2s = (np.sqrt(3)*(even_U1s - odd_U1s) +
                    even_U2s + odd_U2s)/(2*np.sqrt(2))
-        return new_times, new_U1s, new_U2s
+        return new_U1s, new_U2s
 
-def calc_rate(integrator, rho_0, times, U1s=None, U2s=None):
-    """Calculate the convergence rate for some integrator.
+def calc_rate(integrator, rho_0, times, U1s=None, U2s=None,
+              noise_source=None, trajectory=0):
+    r"""Calculate the convergence rate for some integrator.
 
     Parameters
     ----------
@@ -81,11 +112,17 @@ def calc_rate(integrator, rho_0, times, U1s=None, U2s=None):
     U1s : numpy.array(len(times) - 1), optional
         Samples from a standard-normal distribution used to construct Wiener
         increments :math:`\Delta W` for each time interval. If not provided
-        will be generated by the function.
+        will be drawn from `noise_source`.
     U2s : numpy.array(len(times) - 1), optional
         Samples from a standard-normal distribution used to construct
         multiple-Ito increments :math:`\Delta Z` for each time interval. If not
-        provided will be generated by the function.
+        provided will be drawn from `noise_source`.
+    noise_source : noise.NoiseSource, optional
+        Source of any increments not provided. If not given, one is seeded
+        from the global ``numpy.random`` state, so ``numpy.random.seed``
+        still makes the result reproducible.
+    trajectory : int, optional
+        Index of the trajectory of `noise_source` to draw the increments from
 
     Returns
     -------
@@ -94,10 +131,14 @@ def calc_rate(integrator, rho_0, times, U1s=None, U2s=None):
 
     """
     increments = len(times) - 1
+    if noise_source is None and (U1s is None or U2s is None):
+        # Imported here since noise depends on this module.
+        from pysme.noise import NoiseSource
+        noise_source = NoiseSource(np.random.randint(2**32))
     if U1s is None:
-        U1s = np.random.randn(increments)
+        U1s = noise_source.U1s(trajectory, increments)
     if U2s is None:
-        U2s = np.random.randn(increments)
+        U2s = noise_source.U2s(trajectory, increments)
 
     # Calculate times and random variables for the double and quadruple
     # intervals
@@ -8,9 +8,122 @@
 
 import numpy as np
 from scipy.integrate import odeint
+from scipy import sparse
 import pysme.system_builder as sb
 import pysme.sde as sde
 import pysme.gellmann as gm
+import pysme.structure as struct
+try:
+    import pysme._kernels as _kernels
+except ImportError:
+    _kernels = None
+
+def _kernel_args(*arrays):
+    """Return the arrays in the form taken by the compiled kernels, or
+    ``None`` if the kernels aren't built or can't handle the arrays (e.g.
+    sparse matrices or several rows of noise)."""
+    if _kernels is None or not all(isinstance(array, np.ndarray) and
+                                   np.isrealobj(array) for array in arrays):
+        return None
+    return [np.ascontiguousarray(array, dtype=np.float64) for array in arrays]
+
+def _mat_vec(A, rho):
+    """Apply the matrix `A` to the state `rho`, or to each row of a block of
+    states."""
+    return A.dot(rho.T).T
+
+def _row_dot(k, rho):
+    """Take the dot product of the vector `k` with the state `rho`, or with
+    each row of a block of states (giving a column that broadcasts against the
+    block)."""
+    dots = np.dot(rho, k)
+    return dots if np.ndim(rho) == 1 else dots[:,np.newaxis]
+
+def _uniform_dt(times):
+    """Return the time step if `times` is uniformly spaced, otherwise
+    ``None``."""
+    dts = np.diff(times)
+    if len(dts) > 0 and np.allclose(dts, dts[0], rtol=1e-10, atol=0):
+        return dts[0]
+    return None
+
+def _all_dense(*arrays):
+    return all(isinstance(array, np.ndarray) for array in arrays)
+
+def _uses_step_rule(integrator, cls):
+    """Whether `integrator` steps with the rule defined by `cls`, so the
+    compiled and uniform-grid paths hard-coding that scheme apply to it."""
+    return type(integrator)._step_rule is cls._step_rule
+
+def _uniform_homodyne(mats, k_vecs, coeff_fn, rho_0_vec, times, noise,
+                      save_every):
+    r"""Integrate on a uniform grid with superoperators pre-scaled by powers of
+    the time step.
+
+    Each step sets :math:`\vec{\rho}\to\sum_jc_jM_j\vec{\rho}+c\vec{\rho}`,
+    where all the matrices :math:`M_j` in `mats` are applied in a single
+    stacked matrix-vector product and the coefficients are filled in by
+    ``coeff_fn(coeffs, k_dots, *increments)`` from the noise and the dot
+    products of the vectors `k_vecs` with the state. Every step works in
+    preallocated buffers, so no arrays are allocated inside the loop. Only
+    the first ``len(times) - 1`` increments of the noise are used.
+
+    """
+    sde._check_increments(times, noise, save_every)
+    dim = rho_0_vec.shape[0]
+    n_mats = len(mats)
+    stacked = np.ascontiguousarray(np.concatenate(mats))
+    k_stacked = np.ascontiguousarray(k_vecs)
+    parts = np.empty((n_mats + 1, dim))
+    mat_parts = parts[:n_mats].reshape(-1)
+    k_dots = np.empty(len(k_vecs))
+    coeffs = np.empty(n_mats + 1)
+    n_steps = len(times) - 1
+    Xs = np.empty((n_steps // save_every + 1, dim))
+    Xs[0] = rho_0_vec
+    rho = np.array(rho_0_vec, dtype=np.float64)
+    for n, increments in enumerate(zip(*[np.asarray(Us)[:n_steps].tolist()
+                                         for Us in noise])):
+        np.dot(stacked, rho, out=mat_parts)
+        np.copyto(parts[n_mats], rho)
+        np.dot(k_stacked, rho, out=k_dots)
+        coeff_fn(coeffs, k_dots, *increments)
+        np.dot(coeffs, parts, out=rho)
+        if (n + 1) % save_every == 0:
+            Xs[(n + 1)//save_every] = rho
+    return Xs
+
+def _euler_coeffs(coeffs, k_dots, U):
+    k_rho = k_dots[0]
+    coeffs[0] = 1
+    coeffs[1] = U
+    coeffs[2] = U*k_rho
+
+def _milstein_coeffs(coeffs, k_dots, U):
+    k_rho, k_G_rho = k_dots
+    h = (U**2 - 1)/2
+    coeffs[0] = 1
+    coeffs[1] = U + 2*h*k_rho
+    coeffs[2] = h
+    coeffs[3] = U*k_rho + h*(k_G_rho + 2*k_rho**2)
+
+def _taylor_1_5_coeffs(coeffs, k_dots, U1, U2):
+    k_rho, k_G_rho, k_Q_rho, k_G2_rho = k_dots
+    Z = (U1 + U2/np.sqrt(3))/2
+    h = (U1**2 - 1)/2
+    m = U1 - Z
+    c3 = U1*(U1**2/3 - 1)/2
+    coeffs[0] = 1
+    coeffs[1] = (U1 + 2*h*k_rho + m*(k_G_rho + k_rho**2) +
+                 3*c3*(k_G_rho + 2*k_rho**2))
+    coeffs[2] = h + 3*c3*k_rho
+    coeffs[3] = U1*k_rho
+    coeffs[4] = Z
+    coeffs[5] = m
+    coeffs[6] = c3
+    coeffs[7] = (U1*k_rho + h*(k_G_rho + 2*k_rho**2) +
+                 m*(k_Q_rho + (k_G_rho + k_rho**2)*k_rho) +
+                 c3*(k_G2_rho + 6*k_rho*k_G_rho + 6*k_rho**3))
 
 def b_dx_b(G2, k_T_G, G, k_T, rho):
     r"""A term in Taylor integration methods.
@@ -39,9 +152,9 @@ def b_dx_b(G2, k_T_G, G, k_T, rho):
         \vec{\nabla}_{\vec{\rho}}\right)\vec{b}(\vec{\rho})`.
 
     """
-    k_rho_dot = np.dot(k_T, rho)
-    return (np.dot(k_T_G, rho) + 2*k_rho_dot**2)*rho + \
-            np.dot(G2 + 2*k_rho_dot*G, rho)
+    k_rho_dot = _row_dot(k_T, rho)
+    return (_row_dot(k_T_G, rho) + 2*k_rho_dot**2)*rho + \
+            _mat_vec(G2, rho) + 2*k_rho_dot*_mat_vec(G, rho)
 
 def b_dx_a(QG, k_T, Q, rho):
     r"""A term in Taylor integration methods.
@@ -68,7 +181,7 @@ def b_dx_a(QG, k_T, Q, rho):
         \vec{\nabla}_{\vec{\rho}}\right)\vec{a}(\vec{\rho})`.
 
     """
-    return np.dot(QG + np.dot(k_T, rho)*Q, rho)
+    return _mat_vec(QG, rho) + _row_dot(k_T, rho)*_mat_vec(Q, rho)
 
 def a_dx_b(GQ, k_T, Q, k_T_Q, rho):
     r"""A term in Taylor integration methods.
@@ -95,7 +208,8 @@ def a_dx_b(GQ, k_T, Q, k_T_Q, rho):
         \vec{\nabla}_{\vec{\rho}}\right)\vec{b}(\vec{\rho})`.
 
     """
-    return np.dot(GQ + np.dot(k_T, rho)*Q, rho) + np.dot(k_T_Q, rho)*rho
+    return (_mat_vec(GQ, rho) + _row_dot(k_T, rho)*_mat_vec(Q, rho) +
+            _row_dot(k_T_Q, rho)*rho)
 
 def a_dx_a(Q2, rho):
     r"""A term in Taylor integration methods.
@@ -118,7 +232,7 @@ def a_dx_a(Q2, rho):
         \vec{\nabla}_{\vec{\rho}}\right)\vec{a}(\vec{\rho})`.
 
     """
-    return np.dot(Q2, rho)
+    return _mat_vec(Q2, rho)
 
 def b_dx_b_dx_b(G3, G2, G, k_T, k_T_G, k_T_G2, rho):
     r"""A term in Taylor integration methods.
@@ -151,12 +265,13 @@ def b_dx_b_dx_b(G3, G2, G, k_T, k_T_G, k_T_G2, rho):
         \vec{\nabla}_{\vec{\rho}}\right)^2\vec{b}(\vec{\rho})`.
 
     """
-    k_rho_dot = np.dot(k_T, rho)
-    k_T_G_rho_dot = np.dot(k_T_G, rho)
-    k_T_G2_rho_dot = np.dot(k_T_G2, rho)
-    return (np.dot(G3 + 3*k_rho_dot*G2 + 3*(k_T_G_rho_dot + 2*k_rho_dot**2)*G,
-                   rho) + (k_T_G2_rho_dot + 6*k_rho_dot*k_T_G_rho_dot +
-                           6*k_rho_dot**3)*rho)
+    k_rho_dot = _row_dot(k_T, rho)
+    k_T_G_rho_dot = _row_dot(k_T_G, rho)
+    k_T_G2_rho_dot = _row_dot(k_T_G2, rho)
+    return (_mat_vec(G3, rho) + 3*k_rho_dot*_mat_vec(G2, rho) +
+            3*(k_T_G_rho_dot + 2*k_rho_dot**2)*_mat_vec(G, rho) +
+            (k_T_G2_rho_dot + 6*k_rho_dot*k_T_G_rho_dot +
+             6*k_rho_dot**3)*rho)
 
 def b_b_dx_dx_b(G, k_T, k_T_G, rho):
     r"""A term in Taylor integration methods.
@@ -181,9 +296,136 @@ def b_b_dx_dx_b(G, k_T, k_T_G, rho):
         :math:`b^\nu b^\sigma\partial_\nu\partial_\sigma b^\mu\hat{e}_\mu`
 
     """
-    k_rho_dot = np.dot(k_T, rho)
-    k_T_G_rho_dot = np.dot(k_T_G, rho)
-    return 2*(k_T_G_rho_dot + k_rho_dot**2)*(np.dot(G, rho) + k_rho_dot*rho)
+    k_rho_dot = _row_dot(k_T, rho)
+    k_T_G_rho_dot = _row_dot(k_T_G, rho)
+    return 2*(k_T_G_rho_dot + k_rho_dot**2)*(_mat_vec(G, rho) + k_rho_dot*rho)
+
+def taylor_1_5_step(Q, G, k_T, G2, k_T_G, G3, k_T_G2, Q2, QG, GQ, k_T_Q):
+    r"""Return a single-step rule for order 1.5 Taylor integration of the
+    homodyne equation.
+
+    Gives the same steps as ``sde.time_ind_taylor_1_5_step`` composed with
+    :func:`b_dx_b`, :func:`b_dx_a`, :func:`a_dx_b`, :func:`a_dx_a`,
+    :func:`b_dx_b_dx_b`, and :func:`b_b_dx_dx_b`, but applies each matrix and
+    takes each dot product with the state only once per step (7 matrix-vector
+    and 4 vector-vector products instead of 14 and 12).
+
+    Parameters
+    ----------
+    Q, G, k_T, G2, k_T_G, G3, k_T_G2, Q2, QG, GQ, k_T_Q : numpy.array
+        The superoperators and their products (see
+        :class:`Strong_1_5_HomodyneIntegrator`)
+
+    Returns
+    -------
+    callable(rho, t, dt, U1, U2)
+        The step rule, taking the two normalized increments :math:`U_{1,i}`
+        and :math:`U_{2,i}` as its increments
+
+    """
+    def step(rho, t, dt, U1, U2):
+        sqrtdt = np.sqrt(dt)
+        dW = U1*sqrtdt
+        dZ = (U1 + U2/np.sqrt(3))*sqrtdt*dt/2
+        Q_rho = _mat_vec(Q, rho)
+        G_rho = _mat_vec(G, rho)
+        G2_rho = _mat_vec(G2, rho)
+        k_rho_dot = _row_dot(k_T, rho)
+        k_T_G_rho_dot = _row_dot(k_T_G, rho)
+        k_T_G2_rho_dot = _row_dot(k_T_G2, rho)
+        drift = Q_rho
+        diffusion = k_rho_dot*rho + G_rho
+        b_dx_b_term = ((k_T_G_rho_dot + 2*k_rho_dot**2)*rho + G2_rho +
+                       2*k_rho_dot*G_rho)
+        b_dx_a_term = _mat_vec(QG, rho) + k_rho_dot*Q_rho
+        a_dx_b_term = (_mat_vec(GQ, rho) + k_rho_dot*Q_rho +
+                       _row_dot(k_T_Q, rho)*rho)
+        a_dx_a_term = _mat_vec(Q2, rho)
+        b_dx_b_dx_b_term = (_mat_vec(G3, rho) + 3*k_rho_dot*G2_rho +
+                            3*(k_T_G_rho_dot + 2*k_rho_dot**2)*G_rho +
+                            (k_T_G2_rho_dot + 6*k_rho_dot*k_T_G_rho_dot +
+                             6*k_rho_dot**3)*rho)
+        b_b_dx_dx_b_term = (2*(k_T_G_rho_dot + k_rho_dot**2)*
+                            (G_rho + k_rho_dot*rho))
+        return (rho + drift*dt + diffusion*dW +
+                b_dx_b_term*(dW**2 - dt)/2 + b_dx_a_term*dZ +
+                (a_dx_b_term + b_b_dx_dx_b_term/2)*(dW*dt - dZ) +
+                a_dx_a_term*dt**2/2 +
+                b_dx_b_dx_b_term*(dW**2/3 - dt)*dW/2)
+    return step
+
+def weak_taylor_2_step(Q, G, k_T, G2, k_T_G, Q2, QG, GQ, k_T_Q):
+    r"""Return a single-step rule for weak order 2.0 Taylor integration of the
+    homodyne equation.
+
+    Gives the same steps as ``sde.time_ind_weak_taylor_2_step`` composed with
+    the coefficient functions in this module, sharing the matrix-vector and
+    dot products between the terms as in :func:`taylor_1_5_step`.
+
+    Parameters
+    ----------
+    Q, G, k_T, G2, k_T_G, Q2, QG, GQ, k_T_Q : numpy.array
+        The superoperators and their products (see
+        :class:`Strong_1_5_HomodyneIntegrator`)
+
+    Returns
+    -------
+    callable(rho, t, dt, U)
+        The step rule, taking the normalized increment :math:`U_i` as its
+        increment
+
+    """
+    def step(rho, t, dt, U):
+        dW = U*np.sqrt(dt)
+        Q_rho = _mat_vec(Q, rho)
+        G_rho = _mat_vec(G, rho)
+        k_rho_dot = _row_dot(k_T, rho)
+        k_T_G_rho_dot = _row_dot(k_T_G, rho)
+        diffusion = k_rho_dot*rho + G_rho
+        b_dx_b_term = ((k_T_G_rho_dot + 2*k_rho_dot**2)*rho +
+                       _mat_vec(G2, rho) + 2*k_rho_dot*G_rho)
+        b_dx_a_term = _mat_vec(QG, rho) + k_rho_dot*Q_rho
+        a_dx_b_term = (_mat_vec(GQ, rho) + k_rho_dot*Q_rho +
+                       _row_dot(k_T_Q, rho)*rho)
+        b_b_dx_dx_b_term = (2*(k_T_G_rho_dot + k_rho_dot**2)*
+                            (G_rho + k_rho_dot*rho))
+        return (rho + Q_rho*dt + diffusion*dW +
+                b_dx_b_term*(dW**2 - dt)/2 +
+                (b_dx_a_term + a_dx_b_term + b_b_dx_dx_b_term/2)*dW*dt/2 +
+                _mat_vec(Q2, rho)*dt**2/2)
+    return step
+
+def _drift_products(Q, G, k_T, product_reps=None):
+    r"""Return the products :math:`Q^2`, :math:`QG`, :math:`GQ`, and
+    :math:`\vec{k}^TQ` used by the Taylor integrators, taken from
+    `product_reps` if given."""
+    if product_reps is None:
+        return Q.dot(Q), Q.dot(G), G.dot(Q), Q.T.dot(k_T)
+    return (product_reps['Q2'], product_reps['QG'], product_reps['GQ'],
+            product_reps['k_T_Q'])
+
+def _std_normals(chunk_size=1024):
+    """Generate standard-normal samples indefinitely, drawing them in
+    chunks."""
+    while True:
+        for U in np.random.randn(chunk_size):
+            yield U
+
+def _std_normals_like(times, Us=None):
+    """Draw standard-normal samples for the intervals between `times` (in the
+    shape of the noise `Us` if given, e.g. one row per trajectory), or
+    generate them indefinitely if `times` is None."""
+    if times is None:
+        return _std_normals()
+    return np.random.randn(*(np.shape(Us) if Us is not None else
+                             (len(times) - 1,)))
+
+def _three_point_increments(chunk_size=1024):
+    """Generate three-point increments indefinitely, drawing them in
+    chunks."""
+    while True:
+        for U in sde.three_point_increments(chunk_size):
+            yield U
 
 class Solution:
     r"""Integrated solution to a differential equation.
@@ -194,23 +436,76 @@ class Solution:
     value of an observable) without requiring the user to know anything about
     the particular representation used for numerical integration.
 
+    The vectorized solution may carry leading dimensions (e.g. one per
+    trajectory for ensemble integration), which are kept in everything the
+    methods return.
+
     """
     def __init__(self, vec_soln, basis):
         self.vec_soln = vec_soln
         self.basis = basis
+        self._dual_matrix = None
+        self._basis_norms = None
+
+    @property
+    def dual_matrix(self):
+        r"""The matrix :math:`B^T` taking flattened operators to their dual
+        vectors (see ``system_builder.basis_matrix``), computed on first use.
+
+        """
+        if self._dual_matrix is None:
+            self._dual_matrix = sb.basis_matrix(self.basis).T
+        return self._dual_matrix
+
+    @property
+    def basis_norms(self):
+        r"""The squared norms :math:`\operatorname{Tr}[{\Lambda^x}^\dagger
+        \Lambda^x]` of the basis elements, computed on first use.
+
+        """
+        if self._basis_norms is None:
+            self._basis_norms = np.sum(np.abs(self.dual_matrix)**2, axis=0)
+        return self._basis_norms
+
+    def dualize(self, observables):
+        r"""Take an observable, or a stack of them, to dual vectors.
+
+        Equivalent to ``system_builder.dualize_stack`` (keeping only the real
+        part), but uses the cached ``dual_matrix``.
+
+        Parameters
+        ----------
+        observables : numpy.array, shape=(..., d, d)
+            The observables to dualize
+
+        Returns
+        -------
+        numpy.array, shape=(..., d**2)
+            The dual vectors
+
+        """
+        observables = np.asarray(observables)
+        flat_obs = observables.reshape(observables.shape[:-2] + (-1,))
+        return np.dot(flat_obs.conj(), self.dual_matrix).real
 
     def get_expectations(self, observable):
         r"""Calculate the expectation value of an observable for all times.
 
+        Parameters
+        ----------
+        observable : numpy.array, shape=(d, d) or (K, d, d)
+            The observable, or a stack of :math:`K` observables whose
+            expectation values are all computed with one matrix product.
+
         Returns
         -------
         numpy.array
             The expectation values of an observable for all the calculated
-            times.
+            times (with a trailing axis of length :math:`K` if a stack of
+            observables was given).
 
         """
-        dual = sb.dualize(observable, self.basis).real
-        return np.dot(self.vec_soln, dual)
+        return np.dot(self.vec_soln, self.dualize(observable).T)
 
     def get_purities(self):
         r"""Calculate the purity of the state for all times.
@@ -222,21 +517,81 @@ class Solution:
             time.
 
         """
-        basis_dual = np.array([np.trace(np.dot(op.conj().T, op)).real
-                               for op in self.basis])
-        return np.dot(self.vec_soln**2, basis_dual)
+        return np.dot(self.vec_soln**2, self.basis_norms)
 
     def get_density_matrices(self):
         r"""Represent the solution as a sequence of Hermitian arrays.
 
         Returns
         -------
-        list of numpy.array
+        numpy.array
             The density matrix at each calculated time.
 
         """
-        return [sum([comp*op for comp, op in zip(state, self.basis)])
-                for state in self.vec_soln]
+        return sb.devectorize_stack(self.vec_soln, self.basis)
+
+class ExpectationRecord:
+    r"""Expectation values recorded while integrating, without the states.
+
+    Returned by ``integrate_observables`` and
+    ``integrate_measurements_observables``, which only keep
+    :math:`O(\text{chunk_size}\,d^2)` states in memory at a time.
+
+    Attributes
+    ----------
+    times : numpy.array
+        The saved times
+    expectations : numpy.array, shape=(len(times), K)
+        The expectation value of each of the :math:`K` observables at each
+        saved time
+    purities : numpy.array or None
+        The purity :math:`\operatorname{Tr}[\rho^2]` at each saved time, if
+        requested
+    final_vec : numpy.array
+        The vectorized state at the last saved time point
+    basis : list of numpy.array
+        The basis the state is vectorized with respect to
+
+    """
+    def __init__(self, times, expectations, purities, final_vec, basis):
+        self.times = times
+        self.expectations = expectations
+        self.purities = purities
+        self.final_vec = final_vec
+        self.basis = basis
+
+    def get_final_density_matrix(self):
+        r"""Represent the state at the last saved time point as a Hermitian
+        array.
+
+        Returns
+        -------
+        numpy.array
+            The density matrix at the last saved time point.
+
+        """
+        return sb.devectorize_stack(self.final_vec, self.basis)
+
+def _record_expectations(blocks, observables, purity, basis, rho_0_vec):
+    # Share one set of cached duals and norms among all the blocks.
+    template = Solution(None, basis)
+    duals = template.dualize(observables)
+    t_blocks = [np.empty(0)]
+    expectation_blocks = [np.empty((0, duals.shape[0]))]
+    purity_blocks = [np.empty(0)]
+    final_vec = rho_0_vec
+    for ts, soln in blocks:
+        t_blocks.append(ts)
+        expectation_blocks.append(np.dot(soln.vec_soln, duals.T))
+        if purity:
+            purity_blocks.append(np.dot(soln.vec_soln**2,
+                                        template.basis_norms))
+        if len(ts) > 0:
+            final_vec = soln.vec_soln[-1]
+    return ExpectationRecord(np.concatenate(t_blocks),
+                             np.concatenate(expectation_blocks),
+                             np.concatenate(purity_blocks) if purity else None,
+                             np.array(final_vec), basis)
 
 class GaussIntegrator:
     r"""Template class for Gaussian integrators.
@@ -262,22 +617,55 @@ class GaussIntegrator:
         The real matrix Q that acts on the vectorized rho as the deterministic
         evolution operator. Will save computation time if already known and
         don't need to calculate from `c_op`, `M_sq`, `N`, and `H`.
+    use_sparse : bool, optional
+        Whether to build and apply the superoperators as
+        ``scipy.sparse.csr_matrix`` (worthwhile for large systems whose
+        superoperators are mostly zero).
 
     """
-    def __init__(self, c_op, M_sq, N, H, basis=None, drift_rep=None, **kwargs):
+    def __init__(self, c_op, M_sq, N, H, basis=None, drift_rep=None,
+                 use_sparse=False, **kwargs):
+        self.use_sparse = use_sparse
         if basis is None:
             d = c_op.shape[0]
-            self.basis = gm.get_basis(d)
+            self.basis = gm.get_basis_array(d)
+            # Structure constants of the Gell-Mann basis are known
+            # analytically, so don't compute them from the basis.
+            self.struct_consts = struct.gellmann_struct_consts(d)
         else:
             self.basis = basis
+            self.struct_consts = None
+        self.basis_change = None
 
         if drift_rep is None:
-            self.Q = sb.construct_Q(c_op, M_sq, N, H, self.basis[:-1])
+            self.Q = self._construct_Q(c_op, M_sq, N, H)
         else:
             self.Q = drift_rep
 
+    def _construct_Q(self, c_op, M_sq, N, H):
+        if self.struct_consts is not None:
+            return sb.construct_Q(c_op, M_sq, N, H, self.basis[:-1],
+                                  self.struct_consts, self.use_sparse)
+        # Without known structure constants, going through Liouville space is
+        # cheaper than computing them, and the change of basis can be shared
+        # by all the superoperators.
+        if self.basis_change is None:
+            self.basis_change = sb.liouville_basis_change(self.basis)
+        return sb.construct_Q_liouville(c_op, M_sq, N, H, self.basis[:-1],
+                                        self.basis_change, self.use_sparse)
+
+    def _construct_G_k_T(self, c_op, M_sq, N, H):
+        if self.struct_consts is not None:
+            return sb.construct_G_k_T(c_op, M_sq, N, H, self.basis[:-1],
+                                      self.struct_consts, self.use_sparse)
+        if self.basis_change is None:
+            self.basis_change = sb.liouville_basis_change(self.basis)
+        return sb.construct_G_k_T_liouville(c_op, M_sq, N, H,
+                                            self.basis[:-1], self.basis_change,
+                                            self.use_sparse)
+
     def a_fn(self, rho, t):
-        return np.dot(self.Q, rho)
+        return _mat_vec(self.Q, rho)
 
     def integrate(self, rho_0, times):
         raise NotImplementedError()
@@ -303,10 +691,14 @@ class UncondGaussIntegrator(GaussIntegrator):
         The real matrix Q that acts on the vectorized rho as the deterministic
         evolution operator. Will save computation time if already known and
         don't need to calculate from `c_op`, `M_sq`, `N`, and `H`.
+    use_sparse : bool, optional
+        Whether to build and apply the superoperators as
+        ``scipy.sparse.csr_matrix`` (worthwhile for large systems whose
+        superoperators are mostly zero).
 
     """
     def Dfun(self, rho, t):
-        return self.Q
+        return self.Q.toarray() if sparse.issparse(self.Q) else self.Q
 
     def integrate(self, rho_0, times):
         r"""Integrate the equation for a list of times with given initial
@@ -353,6 +745,10 @@ class Strong_0_5_HomodyneIntegrator(GaussIntegrator):
         The real matrix G and row vector k_T that act on the vectorized rho as
         the stochastic evolution operator.  Will save computation time if
         already known and don't need to calculate from `c_op`, `M_sq`, and `N`.
+    use_sparse : bool, optional
+        Whether to build and apply the superoperators as
+        ``scipy.sparse.csr_matrix`` (worthwhile for large systems whose
+        superoperators are mostly zero).
 
     """
     def __init__(self, c_op, M_sq, N, H, basis=None, drift_rep=None,
@@ -362,21 +758,273 @@ class Strong_0_5_HomodyneIntegrator(GaussIntegrator):
                                                             **kwargs)
 
         if diffusion_reps is None:
-            self.G, self.k_T = sb.construct_G_k_T(c_op, M_sq, N, H,
-                                                  self.basis[:-1])
+            self.G, self.k_T = self._construct_G_k_T(c_op, M_sq, N, H)
         else:
             self.G = diffusion_reps['G']
             self.k_T = diffusion_reps['k_T']
 
     def b_fn(self, rho, t):
-        return np.dot(self.k_T, rho)*rho + np.dot(self.G, rho)
+        return _row_dot(self.k_T, rho)*rho + _mat_vec(self.G, rho)
 
     def dW_fn(self, dM, dt, rho, t):
-        return dM + np.dot(self.k_T, rho) * dt
+        return dM + _row_dot(self.k_T, rho) * dt
 
-    def integrate(self, rho_0, times, U1s=None, U2s=None):
+    def _step_rule(self):
         raise NotImplementedError()
 
+    def _meas_step_rule(self):
+        raise NotImplementedError(
+                '{} cannot integrate a measurement record'.format(
+                    type(self).__name__))
+
+    def _increments(self, times, U1s, U2s):
+        # Fill in missing noise, as arrays for `times` or as endless iterators
+        # if `times` is None (for the streaming methods).
+        if U1s is None:
+            U1s = _std_normals_like(times)
+        return [U1s]
+
+    def integrate(self, rho_0, times, U1s=None, U2s=None, save_every=1):
+        r"""Integrate the initial value problem.
+
+        Integrate for a sequence of times with a given initial condition (and
+        optionally specified white noise), repeatedly applying the
+        integrator's single-step rule.
+
+        Parameters
+        ----------
+        rho_0: numpy.array
+            The initial state of the system
+        times: numpy.array
+            A sequence of time points for which to solve for rho
+        U1s: numpy.array(len(times) - 1)
+            Samples from a standard-normal distribution used to construct
+            Wiener increments :math:`\Delta W` for each time interval.
+        U2s: numpy.array(len(times) - 1)
+            Samples from a standard-normal distribution used to construct
+            multiple stochastic integrals :math:`\Delta Z` for each time
+            interval (only used by integrators of order 1.5).
+        save_every: int, optional
+            Only store :math:`\rho` at every `save_every`-th time point, i.e.
+            at ``times[::save_every]``.
+
+        Returns
+        -------
+        Solution
+            The state of :math:`\rho` for all saved times
+
+        """
+        rho_0_vec = sb.vectorize(rho_0, self.basis).real
+        vec_soln = sde.step_all(self._step_rule(), rho_0_vec, times,
+                                self._increments(times, U1s, U2s), save_every)
+        return Solution(vec_soln, self.basis)
+
+    def _iter_solutions(self, step, rho_0, times, increments, chunk_size,
+                        save_every):
+        rho_0_vec = sb.vectorize(rho_0, self.basis).real
+        for ts, vec_block in sde.iter_step_all(step, rho_0_vec, times,
+                                               increments, chunk_size,
+                                               save_every):
+            yield ts, Solution(vec_block, self.basis)
+
+    def iter_integrate(self, rho_0, times, U1s=None, U2s=None,
+                       chunk_size=1024, save_every=1):
+        r"""Integrate the initial value problem, yielding the solution in
+        blocks.
+
+        The times and noise are consumed lazily from arbitrary iterables, so
+        only :math:`O(\text{chunk_size})` memory is used regardless of the
+        length of the trajectory.
+
+        Parameters
+        ----------
+        rho_0: numpy.array
+            The initial state of the system
+        times: iterable of float
+            A sequence of time points for which to solve for rho (may be a
+            generator)
+        U1s: iterable of float, optional
+            Samples from a standard-normal distribution used to construct
+            Wiener increments :math:`\Delta W` for each time interval. Drawn
+            as needed if not given.
+        U2s: iterable of float, optional
+            Samples from a standard-normal distribution used to construct
+            multiple stochastic integrals :math:`\Delta Z` for each time
+            interval (only used by integrators of order 1.5). Drawn as needed
+            if not given.
+        chunk_size: int, optional
+            Number of saved states in each block
+        save_every: int, optional
+            Only store :math:`\rho` at every `save_every`-th time point
+
+        Yields
+        ------
+        tuple of numpy.array and Solution
+            Blocks of saved times and the state of :math:`\rho` at those
+            times
+
+        """
+        return self._iter_solutions(self._step_rule(), rho_0, times,
+                                    self._increments(None, U1s, U2s),
+                                    chunk_size, save_every)
+
+    def iter_integrate_measurements(self, rho_0, times, dMs, chunk_size=1024,
+                                    save_every=1):
+        r"""Integrate system evolution conditioned on a measurement record,
+        yielding the solution in blocks.
+
+        Only available for integrators with a step rule driven by measurement
+        outcomes; others raise ``NotImplementedError``.
+
+        Parameters
+        ----------
+        rho_0: numpy.array
+            The initial state of the system
+        times: iterable of float
+            A sequence of time points for which to solve for rho (may be a
+            generator)
+        dMs: iterable of float
+            Incremental measurement outcomes used to drive the SDE (may be a
+            generator, e.g. reading a record from disk).
+        chunk_size: int, optional
+            Number of saved states in each block
+        save_every: int, optional
+            Only store :math:`\rho` at every `save_every`-th time point
+
+        Yields
+        ------
+        tuple of numpy.array and Solution
+            Blocks of saved times and the state of :math:`\rho` at those
+            times
+
+        """
+        return self._iter_solutions(self._meas_step_rule(), rho_0, times,
+                                    [dMs], chunk_size, save_every)
+
+    def integrate_ensemble(self, rho_0, times, U1s, U2s=None, save_every=1):
+        r"""Integrate many independent trajectories at once.
+
+        All trajectories are advanced together as the rows of an
+        :math:`M\times d^2` array, so each step is a handful of matrix-matrix
+        products rather than :math:`M` separate matrix-vector products.
+
+        Parameters
+        ----------
+        rho_0: numpy.array
+            The initial state of the system, shared by all trajectories, or a
+            stack of :math:`M` initial states
+        times: numpy.array
+            A sequence of time points for which to solve for rho
+        U1s: numpy.array, shape=(M, len(times) - 1)
+            Samples from a standard-normal distribution used to construct
+            Wiener increments :math:`\Delta W`, one row per trajectory.
+        U2s: numpy.array, shape=(M, len(times) - 1), optional
+            Samples from a standard-normal distribution used to construct
+            the multiple stochastic integrals :math:`\Delta Z` (only used by
+            integrators of order 1.5). Drawn if not given.
+        save_every: int, optional
+            Only store :math:`\rho` at every `save_every`-th time point, i.e.
+            at ``times[::save_every]``.
+
+        Returns
+        -------
+        Solution
+            The state of :math:`\rho` for all trajectories and saved times,
+            with ``vec_soln`` of shape ``(M, len(times[::save_every]), d**2)``
+
+        """
+        # Give each step's increments shape (M, 1) so they broadcast against
+        # the (M, d**2) block of states.
+        increments = [np.asarray(increment).T[...,np.newaxis]
+                      for increment in self._increments(times, U1s, U2s)]
+        n_traj = increments[0].shape[1]
+        rho_0_vec = sb.vectorize_stack(rho_0, self.basis).real
+        rho_0_block = np.array(np.broadcast_to(rho_0_vec,
+                                               (n_traj, rho_0_vec.shape[-1])))
+        vec_soln = sde.step_all(self._step_rule(), rho_0_block, times,
+                                increments, save_every)
+        return Solution(vec_soln.swapaxes(0, 1), self.basis)
+
+    def integrate_observables(self, rho_0, times, observables, U1s=None,
+                              U2s=None, purity=False, chunk_size=1024,
+                              save_every=1):
+        r"""Integrate the initial value problem, recording only expectation
+        values and the final state.
+
+        States are produced in blocks by ``iter_integrate`` and reduced to the
+        requested scalars as they go, so memory use doesn't grow with the
+        number of time points by a factor of :math:`d^2`.
+
+        Parameters
+        ----------
+        rho_0: numpy.array
+            The initial state of the system
+        times: iterable of float
+            A sequence of time points for which to solve for rho
+        observables: numpy.array, shape=(K, d, d)
+            The observables whose expectation values to record
+        U1s: iterable of float, optional
+            Samples from a standard-normal distribution used to construct
+            Wiener increments :math:`\Delta W` for each time interval.
+        U2s: iterable of float, optional
+            Samples from a standard-normal distribution used to construct
+            multiple stochastic integrals :math:`\Delta Z` for integrators
+            that need them.
+        purity: bool, optional
+            Whether to also record the purity of the state
+        chunk_size: int, optional
+            Number of saved states kept in memory at a time
+        save_every: int, optional
+            Only record values at every `save_every`-th time point
+
+        Returns
+        -------
+        ExpectationRecord
+            The recorded expectation values and the final state
+
+        """
+        blocks = self.iter_integrate(rho_0, times, U1s, U2s, chunk_size,
+                                     save_every)
+        return _record_expectations(blocks, observables, purity, self.basis,
+                                    sb.vectorize(rho_0, self.basis).real)
+
+    def integrate_measurements_observables(self, rho_0, times, dMs,
+                                           observables, purity=False,
+                                           chunk_size=1024, save_every=1):
+        r"""Integrate system evolution conditioned on a measurement record,
+        recording only expectation values and the final state.
+
+        Only available for integrators with a step rule driven by measurement
+        outcomes; others raise ``NotImplementedError``.
+
+        Parameters
+        ----------
+        rho_0: numpy.array
+            The initial state of the system
+        times: iterable of float
+            A sequence of time points for which to solve for rho
+        dMs: iterable of float
+            Incremental measurement outcomes used to drive the SDE
+        observables: numpy.array, shape=(K, d, d)
+            The observables whose expectation values to record
+        purity: bool, optional
+            Whether to also record the purity of the state
+        chunk_size: int, optional
+            Number of saved states kept in memory at a time
+        save_every: int, optional
+            Only record values at every `save_every`-th time point
+
+        Returns
+        -------
+        ExpectationRecord
+            The recorded expectation values and the final state
+
+        """
+        blocks = self.iter_integrate_measurements(rho_0, times, dMs,
+                                                  chunk_size, save_every)
+        return _record_expectations(blocks, observables, purity, self.basis,
+                                    sb.vectorize(rho_0, self.basis).real)
+
     def gen_meas_record(self, rho_0, times, U1s=None):
         r"""Simulate a measurement record.
 
@@ -452,16 +1100,29 @@ class Strong_1_0_HomodyneIntegrator(Strong_0_5_HomodyneIntegrator):
         The real matrix G and row vector k_T that act on the vectorized rho as
         the stochastic evolution operator.  Will save computation time if
         already known and don't need to calculate from `c_op`, `M_sq`, and `N`.
+    product_reps : dict of numpy.array, optional
+        Precomputed products of the superoperators (``'k_T_G'`` and ``'G2'``
+        for order 1 integrators, additionally ``'G3'``, ``'Q2'``, ``'QG'``,
+        ``'GQ'``, ``'k_T_G2'``, and ``'k_T_Q'`` for order 1.5 integrators),
+        e.g. from ``system_builder.AffineModel``.
+    use_sparse : bool, optional
+        Whether to build and apply the superoperators as
+        ``scipy.sparse.csr_matrix`` (worthwhile for large systems whose
+        superoperators are mostly zero).
 
     """
     def __init__(self, c_op, M_sq, N, H, basis=None, drift_rep=None,
-                 diffusion_reps=None, **kwargs):
+                 diffusion_reps=None, product_reps=None, **kwargs):
         super(Strong_1_0_HomodyneIntegrator, self).__init__(c_op, M_sq, N, H,
                                                             basis, drift_rep,
                                                             diffusion_reps,
                                                             **kwargs)
-        self.k_T_G = np.dot(self.k_T, self.G)
-        self.G2 = np.dot(self.G, self.G)
+        if product_reps is None:
+            self.k_T_G = self.G.T.dot(self.k_T)
+            self.G2 = self.G.dot(self.G)
+        else:
+            self.k_T_G = product_reps['k_T_G']
+            self.G2 = product_reps['G2']
 
 class Strong_1_5_HomodyneIntegrator(Strong_1_0_HomodyneIntegrator):
     r"""Template class for integrators of strong order >= 1.5.
@@ -491,20 +1152,32 @@ class Strong_1_5_HomodyneIntegrator(Strong_1_0_HomodyneIntegrator):
         The real matrix G and row vector k_T that act on the vectorized rho as
         the stochastic evolution operator.  Will save computation time if
         already known and don't need to calculate from `c_op`, `M_sq`, and `N`.
+    product_reps : dict of numpy.array, optional
+        Precomputed products of the superoperators (``'k_T_G'`` and ``'G2'``
+        for order 1 integrators, additionally ``'G3'``, ``'Q2'``, ``'QG'``,
+        ``'GQ'``, ``'k_T_G2'``, and ``'k_T_Q'`` for order 1.5 integrators),
+        e.g. from ``system_builder.AffineModel``.
+    use_sparse : bool, optional
+        Whether to build and apply the superoperators as
+        ``scipy.sparse.csr_matrix`` (worthwhile for large systems whose
+        superoperators are mostly zero).
 
     """
     def __init__(self, c_op, M_sq, N, H, basis=None, drift_rep=None,
-                 diffusion_reps=None, **kwargs):
+                 diffusion_reps=None, product_reps=None, **kwargs):
         super(Strong_1_5_HomodyneIntegrator, self).__init__(c_op, M_sq, N, H,
                                                             basis, drift_rep,
                                                             diffusion_reps,
+                                                            product_reps,
                                                             **kwargs)
-        self.G3 = np.dot(self.G2, self.G)
-        self.Q2 = np.dot(self.Q, self.Q)
-        self.QG = np.dot(self.Q, self.G)
-        self.GQ = np.dot(self.G, self.Q)
-        self.k_T_G2 = np.dot(self.k_T, self.G2)
-        self.k_T_Q = np.dot(self.k_T, self.Q)
+        if product_reps is None:
+            self.G3 = self.G2.dot(self.G)
+            self.k_T_G2 = self.G2.T.dot(self.k_T)
+        else:
+            self.G3 = product_reps['G3']
+            self.k_T_G2 = product_reps['k_T_G2']
+        self.Q2, self.QG, self.GQ, self.k_T_Q = _drift_products(
+                self.Q, self.G, self.k_T, product_reps)
 
 class EulerHomodyneIntegrator(Strong_0_5_HomodyneIntegrator):
     r"""Euler integrator for the conditional Gaussian master equation.
@@ -531,10 +1204,20 @@ class EulerHomodyneIntegrator(Strong_0_5_HomodyneIntegrator):
         The real matrix G and row vector k_T that act on the vectorized rho as
         the stochastic evolution operator.  Will save computation time if
         already known and don't need to calculate from `c_op`, `M_sq`, and `N`.
+    use_sparse : bool, optional
+        Whether to build and apply the superoperators as
+        ``scipy.sparse.csr_matrix`` (worthwhile for large systems whose
+        superoperators are mostly zero).
 
     """
 
-    def integrate(self, rho_0, times, U1s=None, U2s=None):
+    def _step_rule(self):
+        return sde.euler_step(self.a_fn, self.b_fn)
+
+    def _meas_step_rule(self):
+        return sde.meas_euler_step(self.a_fn, self.b_fn, self.dW_fn)
+
+    def integrate(self, rho_0, times, U1s=None, U2s=None, save_every=1):
         r"""Integrate the initial value problem.
 
         Integrate for a sequence of times with a given initial condition (and
@@ -553,21 +1236,41 @@ class EulerHomodyneIntegrator(Strong_0_5_HomodyneIntegrator):
         U2s: numpy.array(len(times) - 1)
             Unused, included to make the argument list uniform with
             higher-order integrators.
+        save_every: int, optional
+            Only store :math:`\rho` at every `save_every`-th time point, i.e.
+            at ``times[::save_every]``.
 
         Returns
         -------
         Solution
-            The state of :math:`\rho` for all specified times
+            The state of :math:`\rho` for all saved times
 
         """
+        if not _uses_step_rule(self, EulerHomodyneIntegrator):
+            return super(EulerHomodyneIntegrator, self).integrate(
+                    rho_0, times, U1s, U2s, save_every)
         rho_0_vec = sb.vectorize(rho_0, self.basis).real
-        if U1s is None:
-            U1s = np.random.randn(len(times) -1)
-
-        vec_soln = sde.euler(self.a_fn, self.b_fn, rho_0_vec, times, U1s)
+        U1s, = self._increments(times, U1s, U2s)
+
+        sde._check_increments(times, [U1s], save_every)
+        args = _kernel_args(self.Q, self.G, self.k_T, rho_0_vec,
+                            np.asarray(times), np.asarray(U1s))
+        dt = _uniform_dt(times)
+        if args is not None and np.ndim(U1s) == 1:
+            vec_soln = _kernels.euler(*args, save_every=save_every)
+        elif (dt is not None and np.ndim(U1s) == 1 and
+              _all_dense(self.Q, self.G)):
+            sqrtdt = np.sqrt(dt)
+            vec_soln = _uniform_homodyne(
+                    [np.eye(self.Q.shape[0]) + self.Q*dt, self.G*sqrtdt],
+                    [self.k_T*sqrtdt], _euler_coeffs, rho_0_vec, times,
+                    [U1s], save_every)
+        else:
+            vec_soln = sde.euler(self.a_fn, self.b_fn, rho_0_vec, times, U1s,
+                                 save_every)
         return Solution(vec_soln, self.basis)
 
-    def integrate_measurements(self, rho_0, times, dMs):
+    def integrate_measurements(self, rho_0, times, dMs, save_every=1):
         r"""Integrate system evolution conditioned on a measurement record.
 
         Parameters
@@ -578,18 +1281,21 @@ class EulerHomodyneIntegrator(Strong_0_5_HomodyneIntegrator):
             A sequence of time points for which to solve for rho
         dMs: numpy.array(len(times) - 1)
             Incremental measurement outcomes used to drive the SDE.
+        save_every: int, optional
+            Only store :math:`\rho` at every `save_every`-th time point, i.e.
+            at ``times[::save_every]``.
 
         Returns
         -------
         Solution
-            The components of the vecorized :math:`\rho` for all specified
+            The components of the vecorized :math:`\rho` for all saved
             times
 
         """
         rho_0_vec = sb.vectorize(rho_0, self.basis).real
 
         vec_soln = sde.meas_euler(self.a_fn, self.b_fn, self.dW_fn, rho_0_vec,
-                                  times, dMs)
+                                  times, dMs, save_every)
         return Solution(vec_soln, self.basis)
 
 class MilsteinHomodyneIntegrator(Strong_1_0_HomodyneIntegrator):
@@ -617,6 +1323,15 @@ class MilsteinHomodyneIntegrator(Strong_1_0_HomodyneIntegrator):
         The real matrix G and row vector k_T that act on the vectorized rho as
         the stochastic evolution operator.  Will save computation time if
         already known and don't need to calculate from `c_op`, `M_sq`, and `N`.
+    product_reps : dict of numpy.array, optional
+        Precomputed products of the superoperators (``'k_T_G'`` and ``'G2'``
+        for order 1 integrators, additionally ``'G3'``, ``'Q2'``, ``'QG'``,
+        ``'GQ'``, ``'k_T_G2'``, and ``'k_T_Q'`` for order 1.5 integrators),
+        e.g. from ``system_builder.AffineModel``.
+    use_sparse : bool, optional
+        Whether to build and apply the superoperators as
+        ``scipy.sparse.csr_matrix`` (worthwhile for large systems whose
+        superoperators are mostly zero).
 
     """
 
@@ -625,7 +1340,14 @@ class MilsteinHomodyneIntegrator(Strong_1_0_HomodyneIntegrator):
         # numba optimization.
         return b_dx_b(self.G2, self.k_T_G, self.G, self.k_T, rho)
 
-    def integrate(self, rho_0, times, U1s=None, U2s=None):
+    def _step_rule(self):
+        return sde.milstein_step(self.a_fn, self.b_fn, self.b_dx_b_fn)
+
+    def _meas_step_rule(self):
+        return sde.meas_milstein_step(self.a_fn, self.b_fn, self.b_dx_b_fn,
+                                      self.dW_fn)
+
+    def integrate(self, rho_0, times, U1s=None, U2s=None, save_every=1):
         r"""Integrate the initial value problem.
 
         Integrate for a sequence of times with a given initial condition (and
@@ -644,22 +1366,42 @@ class MilsteinHomodyneIntegrator(Strong_1_0_HomodyneIntegrator):
         U2s: numpy.array(len(times) - 1)
             Unused, included to make the argument list uniform with
             higher-order integrators.
+        save_every: int, optional
+            Only store :math:`\rho` at every `save_every`-th time point, i.e.
+            at ``times[::save_every]``.
 
         Returns
         -------
         Solution
-            The state of :math:`\rho` for all specified times
+            The state of :math:`\rho` for all saved times
 
         """
+        if not _uses_step_rule(self, MilsteinHomodyneIntegrator):
+            return super(MilsteinHomodyneIntegrator, self).integrate(
+                    rho_0, times, U1s, U2s, save_every)
         rho_0_vec = sb.vectorize(rho_0, self.basis).real
-        if U1s is None:
-            U1s = np.random.randn(len(times) -1)
-
-        vec_soln = sde.milstein(self.a_fn, self.b_fn, self.b_dx_b_fn, rho_0_vec,
-                                times, U1s)
+        U1s, = self._increments(times, U1s, U2s)
+
+        sde._check_increments(times, [U1s], save_every)
+        args = _kernel_args(self.Q, self.G, self.k_T, self.G2, self.k_T_G,
+                            rho_0_vec, np.asarray(times), np.asarray(U1s))
+        dt = _uniform_dt(times)
+        if args is not None and np.ndim(U1s) == 1:
+            vec_soln = _kernels.milstein(*args, save_every=save_every)
+        elif (dt is not None and np.ndim(U1s) == 1 and
+              _all_dense(self.Q, self.G, self.G2)):
+            sqrtdt = np.sqrt(dt)
+            vec_soln = _uniform_homodyne(
+                    [np.eye(self.Q.shape[0]) + self.Q*dt, self.G*sqrtdt,
+                     self.G2*dt],
+                    [self.k_T*sqrtdt, self.k_T_G*dt], _milstein_coeffs,
+                    rho_0_vec, times, [U1s], save_every)
+        else:
+            vec_soln = sde.milstein(self.a_fn, self.b_fn, self.b_dx_b_fn,
+                                    rho_0_vec, times, U1s, save_every)
         return Solution(vec_soln, self.basis)
 
-    def integrate_measurements(self, rho_0, times, dMs):
+    def integrate_measurements(self, rho_0, times, dMs, save_every=1):
         r"""Integrate system evolution conditioned on a measurement record.
 
         Parameters
@@ -670,38 +1412,235 @@ class MilsteinHomodyneIntegrator(Strong_1_0_HomodyneIntegrator):
             A sequence of time points for which to solve for rho
         dMs: numpy.array(len(times) - 1)
             Incremental measurement outcomes used to drive the SDE.
+        save_every: int, optional
+            Only store :math:`\rho` at every `save_every`-th time point, i.e.
+            at ``times[::save_every]``.
 
         Returns
         -------
         Solution
-            The components of the vecorized :math:`\rho` for all specified
+            The components of the vecorized :math:`\rho` for all saved
             times
 
         """
         rho_0_vec = sb.vectorize(rho_0, self.basis).real
 
         vec_soln = sde.meas_milstein(self.a_fn, self.b_fn, self.b_dx_b_fn,
-                                     self.dW_fn, rho_0_vec, times, dMs)
+                                     self.dW_fn, rho_0_vec, times, dMs,
+                                     save_every)
         return Solution(vec_soln, self.basis)
 
-class FaultyMilsteinHomodyneIntegrator(MilsteinHomodyneIntegrator):
-    r"""Integrator included to test if grid convergence could identify an error
-    I originally had in my Milstein integrator (missing a factor of 1/2 in front
-    of the term that's added to the Euler scheme)
+class AdaptiveMilsteinHomodyneIntegrator(MilsteinHomodyneIntegrator):
+    r"""Milstein integrator with adaptive step size for the conditional
+    Gaussian master equation.
+
+    Each interval between the requested times is subdivided (refining the
+    Wiener increment with a Brownian bridge) wherever a step disagrees with
+    two half steps by more than the tolerance (see ``sde.adaptive_milstein``),
+    so the requested times only need to be as fine as the desired output.
+    Integration conditioned on a measurement record is done on the given time
+    points as in :class:`MilsteinHomodyneIntegrator`.
+
+    Parameters
+    ----------
+    c_op : numpy.array
+        The coupling operator
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H : numpy.array
+        The plant Hamiltonian
+    atol : float, optional
+        Absolute error tolerance for each step
+    rtol : float, optional
+        Error tolerance for each step relative to the largest component of the
+        vectorized :math:`\rho`
+    max_depth : int, optional
+        Maximum number of times each interval between requested times is
+        halved
+    rng : numpy.random.Generator or numpy.random.RandomState, optional
+        Source of the normal samples refining the Wiener path (the global
+        ``numpy.random`` state by default)
+    **kwargs
+        Any other arguments to :class:`MilsteinHomodyneIntegrator`
 
     """
+    def __init__(self, c_op, M_sq, N, H, atol=1e-6, rtol=1e-3, max_depth=16,
+                 rng=None, **kwargs):
+        super(AdaptiveMilsteinHomodyneIntegrator, self).__init__(c_op, M_sq,
+                                                                 N, H,
+                                                                 **kwargs)
+        self.atol = atol
+        self.rtol = rtol
+        self.max_depth = max_depth
+        self.rng = rng
+
+    def _step_rule(self):
+        return sde.adaptive_milstein_step(self.a_fn, self.b_fn,
+                                          self.b_dx_b_fn, self.atol, self.rtol,
+                                          self.max_depth, self.rng)
+
+class DriftImplicitEulerHomodyneIntegrator(EulerHomodyneIntegrator):
+    r"""Drift-implicit Euler integrator for the conditional Gaussian master
+    equation.
+
+    The linear drift :math:`Q\vec{\rho}` is treated implicitly (see
+    ``sde.drift_implicit_euler``), so large thermal occupations or
+    squeezing, which make :math:`Q` stiff, don't force tiny time steps. The
+    factorization of :math:`I-\theta\Delta tQ` is computed once for each
+    step size and shared by all steps and trajectories integrated with this
+    instance. Integration conditioned on a measurement record uses the
+    explicit scheme of :class:`EulerHomodyneIntegrator`.
 
-    def integrate(self, rho_0, times, U1s=None, U2s=None):
-        rho_0_vec = sb.vectorize(rho_0, self.basis).real
-        if U1s is None:
-            U1s = np.random.randn(len(times) -1)
+    Parameters
+    ----------
+    c_op : numpy.array
+        The coupling operator
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H : numpy.array
+        The plant Hamiltonian
+    theta : float, optional
+        The weight of the implicit part of the drift (1 for backward Euler,
+        1/2 for the trapezoidal rule)
+    **kwargs
+        Any other arguments to :class:`EulerHomodyneIntegrator`
 
-        vec_soln = sde.faulty_milstein(self.a_fn, self.b_fn, self.b_dx_b_fn,
-                                       rho_0_vec, times, U1s)
-        return Solution(vec_soln, self.basis)
+    """
+    def __init__(self, c_op, M_sq, N, H, theta=1., **kwargs):
+        super(DriftImplicitEulerHomodyneIntegrator, self).__init__(
+                c_op, M_sq, N, H, **kwargs)
+        self.theta = theta
+        self._solve = sde.drift_implicit_solver(self.Q, theta)
+
+    def _step_rule(self):
+        return sde.drift_implicit_euler_step(self.Q, self.b_fn, self.theta,
+                                             self._solve)
+
+class DriftImplicitMilsteinHomodyneIntegrator(MilsteinHomodyneIntegrator):
+    r"""Drift-implicit Milstein integrator for the conditional Gaussian master
+    equation.
+
+    The linear drift :math:`Q\vec{\rho}` is treated implicitly (see
+    ``sde.drift_implicit_milstein``), so large thermal occupations or
+    squeezing, which make :math:`Q` stiff, don't force tiny time steps. The
+    factorization of :math:`I-\theta\Delta tQ` is computed once for each
+    step size and shared by all steps and trajectories integrated with this
+    instance. Integration conditioned on a measurement record uses the
+    explicit scheme of :class:`MilsteinHomodyneIntegrator`.
 
-class Taylor_1_5_HomodyneIntegrator(Strong_1_5_HomodyneIntegrator):
-    r"""Order 1.5 Taylor ntegrator for the conditional Gaussian master equation.
+    Parameters
+    ----------
+    c_op : numpy.array
+        The coupling operator
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H : numpy.array
+        The plant Hamiltonian
+    theta : float, optional
+        The weight of the implicit part of the drift (1 for backward Euler,
+        1/2 for the trapezoidal rule)
+    **kwargs
+        Any other arguments to :class:`MilsteinHomodyneIntegrator`
+
+    """
+    def __init__(self, c_op, M_sq, N, H, theta=1., **kwargs):
+        super(DriftImplicitMilsteinHomodyneIntegrator, self).__init__(
+                c_op, M_sq, N, H, **kwargs)
+        self.theta = theta
+        self._solve = sde.drift_implicit_solver(self.Q, theta)
+
+    def _step_rule(self):
+        return sde.drift_implicit_milstein_step(self.Q, self.b_fn,
+                                                self.b_dx_b_fn, self.theta,
+                                                self._solve)
+
+class ExponentialEulerHomodyneIntegrator(EulerHomodyneIntegrator):
+    r"""Exponential Euler integrator for the conditional Gaussian master
+    equation.
+
+    The linear drift :math:`Q\vec{\rho}` is propagated exactly by
+    :math:`\exp(Q\Delta t)` (see ``sde.exponential_euler``), so
+    strong Hamiltonian or dissipative terms don't limit the step size. For
+    dense superoperators the propagator is computed once for each step size
+    and shared by all steps and trajectories integrated with this instance;
+    for sparse ones its action is computed with
+    ``scipy.sparse.linalg.expm_multiply``. Integration conditioned on a
+    measurement record uses the scheme of :class:`EulerHomodyneIntegrator`.
+
+    Parameters
+    ----------
+    c_op : numpy.array
+        The coupling operator
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H : numpy.array
+        The plant Hamiltonian
+    **kwargs
+        Any other arguments to :class:`EulerHomodyneIntegrator`
+
+    """
+    def __init__(self, c_op, M_sq, N, H, **kwargs):
+        super(ExponentialEulerHomodyneIntegrator, self).__init__(
+                c_op, M_sq, N, H, **kwargs)
+        self._propagate = sde.exponential_propagator(self.Q)
+
+    def _step_rule(self):
+        return sde.exponential_euler_step(self.Q, self.b_fn, self._propagate)
+
+class ExponentialMilsteinHomodyneIntegrator(MilsteinHomodyneIntegrator):
+    r"""Exponential Milstein integrator for the conditional Gaussian master
+    equation.
+
+    The linear drift :math:`Q\vec{\rho}` is propagated exactly by
+    :math:`\exp(Q\Delta t)` (see ``sde.exponential_milstein``), so
+    strong Hamiltonian or dissipative terms don't limit the step size. For
+    dense superoperators the propagator is computed once for each step size
+    and shared by all steps and trajectories integrated with this instance;
+    for sparse ones its action is computed with
+    ``scipy.sparse.linalg.expm_multiply``. Integration conditioned on a
+    measurement record uses the scheme of :class:`MilsteinHomodyneIntegrator`.
+
+    Parameters
+    ----------
+    c_op : numpy.array
+        The coupling operator
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H : numpy.array
+        The plant Hamiltonian
+    **kwargs
+        Any other arguments to :class:`MilsteinHomodyneIntegrator`
+
+    """
+    def __init__(self, c_op, M_sq, N, H, **kwargs):
+        super(ExponentialMilsteinHomodyneIntegrator, self).__init__(
+                c_op, M_sq, N, H, **kwargs)
+        self._propagate = sde.exponential_propagator(self.Q)
+
+    def _step_rule(self):
+        return sde.exponential_milstein_step(self.Q, self.b_fn, self.b_dx_b_fn,
+                                             self._propagate)
+
+class Platen_1_0_HomodyneIntegrator(EulerHomodyneIntegrator):
+    r"""Derivative-free integrator of strong order 1.0 for the conditional
+    Gaussian master equation.
+
+    Has the convergence order of :class:`MilsteinHomodyneIntegrator`, but
+    evaluates the diffusion coefficient a second time (see
+    ``sde.platen_1_0``) instead of using the products :math:`G^2` and
+    :math:`\vec{k}^TG`, so constructing it costs no more than constructing
+    :class:`EulerHomodyneIntegrator`. Integration conditioned on a
+    measurement record uses the scheme of :class:`EulerHomodyneIntegrator`.
 
     Parameters
     ----------
@@ -725,13 +1664,93 @@ class Taylor_1_5_HomodyneIntegrator(Strong_1_5_HomodyneIntegrator):
         The real matrix G and row vector k_T that act on the vectorized rho as
         the stochastic evolution operator.  Will save computation time if
         already known and don't need to calculate from `c_op`, `M_sq`, and `N`.
+    use_sparse : bool, optional
+        Whether to build and apply the superoperators as
+        ``scipy.sparse.csr_matrix`` (worthwhile for large systems whose
+        superoperators are mostly zero).
+
+    """
+
+    def _step_rule(self):
+        return sde.platen_1_0_step(self.a_fn, self.b_fn)
+
+class Platen_1_5_HomodyneIntegrator(EulerHomodyneIntegrator):
+    r"""Derivative-free integrator of strong order 1.5 for the conditional
+    Gaussian master equation.
+
+    Has the convergence order of :class:`Taylor_1_5_HomodyneIntegrator`, but
+    replaces the derivatives of the coefficients by differences of the drift
+    and diffusion coefficients at supporting values (see
+    ``sde.time_ind_platen_1_5``). This costs two drift and five diffusion
+    evaluations per step, but none of the products :math:`G^2`,
+    :math:`G^3`, :math:`Q^2`, :math:`QG`, :math:`GQ`, :math:`\vec{k}^TG`,
+    :math:`\vec{k}^TG^2`, and :math:`\vec{k}^TQ` are needed, so
+    constructing it costs no more than constructing
+    :class:`EulerHomodyneIntegrator`. Integration conditioned on a
+    measurement record uses the scheme of :class:`EulerHomodyneIntegrator`.
+
+    Parameters
+    ----------
+    c_op : numpy.array
+        The coupling operator
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H : numpy.array
+        The plant Hamiltonian
+    basis : list of numpy.array, optional
+        The Hermitian basis to vectorize the operators in terms of (with the
+        component proportional to the identity in last place). If no basis is
+        provided the generalized Gell-Mann basis will be used.
+    drift_rep : numpy.array, optional
+        The real matrix Q that acts on the vectorized rho as the deterministic
+        evolution operator. Will save computation time if already known and
+        don't need to calculate from `c_op`, `M_sq`, `N`, and `H`.
+    diffusion_reps : dict of numpy.array, optional
+        The real matrix G and row vector k_T that act on the vectorized rho as
+        the stochastic evolution operator.  Will save computation time if
+        already known and don't need to calculate from `c_op`, `M_sq`, and `N`.
+    use_sparse : bool, optional
+        Whether to build and apply the superoperators as
+        ``scipy.sparse.csr_matrix`` (worthwhile for large systems whose
+        superoperators are mostly zero).
+
+    """
+
+    def _step_rule(self):
+        return sde.time_ind_platen_1_5_step(lambda rho: self.a_fn(rho, 0),
+                                            lambda rho: self.b_fn(rho, 0))
+
+    def _increments(self, times, U1s, U2s):
+        increments = super(Platen_1_5_HomodyneIntegrator,
+                           self)._increments(times, U1s, U2s)
+        if U2s is None:
+            U2s = _std_normals_like(times, increments[0])
+        return increments + [U2s]
+
+class FaultyMilsteinHomodyneIntegrator(MilsteinHomodyneIntegrator):
+    r"""Integrator included to test if grid convergence could identify an error
+    I originally had in my Milstein integrator (missing a factor of 1/2 in front
+    of the term that's added to the Euler scheme)
+
+    """
+
+    def _step_rule(self):
+        return sde.faulty_milstein_step(self.a_fn, self.b_fn, self.b_dx_b_fn)
+
+class _TaylorCoefficients:
+    r"""Time-independent coefficient functions shared by the Taylor
+    integrators, built from the superoperators and their products
+    :math:`G^2`, :math:`\vec{k}^TG`, :math:`Q^2`, :math:`QG`, :math:`GQ`,
+    and :math:`\vec{k}^TQ`.
 
     """
     def a_fn(self, rho):
-        return np.dot(self.Q, rho)
+        return _mat_vec(self.Q, rho)
 
     def b_fn(self, rho):
-        return np.dot(self.k_T, rho)*rho + np.dot(self.G, rho)
+        return _row_dot(self.k_T, rho)*rho + _mat_vec(self.G, rho)
 
     def b_dx_b_fn(self, rho):
         return b_dx_b(self.G2, self.k_T_G, self.G, self.k_T, rho)
@@ -745,17 +1764,66 @@ class Taylor_1_5_HomodyneIntegrator(Strong_1_5_HomodyneIntegrator):
     def a_dx_a_fn(self, rho):
         return a_dx_a(self.Q2, rho)
 
+    def b_b_dx_dx_b_fn(self, rho):
+        return b_b_dx_dx_b(self.G, self.k_T, self.k_T_G, rho)
+
+class Taylor_1_5_HomodyneIntegrator(_TaylorCoefficients,
+                                    Strong_1_5_HomodyneIntegrator):
+    r"""Order 1.5 Taylor ntegrator for the conditional Gaussian master equation.
+
+    Parameters
+    ----------
+    c_op : numpy.array
+        The coupling operator
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H : numpy.array
+        The plant Hamiltonian
+    basis : list of numpy.array, optional
+        The Hermitian basis to vectorize the operators in terms of (with the
+        component proportional to the identity in last place). If no basis is
+        provided the generalized Gell-Mann basis will be used.
+    drift_rep : numpy.array, optional
+        The real matrix Q that acts on the vectorized rho as the deterministic
+        evolution operator. Will save computation time if already known and
+        don't need to calculate from `c_op`, `M_sq`, `N`, and `H`.
+    diffusion_reps : dict of numpy.array, optional
+        The real matrix G and row vector k_T that act on the vectorized rho as
+        the stochastic evolution operator.  Will save computation time if
+        already known and don't need to calculate from `c_op`, `M_sq`, and `N`.
+    product_reps : dict of numpy.array, optional
+        Precomputed products of the superoperators (``'k_T_G'`` and ``'G2'``
+        for order 1 integrators, additionally ``'G3'``, ``'Q2'``, ``'QG'``,
+        ``'GQ'``, ``'k_T_G2'``, and ``'k_T_Q'`` for order 1.5 integrators),
+        e.g. from ``system_builder.AffineModel``.
+    use_sparse : bool, optional
+        Whether to build and apply the superoperators as
+        ``scipy.sparse.csr_matrix`` (worthwhile for large systems whose
+        superoperators are mostly zero).
+
+    """
     def b_dx_b_dx_b_fn(self, rho):
         return b_dx_b_dx_b(self.G3, self.G2, self.G, self.k_T, self.k_T_G,
                            self.k_T_G2, rho)
 
-    def b_b_dx_dx_b_fn(self, rho):
-        return b_b_dx_dx_b(self.G, self.k_T, self.k_T_G, rho)
-
     def b_b_dx_dx_a_fn(self, rho):
         return 0
 
-    def integrate(self, rho_0, times, U1s=None, U2s=None):
+    def _step_rule(self):
+        return taylor_1_5_step(self.Q, self.G, self.k_T, self.G2, self.k_T_G,
+                               self.G3, self.k_T_G2, self.Q2, self.QG, self.GQ,
+                               self.k_T_Q)
+
+    def _increments(self, times, U1s, U2s):
+        increments = super(Taylor_1_5_HomodyneIntegrator,
+                           self)._increments(times, U1s, U2s)
+        if U2s is None:
+            U2s = _std_normals_like(times, increments[0])
+        return increments + [U2s]
+
+    def integrate(self, rho_0, times, U1s=None, U2s=None, save_every=1):
         r"""Integrate the initial value problem.
 
         Integrate for a sequence of times with a given initial condition (and
@@ -774,27 +1842,111 @@ class Taylor_1_5_HomodyneIntegrator(Strong_1_5_HomodyneIntegrator):
         U2s: numpy.array(len(times) - 1)
             Unused, included to make the argument list uniform with
             higher-order integrators.
+        save_every: int, optional
+            Only store :math:`\rho` at every `save_every`-th time point, i.e.
+            at ``times[::save_every]``.
 
         Returns
         -------
         Solution
-            The state of :math:`\rho` for all specified times
+            The state of :math:`\rho` for all saved times
 
         """
+        if not _uses_step_rule(self, Taylor_1_5_HomodyneIntegrator):
+            return super(Taylor_1_5_HomodyneIntegrator, self).integrate(
+                    rho_0, times, U1s, U2s, save_every)
         rho_0_vec = sb.vectorize(rho_0, self.basis).real
-        if U1s is None:
-            U1s = np.random.randn(len(times) -1)
-        if U2s is None:
-            U2s = np.random.randn(len(times) -1)
-
-        vec_soln = sde.time_ind_taylor_1_5(self.a_fn, self.b_fn, self.b_dx_b_fn,
-                                           self.b_dx_a_fn, self.a_dx_b_fn,
-                                           self.a_dx_a_fn, self.b_dx_b_dx_b_fn,
-                                           self.b_b_dx_dx_b_fn,
-                                           self.b_b_dx_dx_a_fn,
-                                           rho_0_vec, times, U1s, U2s)
+        U1s, U2s = self._increments(times, U1s, U2s)
+
+        sde._check_increments(times, [U1s, U2s], save_every)
+        args = _kernel_args(self.Q, self.G, self.k_T, self.G2, self.k_T_G,
+                            self.G3, self.k_T_G2, self.Q2, self.QG, self.GQ,
+                            self.k_T_Q, rho_0_vec, np.asarray(times),
+                            np.asarray(U1s), np.asarray(U2s))
+        dt = _uniform_dt(times)
+        if args is not None and np.ndim(U1s) == 1 and np.ndim(U2s) == 1:
+            vec_soln = _kernels.taylor_1_5(*args, save_every=save_every)
+        elif (dt is not None and np.ndim(U1s) == 1 and np.ndim(U2s) == 1 and
+              _all_dense(self.Q, self.G, self.G2, self.G3, self.Q2, self.QG,
+                         self.GQ)):
+            sqrtdt = np.sqrt(dt)
+            dt_3_2 = dt*sqrtdt
+            vec_soln = _uniform_homodyne(
+                    [np.eye(self.Q.shape[0]) + self.Q*dt + self.Q2*dt**2/2,
+                     self.G*sqrtdt, self.G2*dt, self.Q*dt, self.QG*dt_3_2,
+                     self.GQ*dt_3_2, self.G3*dt_3_2],
+                    [self.k_T*sqrtdt, self.k_T_G*dt, self.k_T_Q*dt_3_2,
+                     self.k_T_G2*dt_3_2], _taylor_1_5_coeffs, rho_0_vec,
+                    times, [U1s, U2s], save_every)
+        else:
+            vec_soln = sde.step_all(self._step_rule(), rho_0_vec, times,
+                                    [U1s, U2s], save_every)
         return Solution(vec_soln, self.basis)
 
+class WeakTaylor_2_0_HomodyneIntegrator(_TaylorCoefficients,
+                                        Strong_1_0_HomodyneIntegrator):
+    r"""Weak order 2.0 Taylor integrator for the conditional Gaussian master
+    equation.
+
+    Trajectories are only correct in distribution (see
+    ``sde.time_ind_weak_taylor_2``), but averages of observables over an
+    ensemble have a bias of order :math:`\Delta t^2` rather than the
+    :math:`\Delta t` of :class:`EulerHomodyneIntegrator`. The noise can be
+    drawn from ``sde.three_point_increments``, which is cheaper than Gaussian
+    noise, and is by default.
+
+    Parameters
+    ----------
+    c_op : numpy.array
+        The coupling operator
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H : numpy.array
+        The plant Hamiltonian
+    basis : list of numpy.array, optional
+        The Hermitian basis to vectorize the operators in terms of (with the
+        component proportional to the identity in last place). If no basis is
+        provided the generalized Gell-Mann basis will be used.
+    drift_rep : numpy.array, optional
+        The real matrix Q that acts on the vectorized rho as the deterministic
+        evolution operator. Will save computation time if already known and
+        don't need to calculate from `c_op`, `M_sq`, `N`, and `H`.
+    diffusion_reps : dict of numpy.array, optional
+        The real matrix G and row vector k_T that act on the vectorized rho as
+        the stochastic evolution operator.  Will save computation time if
+        already known and don't need to calculate from `c_op`, `M_sq`, and `N`.
+    product_reps : dict of numpy.array, optional
+        Precomputed products of the superoperators (``'k_T_G'``, ``'G2'``,
+        ``'Q2'``, ``'QG'``, ``'GQ'``, and ``'k_T_Q'``; the products
+        ``'G3'`` and ``'k_T_G2'`` of the order 1.5 integrators aren't
+        needed), e.g. from ``system_builder.AffineModel``.
+    use_sparse : bool, optional
+        Whether to build and apply the superoperators as
+        ``scipy.sparse.csr_matrix`` (worthwhile for large systems whose
+        superoperators are mostly zero).
+
+    """
+    def __init__(self, c_op, M_sq, N, H, basis=None, drift_rep=None,
+                 diffusion_reps=None, product_reps=None, **kwargs):
+        super(WeakTaylor_2_0_HomodyneIntegrator, self).__init__(
+                c_op, M_sq, N, H, basis, drift_rep, diffusion_reps,
+                product_reps, **kwargs)
+        self.Q2, self.QG, self.GQ, self.k_T_Q = _drift_products(
+                self.Q, self.G, self.k_T, product_reps)
+
+    def _step_rule(self):
+        return weak_taylor_2_step(self.Q, self.G, self.k_T, self.G2,
+                                  self.k_T_G, self.Q2, self.QG, self.GQ,
+                                  self.k_T_Q)
+
+    def _increments(self, times, U1s, U2s):
+        if U1s is None:
+            U1s = (_three_point_increments() if times is None else
+                   sde.three_point_increments(len(times) - 1))
+        return [U1s]
+
 class TrDecMilsteinHomodyneIntegrator(MilsteinHomodyneIntegrator):
     """Milstein integrator that does not preserve trace.
 
@@ -810,8 +1962,8 @@ class TrDecMilsteinHomodyneIntegrator(MilsteinHomodyneIntegrator):
                                                               basis, drift_rep,
                                                               diffusion_reps,
                                                               **kwargs)
-        self.k_T = 0
-        self.k_T_G = np.zeros(self.G.shape)
+        self.k_T = np.zeros(self.G.shape[0])
+        self.k_T_G = np.zeros(self.G.shape[0])
 
 class IntegratorFactory:
     r"""Factory that pre-computes things for other integrators.
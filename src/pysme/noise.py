@@ -0,0 +1,170 @@
+"""Reproducible noise streams for independent trajectories
+
+  .. module:: noise.py
+     :synopsis: Reproducible noise streams for independent trajectories
+  .. moduleauthor:: Jonathan Gross <jarthurgross@gmail.com>
+
+"""
+
+import itertools
+import numpy as np
+from . import grid_conv
+
+#: Index of the stream supplying :math:`U_1` (for :math:`\Delta W`).
+U1_STREAM = 0
+#: Index of the stream supplying :math:`U_2` (for :math:`\Delta Z`).
+U2_STREAM = 1
+
+class NoiseSource:
+    r"""Standard-normal increments for any number of trajectories, each
+    reproducible from the seed and its trajectory index alone.
+
+    Every (trajectory, stream) pair gets its own counter-based bit generator
+    (Philox by default) seeded by ``numpy.random.SeedSequence(seed,
+    spawn_key=(trajectory, stream))``, so parallel workers can generate any
+    subset of trajectories independently and still agree with a serial run.
+    The increments for :math:`\Delta W` and :math:`\Delta Z` come from
+    separate streams, so integrators of different orders driven by the same
+    trajectory see the same Wiener process.
+
+    Increments are drawn lazily in chunks, and may be coarsened on the fly by
+    repeated application of ``grid_conv.double_normals``, giving the noise for
+    a grid with :math:`2^\text{coarsen}` times the step size that is
+    consistent with the fine grid.
+
+    Parameters
+    ----------
+    seed : int or sequence of int, optional
+        Entropy for the root ``numpy.random.SeedSequence``. Fresh entropy is
+        drawn from the operating system if not given (available afterwards as
+        the `seed` attribute so the run can be repeated).
+    bit_generator : type, optional
+        The ``numpy.random.BitGenerator`` subclass to use for each stream.
+    chunk_size : int, optional
+        Number of (coarsened) increments drawn at a time by the iterators.
+
+    """
+    def __init__(self, seed=None, bit_generator=np.random.Philox,
+                 chunk_size=1024):
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.bit_generator = bit_generator
+        self.chunk_size = chunk_size
+
+    def generator(self, trajectory, stream=U1_STREAM):
+        """Return a fresh generator for one stream of one trajectory.
+
+        """
+        seed_seq = np.random.SeedSequence(self.seed,
+                                          spawn_key=(trajectory, stream))
+        return np.random.Generator(self.bit_generator(seed_seq))
+
+    def _fine_chunks(self, trajectory, stream, coarsen):
+        generator = self.generator(trajectory, stream)
+        while True:
+            yield generator.standard_normal(self.chunk_size*2**coarsen)
+
+    def iter_U1_chunks(self, trajectory, coarsen=0):
+        r"""Generate the :math:`U_1` increments of a trajectory indefinitely,
+        in chunks of `chunk_size`.
+
+        Parameters
+        ----------
+        trajectory : int
+            Index of the trajectory
+        coarsen : int, optional
+            Number of times to double the time step
+
+        Yields
+        ------
+        numpy.array
+            The next `chunk_size` increments
+
+        """
+        for U1s in self._fine_chunks(trajectory, U1_STREAM, coarsen):
+            for _ in range(coarsen):
+                U1s = grid_conv.double_normals(U1s)
+            yield U1s
+
+    def iter_U2_chunks(self, trajectory, coarsen=0):
+        r"""Generate the :math:`U_2` increments of a trajectory indefinitely,
+        in chunks of `chunk_size`.
+
+        Coarsening :math:`U_2` requires the fine :math:`U_1` increments, which
+        are regenerated from their own stream, so this can be consumed
+        independently of ``iter_U1_chunks``.
+
+        Parameters
+        ----------
+        trajectory : int
+            Index of the trajectory
+        coarsen : int, optional
+            Number of times to double the time step
+
+        Yields
+        ------
+        numpy.array
+            The next `chunk_size` increments
+
+        """
+        for U1s, U2s in zip(self._fine_chunks(trajectory, U1_STREAM, coarsen),
+                            self._fine_chunks(trajectory, U2_STREAM, coarsen)):
+            for _ in range(coarsen):
+                U1s, U2s = grid_conv.double_normals(U1s, U2s)
+            yield U2s
+
+    def iter_U1s(self, trajectory, coarsen=0):
+        """Generate the :math:`U_1` increments of a trajectory one at a time
+        (e.g. for ``iter_integrate``).
+
+        """
+        return itertools.chain.from_iterable(
+                self.iter_U1_chunks(trajectory, coarsen))
+
+    def iter_U2s(self, trajectory, coarsen=0):
+        """Generate the :math:`U_2` increments of a trajectory one at a time
+        (e.g. for ``iter_integrate``).
+
+        """
+        return itertools.chain.from_iterable(
+                self.iter_U2_chunks(trajectory, coarsen))
+
+    def U1s(self, trajectories, n_steps, coarsen=0):
+        r"""Return the first `n_steps` :math:`U_1` increments of one or more
+        trajectories.
+
+        Parameters
+        ----------
+        trajectories : int or sequence of int
+            Index of the trajectory, or indices of several trajectories
+        n_steps : int
+            Number of increments for each trajectory
+        coarsen : int, optional
+            Number of times to double the time step
+
+        Returns
+        -------
+        numpy.array, shape=(n_steps,) or (len(trajectories), n_steps)
+            The increments, one row per trajectory if several were requested
+            (as expected by ``integrate_ensemble``)
+
+        """
+        return self._take(self.iter_U1_chunks, trajectories, n_steps, coarsen)
+
+    def U2s(self, trajectories, n_steps, coarsen=0):
+        r"""Return the first `n_steps` :math:`U_2` increments of one or more
+        trajectories (see ``U1s``).
+
+        """
+        return self._take(self.iter_U2_chunks, trajectories, n_steps, coarsen)
+
+    def _take(self, iter_chunks, trajectories, n_steps, coarsen):
+        if np.ndim(trajectories) > 0:
+            return np.array([self._take(iter_chunks, trajectory, n_steps,
+                                        coarsen)
+                             for trajectory in trajectories])
+        chunks = iter_chunks(trajectories, coarsen)
+        n_chunks = -(-n_steps//self.chunk_size)
+        if n_chunks == 0:
+            return np.empty(0)
+        return np.concatenate([next(chunks)
+                               for _ in range(n_chunks)])[:n_steps]
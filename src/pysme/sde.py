@@ -6,9 +6,432 @@
 
 """
 
+import functools
 import numpy as np
+from scipy import linalg, sparse
+from scipy.sparse import linalg as sparse_linalg
 
-def euler(drift_fn, diffusion_fn, X0, ts, Us):
+def iter_step_all(step, X0, ts, increments, chunk_size=1024, save_every=1):
+    r"""Repeatedly apply a single-step integration rule, yielding the states in
+    blocks.
+
+    The time points and increments may be any iterables (e.g. generators
+    reading a measurement record from disk) and are consumed one step at a
+    time, so only :math:`O(\text{chunk_size})` memory is used however long the
+    trajectory is.
+
+    Parameters
+    ----------
+    step : callable(X, t, dt, *increment)
+        Returns :math:`\vec{X}_{i+1}` given :math:`\vec{X}_i`, :math:`t_i`,
+        :math:`\Delta t_i`, and the increments for the step (e.g. one of the
+        rules returned by ``euler_step``, ``milstein_step``, etc.).
+    X0 : numpy.array
+        Initial condition on X
+    ts : iterable of float
+        A sequence of time points for which to solve for X.  The initial value
+        point should be the first element of this sequence.
+    increments : list of iterables
+        Noise increments (or measurement outcomes) for each time step.
+        Stepping stops when `ts` or any of these runs out.
+    chunk_size : int, optional
+        Number of saved states in each yielded block.
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point.
+
+    Yields
+    ------
+    tuple of numpy.array
+        Blocks of saved times and the corresponding values of X (the first
+        block starting with `X0`).
+
+    """
+    ts = iter(ts)
+    t = next(ts)
+    X = np.array(X0)
+    t_block = np.empty(chunk_size)
+    X_block = np.empty((chunk_size,) + X.shape,
+                       dtype=np.result_type(X, np.float64))
+    t_block[0] = t
+    X_block[0] = X
+    n_saved = 1
+
+    for i, (t_next, increment) in enumerate(zip(ts, zip(*increments))):
+        X = step(X, t, t_next - t, *increment)
+        t = t_next
+        if (i + 1) % save_every == 0:
+            if n_saved == chunk_size:
+                yield t_block, X_block
+                t_block = np.empty_like(t_block)
+                X_block = np.empty_like(X_block)
+                n_saved = 0
+            t_block[n_saved] = t
+            X_block[n_saved] = X
+            n_saved += 1
+
+    yield t_block[:n_saved], X_block[:n_saved]
+
+def _check_increments(ts, increments, save_every):
+    """Raise ``ValueError`` unless every array of increments covers all the
+    time steps and `save_every` is positive."""
+    if save_every < 1:
+        raise ValueError('save_every must be at least 1, got {}'.format(
+            save_every))
+    for increment in increments:
+        if len(increment) < len(ts) - 1:
+            raise ValueError('Need {} increments for {} times, got {}'.format(
+                len(ts) - 1, len(ts), len(increment)))
+
+def step_all(step, X0, ts, increments, save_every=1):
+    r"""Repeatedly apply a single-step integration rule.
+
+    Writes into a preallocated array, so the cost is linear in the number of
+    steps, and only keeps every `save_every`-th state, so trajectories can be
+    stepped finely while storing only the samples needed.
+
+    Parameters
+    ----------
+    step : callable(X, t, dt, *increment)
+        Returns :math:`\vec{X}_{i+1}` given :math:`\vec{X}_i`, :math:`t_i`,
+        :math:`\Delta t_i`, and the increments for the step.
+    X0 : numpy.array
+        Initial condition on X
+    ts : numpy.array
+        A sequence of time points for which to solve for X.  The initial value
+        point should be the first element of this sequence.
+    increments : list of numpy.array, each shape=(len(ts) - 1)
+        Noise increments (or measurement outcomes) for each time step. A
+        ``ValueError`` is raised if any of them is too short.
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
+
+    Returns
+    -------
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time, with the initial
+        value `X0` in the first row.
+
+    """
+    _check_increments(ts, increments, save_every)
+    n_saved = (len(ts) - 1) // save_every + 1
+    _, Xs = next(iter_step_all(step, X0, ts, increments, n_saved, save_every))
+    return Xs
+
+def two_point_increments(size, rng=None):
+    r"""Sample normalized increments :math:`\pm1` with equal probability.
+
+    They match the moments of a standard normal distribution up to third
+    order, which is all weak order 1 schemes (e.g. ``euler``) need.
+
+    Parameters
+    ----------
+    size : int or tuple of int
+        The shape of the array of samples
+    rng : numpy.random.Generator or numpy.random.RandomState, optional
+        Source of randomness (the global ``numpy.random`` state by default)
+
+    Returns
+    -------
+    numpy.array
+        The samples
+
+    """
+    if rng is None:
+        rng = np.random
+    return rng.choice(np.array([-1., 1.]), size)
+
+def three_point_increments(size, rng=None):
+    r"""Sample normalized increments :math:`\pm\sqrt{3}` with probability
+    :math:`1/6` each and :math:`0` with probability :math:`2/3`.
+
+    They match the moments of a standard normal distribution up to fifth
+    order, which is all weak order 2 schemes (e.g. ``time_ind_weak_taylor_2``)
+    need.
+
+    Parameters
+    ----------
+    size : int or tuple of int
+        The shape of the array of samples
+    rng : numpy.random.Generator or numpy.random.RandomState, optional
+        Source of randomness (the global ``numpy.random`` state by default)
+
+    Returns
+    -------
+    numpy.array
+        The samples
+
+    """
+    if rng is None:
+        rng = np.random
+    return rng.choice(np.array([-np.sqrt(3), 0., np.sqrt(3)]), size,
+                      p=[1/6, 2/3, 1/6])
+
+def euler_step(drift_fn, diffusion_fn):
+    r"""Return the single-step rule used by ``euler``, taking the normalized
+    Wiener increment :math:`U_i` as its increment."""
+    def step(X, t, dt, U):
+        return X + drift_fn(X, t)*dt + diffusion_fn(X, t)*np.sqrt(dt)*U
+    return step
+
+def meas_euler_step(drift_fn, diffusion_fn, dW_fn):
+    r"""Return the single-step rule used by ``meas_euler``, taking the
+    incremental measurement outcome :math:`\Delta M_i` as its increment."""
+    def step(X, t, dt, dM):
+        dW = dW_fn(dM, dt, X, t)
+        return X + drift_fn(X, t)*dt + diffusion_fn(X, t)*dW
+    return step
+
+def milstein_step(drift, diffusion, b_dx_b):
+    r"""Return the single-step rule used by ``milstein``, taking the
+    normalized Wiener increment :math:`U_i` as its increment."""
+    def step(X, t, dt, U):
+        dW = np.sqrt(dt)*U
+        return (X + drift(X, t)*dt + diffusion(X, t)*dW +
+                b_dx_b(X, t)*(dW**2 - dt)/2)
+    return step
+
+def meas_milstein_step(drift_fn, diffusion_fn, b_dx_b_fn, dW_fn):
+    r"""Return the single-step rule used by ``meas_milstein``, taking the
+    incremental measurement outcome :math:`\Delta M_i` as its increment."""
+    def step(X, t, dt, dM):
+        dW = dW_fn(dM, dt, X, t)
+        return (X + drift_fn(X, t)*dt + diffusion_fn(X, t)*dW +
+                b_dx_b_fn(X, t)*(dW**2 - dt)/2)
+    return step
+
+def faulty_milstein_step(drift, diffusion, b_dx_b):
+    r"""Return the single-step rule used by ``faulty_milstein``, taking the
+    normalized Wiener increment :math:`U_i` as its increment."""
+    def step(X, t, dt, U):
+        dW = np.sqrt(dt)*U
+        return (X + drift(X, t)*dt + diffusion(X, t)*dW +
+                b_dx_b(X, t)*(dW**2 - dt))
+    return step
+
+def adaptive_milstein_step(drift, diffusion, b_dx_b, atol=1e-6, rtol=1e-3,
+                           max_depth=16, rng=None):
+    r"""Return the single-step rule used by ``adaptive_milstein``, taking the
+    normalized Wiener increment :math:`U_i` as its increment.
+
+    Each interval is split in half, with the Wiener increment refined by a
+    Brownian bridge, until a Milstein step over every subinterval agrees with
+    two Milstein steps over its halves to within tolerance, or the interval
+    has been halved `max_depth` times.
+
+    """
+    if rng is None:
+        rng = np.random
+    def milstein(X, t, h, dW):
+        return (X + drift(X, t)*h + diffusion(X, t)*dW +
+                b_dx_b(X, t)*(dW**2 - h)/2)
+    def step(X, t, dt, U):
+        # Subintervals still to be taken, latest first.
+        pending = [(dt, np.sqrt(dt)*U, 0)]
+        while pending:
+            h, dW, depth = pending.pop()
+            # Sample W at the midpoint conditioned on the endpoints.
+            dW_1 = dW/2 + np.sqrt(h)/2*rng.standard_normal(np.shape(dW))
+            full = milstein(X, t, h, dW)
+            halves = milstein(milstein(X, t, h/2, dW_1), t + h/2, h/2,
+                              dW - dW_1)
+            error = np.max(np.abs(full - halves))
+            tol = atol + rtol*np.max(np.abs(X))
+            if error <= tol or depth >= max_depth:
+                X = full
+                t = t + h
+            else:
+                pending.append((h/2, dW - dW_1, depth + 1))
+                pending.append((h/2, dW_1, depth + 1))
+        return X
+    return step
+
+def _dt_key(dt):
+    # Time steps from e.g. numpy.linspace differ by rounding, so compare them
+    # to 12 significant digits when caching per-step-size matrices.
+    return float('{:.12g}'.format(dt))
+
+def drift_implicit_solver(Q, theta=1., maxsize=16):
+    r"""Return a function solving :math:`(I-\theta\Delta tQ)\vec{Y}=\vec{R}`
+    for :math:`\vec{Y}`.
+
+    The factorization of :math:`I-\theta\Delta tQ` is computed once for each
+    time step (time steps within rounding of each other are treated as equal)
+    and reused for all later steps of that size, the `maxsize` most recently
+    used factorizations being kept.
+
+    Parameters
+    ----------
+    Q : numpy.array or scipy.sparse matrix
+        The matrix of the linear drift
+    theta : float, optional
+        The weight of the implicit part of the drift
+    maxsize : int, optional
+        The number of factorizations to keep
+
+    Returns
+    -------
+    callable(R, dt)
+        Solves for a vector or for each row of a block of vectors
+
+    """
+    dim = Q.shape[0]
+    @functools.lru_cache(maxsize=maxsize)
+    def factorization(dt):
+        if sparse.issparse(Q):
+            return sparse_linalg.splu(sparse.csc_matrix(
+                sparse.identity(dim) - theta*dt*Q)).solve
+        lu_piv = linalg.lu_factor(np.eye(dim) - theta*dt*Q)
+        return lambda R: linalg.lu_solve(lu_piv, R, check_finite=False)
+    def solve(R, dt):
+        return factorization(_dt_key(dt))(R.T).T
+    return solve
+
+def drift_implicit_euler_step(Q, diffusion, theta=1., solve=None):
+    r"""Return the single-step rule used by ``drift_implicit_euler``, taking
+    the normalized Wiener increment :math:`U_i` as its increment."""
+    if solve is None:
+        solve = drift_implicit_solver(Q, theta)
+    def step(X, t, dt, U):
+        R = (X + (1 - theta)*Q.dot(X.T).T*dt +
+             diffusion(X, t)*np.sqrt(dt)*U)
+        return solve(R, dt)
+    return step
+
+def drift_implicit_milstein_step(Q, diffusion, b_dx_b, theta=1., solve=None):
+    r"""Return the single-step rule used by ``drift_implicit_milstein``,
+    taking the normalized Wiener increment :math:`U_i` as its increment."""
+    if solve is None:
+        solve = drift_implicit_solver(Q, theta)
+    def step(X, t, dt, U):
+        dW = np.sqrt(dt)*U
+        R = (X + (1 - theta)*Q.dot(X.T).T*dt + diffusion(X, t)*dW +
+             b_dx_b(X, t)*(dW**2 - dt)/2)
+        return solve(R, dt)
+    return step
+
+def exponential_propagator(Q, maxsize=16):
+    r"""Return a function applying :math:`\exp(Q\Delta t)`.
+
+    For a dense `Q` the matrix exponential is computed once for each time step
+    (time steps within rounding of each other are treated as equal) and reused
+    for all later steps of that size, the `maxsize` most recently used
+    propagators being kept. For a sparse `Q` the action of the exponential is
+    computed directly with ``scipy.sparse.linalg.expm_multiply``.
+
+    Parameters
+    ----------
+    Q : numpy.array or scipy.sparse matrix
+        The matrix of the linear drift
+    maxsize : int, optional
+        The number of propagators to keep
+
+    Returns
+    -------
+    callable(X, dt)
+        Propagates a vector or each row of a block of vectors
+
+    """
+    if sparse.issparse(Q):
+        Q = sparse.csc_matrix(Q)
+        def propagate(X, dt):
+            return sparse_linalg.expm_multiply(Q*dt, X.T).T
+        return propagate
+    @functools.lru_cache(maxsize=maxsize)
+    def propagator(dt):
+        return linalg.expm(Q*dt)
+    def propagate(X, dt):
+        return propagator(_dt_key(dt)).dot(X.T).T
+    return propagate
+
+def exponential_euler_step(Q, diffusion, propagate=None):
+    r"""Return the single-step rule used by ``exponential_euler``, taking the
+    normalized Wiener increment :math:`U_i` as its increment."""
+    if propagate is None:
+        propagate = exponential_propagator(Q)
+    def step(X, t, dt, U):
+        return propagate(X + diffusion(X, t)*np.sqrt(dt)*U, dt)
+    return step
+
+def exponential_milstein_step(Q, diffusion, b_dx_b, propagate=None):
+    r"""Return the single-step rule used by ``exponential_milstein``, taking
+    the normalized Wiener increment :math:`U_i` as its increment."""
+    if propagate is None:
+        propagate = exponential_propagator(Q)
+    def step(X, t, dt, U):
+        dW = np.sqrt(dt)*U
+        return propagate(X + diffusion(X, t)*dW +
+                         b_dx_b(X, t)*(dW**2 - dt)/2, dt)
+    return step
+
+def time_ind_weak_taylor_2_step(drift, diffusion, b_dx_b, b_dx_a, a_dx_b,
+                                a_dx_a, b_b_dx_dx_b, b_b_dx_dx_a):
+    r"""Return the single-step rule used by ``time_ind_weak_taylor_2``, taking
+    the normalized increment :math:`U_i` as its increment."""
+    def step(X, t, dt, U):
+        dW = np.sqrt(dt)*U
+        return (X + drift(X)*dt + diffusion(X)*dW +
+                b_dx_b(X)*(dW**2 - dt)/2 +
+                (b_dx_a(X) + a_dx_b(X) + b_b_dx_dx_b(X)/2)*dW*dt/2 +
+                (a_dx_a(X) + b_b_dx_dx_a(X)/2)*dt**2/2)
+    return step
+
+def platen_1_0_step(drift, diffusion):
+    r"""Return the single-step rule used by ``platen_1_0``, taking the
+    normalized Wiener increment :math:`U_i` as its increment."""
+    def step(X, t, dt, U):
+        sqrtdt = np.sqrt(dt)
+        dW = sqrtdt*U
+        a = drift(X, t)
+        b = diffusion(X, t)
+        Y = X + a*dt + b*sqrtdt
+        return (X + a*dt + b*dW +
+                (diffusion(Y, t) - b)*(dW**2 - dt)/(2*sqrtdt))
+    return step
+
+def time_ind_platen_1_5_step(drift, diffusion):
+    r"""Return the single-step rule used by ``time_ind_platen_1_5``, taking
+    the two normalized increments :math:`U_{1,i}` and :math:`U_{2,i}` as its
+    increments."""
+    def step(X, t, dt, U1, U2):
+        sqrtdt = np.sqrt(dt)
+        dW = U1*sqrtdt
+        dZ = (U1 + U2/np.sqrt(3))*sqrtdt*dt/2
+        a = drift(X)
+        b = diffusion(X)
+        Y_plus = X + a*dt + b*sqrtdt
+        Y_minus = X + a*dt - b*sqrtdt
+        a_plus = drift(Y_plus)
+        a_minus = drift(Y_minus)
+        b_plus = diffusion(Y_plus)
+        b_minus = diffusion(Y_minus)
+        Phi_plus = Y_plus + b_plus*sqrtdt
+        Phi_minus = Y_plus - b_plus*sqrtdt
+        return (X + b*dW + (a_plus - a_minus)*dZ/(2*sqrtdt) +
+                (a_plus + 2*a + a_minus)*dt/4 +
+                (b_plus - b_minus)*(dW**2 - dt)/(4*sqrtdt) +
+                (b_plus - 2*b + b_minus)*(dW*dt - dZ)/(2*dt) +
+                (diffusion(Phi_plus) - diffusion(Phi_minus) - b_plus +
+                 b_minus)*(dW**2/3 - dt)*dW/(4*dt))
+    return step
+
+def time_ind_taylor_1_5_step(drift, diffusion, b_dx_b, b_dx_a, a_dx_b,
+                             a_dx_a, b_dx_b_dx_b, b_b_dx_dx_b, b_b_dx_dx_a):
+    r"""Return the single-step rule used by ``time_ind_taylor_1_5``, taking
+    the two normalized increments :math:`U_{1,i}` and :math:`U_{2,i}` as its
+    increments."""
+    def step(X, t, dt, U1, U2):
+        sqrtdt = np.sqrt(dt)
+        dW = U1*sqrtdt
+        dZ = (U1 + U2/np.sqrt(3))*sqrtdt*dt/2
+        return (X + drift(X)*dt + diffusion(X)*dW +
+                b_dx_b(X)*(dW**2 - dt)/2 + b_dx_a(X)*dZ +
+                (a_dx_b(X)+b_b_dx_dx_b(X)/2)*(dW*dt - dZ) +
+                (a_dx_a(X)+b_b_dx_dx_a(X)/2)*dt**2/2 +
+                b_dx_b_dx_b(X)*(dW**2/3 - dt)*dW/2)
+    return step
+
+def euler(drift_fn, diffusion_fn, X0, ts, Us, save_every=1):
     r"""Integrate a system of ordinary stochastic differential equations subject
     to scalar noise:
 
@@ -40,29 +463,22 @@ def euler(drift_fn, diffusion_fn, X0, ts, Us):
     Us : array, shape=(len(t) - 1)
         Normalized Weiner increments for each time step (i.e. samples from a
         Gaussian distribution with mean 0 and variance 1).
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
 
     Returns
     -------
-    numpy.array, shape=(len(ts), len(X0))
-        Array containing the value of X for each desired time in t, with the
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
         initial value `X0` in the first row.
 
     """
 
-    dts = [tf - ti for tf, ti in zip(ts[1:], ts[:-1])]
-    # Scale the Weiner increments to the time increments.
-    sqrtdts = np.sqrt(dts)
-    dWs = np.product(np.array([sqrtdts, Us]), axis=0)
-
-    X = np.array([X0])
-
-    for t, dt, dW in zip(ts[:-1], dts, dWs):
-        X = np.vstack((X, X[-1] + drift_fn(X[-1], t)*dt +
-                       diffusion_fn(X[-1], t)*dW))
-
-    return X
+    return step_all(euler_step(drift_fn, diffusion_fn), X0, ts, [Us],
+                    save_every)
 
-def meas_euler(drift_fn, diffusion_fn, dW_fn, X0, ts, dMs):
+def meas_euler(drift_fn, diffusion_fn, dW_fn, X0, ts, dMs, save_every=1):
     r"""Integrate a system of ordinary stochastic differential equations
     conditioned on an incremental measurement record:
 
@@ -96,27 +512,22 @@ def meas_euler(drift_fn, diffusion_fn, dW_fn, X0, ts, dMs):
         point should be the first element of this sequence.
     dMs : array, shape=(len(t) - 1)
         Incremental measurement outcomes used to drive the SDE.
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
 
     Returns
     -------
-    numpy.array, shape=(len(ts), len(X0))
-        Array containing the value of X for each desired time in t, with the
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
         initial value `X0` in the first row.
 
     """
 
-    dts = [tf - ti for tf, ti in zip(ts[1:], ts[:-1])]
+    return step_all(meas_euler_step(drift_fn, diffusion_fn, dW_fn), X0, ts,
+                    [dMs], save_every)
 
-    X = np.array([X0])
-
-    for t, dt, dM in zip(ts[:-1], dts, dMs):
-        dW = dW_fn(dM, dt, X[-1], t)
-        X = np.vstack((X, X[-1] + drift_fn(X[-1], t)*dt +
-                       diffusion_fn(X[-1], t)*dW))
-
-    return X
-
-def milstein(drift, diffusion, b_dx_b, X0, ts, Us):
+def milstein(drift, diffusion, b_dx_b, X0, ts, Us, save_every=1):
     r"""Integrate a system of ordinary stochastic differential equations subject
     to scalar noise:
 
@@ -154,29 +565,23 @@ def milstein(drift, diffusion, b_dx_b, X0, ts, Us):
     Us : array, shape=(len(t) - 1)
         Normalized Weiner increments for each time step (i.e. samples from a
         Gaussian distribution with mean 0 and variance 1).
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
 
     Returns
     -------
-    numpy.array, shape=(len(ts), len(X0))
-        Array containing the value of X for each desired time in t, with the
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
         initial value `X0` in the first row.
 
     """
 
-    dts = [tf - ti for tf, ti in zip(ts[1:], ts[:-1])]
-    # Scale the Weiner increments to the time increments.
-    sqrtdts = np.sqrt(dts)
-    dWs = np.product(np.array([sqrtdts, Us]), axis=0)
-
-    X = np.array([X0])
-
-    for t, dt, dW in zip(ts[:-1], dts, dWs):
-        X = np.vstack((X, X[-1] + drift(X[-1], t)*dt + diffusion(X[-1], t)*dW +
-                      b_dx_b(X[-1], t)*(dW**2 - dt)/2))
-
-    return X
+    return step_all(milstein_step(drift, diffusion, b_dx_b), X0, ts, [Us],
+                    save_every)
 
-def meas_milstein(drift_fn, diffusion_fn, b_dx_b_fn, dW_fn, X0, ts, dMs):
+def meas_milstein(drift_fn, diffusion_fn, b_dx_b_fn, dW_fn, X0, ts, dMs,
+                  save_every=1):
     r"""Integrate a system of ordinary stochastic differential equations
     conditioned on an incremental measurement record:
 
@@ -216,30 +621,306 @@ def meas_milstein(drift_fn, diffusion_fn, b_dx_b_fn, dW_fn, X0, ts, dMs):
         point should be the first element of this sequence.
     dMs : numpy.array, shape=(len(t) - 1)
         Incremental measurement outcomes used to drive the SDE.
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
+
+    Returns
+    -------
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
+        initial value `X0` in the first row.
+
+    """
+
+    return step_all(meas_milstein_step(drift_fn, diffusion_fn, b_dx_b_fn,
+                                       dW_fn), X0, ts, [dMs], save_every)
+
+def adaptive_milstein(drift, diffusion, b_dx_b, X0, ts, Us, atol=1e-6,
+                      rtol=1e-3, max_depth=16, rng=None, save_every=1):
+    r"""Integrate a system of ordinary stochastic differential equations subject
+    to scalar noise, adapting the step size to the solution:
+
+    .. math::
+
+       d\vec{X}=\vec{a}(\vec{X},t)\,dt+\vec{b}(\vec{X},t)\,dW_t
+
+    Uses the Milstein method (see ``milstein``), estimating the error of each
+    step by comparing it with two Milstein steps over its halves (so both the
+    drift and the diffusion contribute). A step whose error exceeds
+    :math:`\text{atol}+\text{rtol}\max_\mu|X^\mu|` is split in two, the
+    Wiener increment :math:`\Delta W` over the step being divided by
+    sampling the midpoint of the Brownian bridge
+
+    .. math::
+
+       \Delta W^{(1)}=\frac{\Delta W}{2}+\frac{\sqrt{\Delta t}}{2}Z,\quad
+       \Delta W^{(2)}=\Delta W-\Delta W^{(1)}
+
+    with :math:`Z` a standard normal random variable, so the realized Wiener
+    path at the points of `ts` is the one given by `Us`. The time points in
+    `ts` can therefore be as coarse as the output requires, with the solver
+    only refining where the solution is changing quickly.
+
+    Parameters
+    ----------
+    drift : callable(X, t)
+        Computes the drift coefficient :math:`\vec{a}(\vec{X},t)`
+    diffusion : callable(X, t)
+        Computes the diffusion coefficient :math:`\vec{b}(\vec{X},t)`
+    b_dx_b : callable(X, t)
+        Computes the correction coefficient
+        :math:`\left(\vec{b}(\vec{X},t)\cdot
+        \vec{\nabla}_{\vec{X}}\right)\vec{b}(\vec{X},t)`
+    X0 : numpy.array
+        Initial condition on X
+    ts : numpy.array
+        A sequence of time points for which to solve for X.  The initial value
+        point should be the first element of this sequence.
+    Us : array, shape=(len(t) - 1)
+        Normalized Weiner increments for each time step (i.e. samples from a
+        Gaussian distribution with mean 0 and variance 1).
+    atol : float, optional
+        Absolute error tolerance for each step
+    rtol : float, optional
+        Error tolerance for each step relative to the largest component of X
+    max_depth : int, optional
+        Maximum number of times each interval of `ts` is halved
+    rng : numpy.random.Generator or numpy.random.RandomState, optional
+        Source of the normal samples refining the Wiener path (the global
+        ``numpy.random`` state by default)
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
+
+    Returns
+    -------
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
+        initial value `X0` in the first row.
+
+    """
+
+    step = adaptive_milstein_step(drift, diffusion, b_dx_b, atol, rtol,
+                                  max_depth, rng)
+    return step_all(step, X0, ts, [Us], save_every)
+
+def drift_implicit_euler(Q, diffusion, X0, ts, Us, theta=1., save_every=1):
+    r"""Integrate a system of ordinary stochastic differential equations with
+    linear drift subject to scalar noise:
+
+    .. math::
+
+       d\vec{X}=Q\vec{X}\,dt+\vec{b}(\vec{X},t)\,dW_t
+
+    Uses the drift-implicit Euler method:
+
+    .. math::
+
+       \vec{X}_{i+1}=\vec{X}_i+Q\left(\theta\vec{X}_{i+1}+
+       (1-\theta)\vec{X}_i\right)\Delta t_i+\vec{b}(\vec{X}_i,t_i)
+       \Delta W_i
+
+    where :math:`\Delta W_i=U_i\sqrt{\Delta t}`, :math:`U` being a normally
+    distributed random variable with mean 0 and variance 1. For
+    :math:`\theta\geq1/2` the drift is A-stable, so stiff drifts don't
+    restrict the step size.
+
+    Parameters
+    ----------
+    Q : numpy.array or scipy.sparse matrix
+        The matrix of the linear drift
+    diffusion : callable(X, t)
+        Computes the diffusion coefficient :math:`\vec{b}(\vec{X},t)`
+    X0 : numpy.array
+        Initial condition on X
+    ts : numpy.array
+        A sequence of time points for which to solve for X.  The initial value
+        point should be the first element of this sequence.
+    Us : array, shape=(len(t) - 1)
+        Normalized Weiner increments for each time step (i.e. samples from a
+        Gaussian distribution with mean 0 and variance 1).
+    theta : float, optional
+        The weight of the implicit part of the drift (1 for backward Euler,
+        1/2 for the trapezoidal rule)
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
+
+    Returns
+    -------
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
+        initial value `X0` in the first row.
+
+    """
+
+    return step_all(drift_implicit_euler_step(Q, diffusion, theta), X0, ts,
+                    [Us], save_every)
+
+def drift_implicit_milstein(Q, diffusion, b_dx_b, X0, ts, Us, theta=1.,
+                            save_every=1):
+    r"""Integrate a system of ordinary stochastic differential equations with
+    linear drift subject to scalar noise:
+
+    .. math::
+
+       d\vec{X}=Q\vec{X}\,dt+\vec{b}(\vec{X},t)\,dW_t
+
+    Uses the drift-implicit Milstein method:
+
+    .. math::
+
+       \vec{X}_{i+1}=\vec{X}_i+Q\left(\theta\vec{X}_{i+1}+
+       (1-\theta)\vec{X}_i\right)\Delta t_i+\vec{b}(\vec{X}_i,t_i)
+       \Delta W_i+\frac{1}{2}\left(\vec{b}(\vec{X}_i,t_i)\cdot
+       \vec{\nabla}_{\vec{X}}\right)\vec{b}(\vec{X}_i,t_i)
+       \left((\Delta W_i)^2-\Delta t_i\right)
+
+    where :math:`\Delta W_i=U_i\sqrt{\Delta t}`, :math:`U` being a normally
+    distributed random variable with mean 0 and variance 1.
+
+    Parameters
+    ----------
+    Q : numpy.array or scipy.sparse matrix
+        The matrix of the linear drift
+    diffusion : callable(X, t)
+        Computes the diffusion coefficient :math:`\vec{b}(\vec{X},t)`
+    b_dx_b : callable(X, t)
+        Computes the correction coefficient
+        :math:`\left(\vec{b}(\vec{X},t)\cdot
+        \vec{\nabla}_{\vec{X}}\right)\vec{b}(\vec{X},t)`
+    X0 : numpy.array
+        Initial condition on X
+    ts : numpy.array
+        A sequence of time points for which to solve for X.  The initial value
+        point should be the first element of this sequence.
+    Us : array, shape=(len(t) - 1)
+        Normalized Weiner increments for each time step (i.e. samples from a
+        Gaussian distribution with mean 0 and variance 1).
+    theta : float, optional
+        The weight of the implicit part of the drift (1 for backward Euler,
+        1/2 for the trapezoidal rule)
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
+
+    Returns
+    -------
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
+        initial value `X0` in the first row.
+
+    """
+
+    return step_all(drift_implicit_milstein_step(Q, diffusion, b_dx_b, theta),
+                    X0, ts, [Us], save_every)
+
+def exponential_euler(Q, diffusion, X0, ts, Us, save_every=1):
+    r"""Integrate a system of ordinary stochastic differential equations with
+    linear drift subject to scalar noise:
+
+    .. math::
+
+       d\vec{X}=Q\vec{X}\,dt+\vec{b}(\vec{X},t)\,dW_t
+
+    Uses the exponential Euler method, which propagates the drift exactly:
+
+    .. math::
+
+       \vec{X}_{i+1}=e^{Q\Delta t_i}\left(\vec{X}_i+
+       \vec{b}(\vec{X}_i,t_i)\Delta W_i\right)
+
+    where :math:`\Delta W_i=U_i\sqrt{\Delta t}`, :math:`U` being a normally
+    distributed random variable with mean 0 and variance 1. The step size is
+    then limited by the diffusion alone, however large :math:`Q` is.
+
+    Parameters
+    ----------
+    Q : numpy.array or scipy.sparse matrix
+        The matrix of the linear drift
+    diffusion : callable(X, t)
+        Computes the diffusion coefficient :math:`\vec{b}(\vec{X},t)`
+    X0 : numpy.array
+        Initial condition on X
+    ts : numpy.array
+        A sequence of time points for which to solve for X.  The initial value
+        point should be the first element of this sequence.
+    Us : array, shape=(len(t) - 1)
+        Normalized Weiner increments for each time step (i.e. samples from a
+        Gaussian distribution with mean 0 and variance 1).
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
 
     Returns
     -------
-    numpy.array, shape=(len(ts), len(X0))
-        Array containing the value of X for each desired time in t, with the
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
         initial value `X0` in the first row.
 
     """
 
-    dts = [tf - ti for tf, ti in zip(ts[1:], ts[:-1])]
+    return step_all(exponential_euler_step(Q, diffusion), X0, ts, [Us],
+                    save_every)
+
+def exponential_milstein(Q, diffusion, b_dx_b, X0, ts, Us, save_every=1):
+    r"""Integrate a system of ordinary stochastic differential equations with
+    linear drift subject to scalar noise:
+
+    .. math::
+
+       d\vec{X}=Q\vec{X}\,dt+\vec{b}(\vec{X},t)\,dW_t
+
+    Uses the exponential Milstein method, which propagates the drift exactly:
+
+    .. math::
+
+       \vec{X}_{i+1}=e^{Q\Delta t_i}\left(\vec{X}_i+
+       \vec{b}(\vec{X}_i,t_i)\Delta W_i+\frac{1}{2}
+       \left(\vec{b}(\vec{X}_i,t_i)\cdot\vec{\nabla}_{\vec{X}}\right)
+       \vec{b}(\vec{X}_i,t_i)\left((\Delta W_i)^2-\Delta t_i\right)
+       \right)
+
+    where :math:`\Delta W_i=U_i\sqrt{\Delta t}`, :math:`U` being a normally
+    distributed random variable with mean 0 and variance 1.
+
+    Parameters
+    ----------
+    Q : numpy.array or scipy.sparse matrix
+        The matrix of the linear drift
+    diffusion : callable(X, t)
+        Computes the diffusion coefficient :math:`\vec{b}(\vec{X},t)`
+    b_dx_b : callable(X, t)
+        Computes the correction coefficient
+        :math:`\left(\vec{b}(\vec{X},t)\cdot
+        \vec{\nabla}_{\vec{X}}\right)\vec{b}(\vec{X},t)`
+    X0 : numpy.array
+        Initial condition on X
+    ts : numpy.array
+        A sequence of time points for which to solve for X.  The initial value
+        point should be the first element of this sequence.
+    Us : array, shape=(len(t) - 1)
+        Normalized Weiner increments for each time step (i.e. samples from a
+        Gaussian distribution with mean 0 and variance 1).
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
 
-    X = np.array([X0])
+    Returns
+    -------
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
+        initial value `X0` in the first row.
 
-    for t, dt, dM in zip(ts[:-1], dts, dMs):
-        dW = dW_fn(dM, dt, X[-1], t)
-        X = np.vstack((X, X[-1] + drift_fn(X[-1], t)*dt +
-                       diffusion_fn(X[-1], t)*dW +
-                       b_dx_b_fn(X[-1], t)*(dW**2 - dt)/2))
+    """
 
-    return X
+    return step_all(exponential_milstein_step(Q, diffusion, b_dx_b), X0, ts,
+                    [Us], save_every)
 
 def time_ind_taylor_1_5(drift, diffusion, b_dx_b, b_dx_a, a_dx_b, a_dx_a,
                         b_dx_b_dx_b, b_b_dx_dx_b, b_b_dx_dx_a,
-                        X0, ts, U1s, U2s):
+                        X0, ts, U1s, U2s, save_every=1):
     r"""Integrate a system of ordinary stochastic differential equations with
     time-independent coefficients subject to scalar noise:
 
@@ -304,33 +985,232 @@ def time_ind_taylor_1_5(drift, diffusion, b_dx_b, b_dx_a, a_dx_b, a_dx_a,
     U2s : numpy.array, shape=(len(t) - 1)
         Normalized Weiner increments for each time step (i.e. samples from a
         Gaussian distribution with mean 0 and variance 1).
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
 
     Returns
     -------
-    numpy.array, shape=(len(t), len(X0))
-        Array containing the value of X for each desired time in t, with the
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
         initial value `X0` in the first row.
 
     """
 
-    dts = ts[1:] - ts[:-1]
-    sqrtdts = np.sqrt(dts)
-    dWs = U1s*sqrtdts
-    dZs = (U1s + U2s/np.sqrt(3))*sqrtdts*dts/2
+    step = time_ind_taylor_1_5_step(drift, diffusion, b_dx_b, b_dx_a, a_dx_b,
+                                    a_dx_a, b_dx_b_dx_b, b_b_dx_dx_b,
+                                    b_b_dx_dx_a)
+    return step_all(step, X0, ts, [U1s, U2s], save_every)
+
+def time_ind_weak_taylor_2(drift, diffusion, b_dx_b, b_dx_a, a_dx_b, a_dx_a,
+                           b_b_dx_dx_b, b_b_dx_dx_a, X0, ts, Us,
+                           save_every=1):
+    r"""Integrate a system of ordinary stochastic differential equations with
+    time-independent coefficients subject to scalar noise, approximating the
+    distribution of the solution rather than individual paths:
 
-    Xs = [np.array(X0)]
+    .. math::
 
-    for t, dt, dW, dZ in zip(ts[:-1], dts, dWs, dZs):
-        X = Xs[-1]
-        Xs = np.vstack((Xs, X + drift(X)*dt + diffusion(X)*dW +
-                        b_dx_b(X)*(dW**2 - dt)/2 + b_dx_a(X)*dZ +
-                        (a_dx_b(X)+b_b_dx_dx_b(X)/2)*(dW*dt - dZ) +
-                        (a_dx_a(X)+b_b_dx_dx_a(X)/2)*dt**2/2 +
-                        b_dx_b_dx_b(X)*(dW**2/3 - dt)*dW/2))
+       d\vec{X}=\vec{a}(\vec{X})\,dt+\vec{b}(\vec{X})\,dW_t
 
-    return Xs
+    Uses the simplified weak order 2.0 Taylor method:
 
-def faulty_milstein(drift, diffusion, b_dx_b, X0, ts, Us):
+    .. math::
+
+       \begin{align}
+       \rho^\mu_{i+1}&=\rho^\mu_i+a^\mu_i\Delta t_i+
+       b^\mu_i\Delta\hat{W}_i+\frac{1}{2}b^\nu_i\partial_\nu b^\mu_i\left(
+       (\Delta\hat{W}_i)^2-\Delta t_i\right)+ \\
+       &\quad\frac{1}{2}\left(b^\nu_i\partial_\nu a^\mu_i+a^\nu_i
+       \partial_\nu b^\mu_i+\frac{1}{2}b^\nu_ib^\sigma_i\partial_\nu
+       \partial_\sigma b^\mu_i\right)\Delta\hat{W}_i\Delta t_i+ \\
+       &\quad\frac{1}{2}\left(a^\nu_i\partial_\nu
+       +\frac{1}{2}b^\nu_ib^\sigma_i\partial_\nu\partial_\sigma\right)
+       a^\mu_i\Delta t_i^2
+       \end{align}
+
+    where :math:`\Delta\hat{W}_i=U_i\sqrt{\Delta t}`. Expectations of
+    smooth functions of the solution have error :math:`O(\Delta t^2)` as long
+    as the :math:`U_i` are independent with the first five moments of a
+    standard normal distribution, so the cheap samples from
+    ``three_point_increments`` can be used in place of Gaussian ones.
+
+    Parameters
+    ----------
+    drift : callable(X)
+        Computes the drift coefficient :math:`\vec{a}(\vec{X})`
+    diffusion : callable(X)
+        Computes the diffusion coefficient :math:`\vec{b}(\vec{X})`
+    b_dx_b : callable(X)
+        Computes the coefficient :math:`\left(\vec{b}(\vec{X})\cdot
+        \vec{\nabla}_{\vec{X}}\right)\vec{b}(\vec{X})`
+    b_dx_a : callable(X)
+        Computes the coefficient :math:`\left(\vec{b}(\vec{X})\cdot
+        \vec{\nabla}_{\vec{X}}\right)\vec{a}(\vec{X})`
+    a_dx_b : callable(X)
+        Computes the coefficient :math:`\left(\vec{a}(\vec{X})\cdot
+        \vec{\nabla}_{\vec{X}}\right)\vec{b}(\vec{X})`
+    a_dx_a : callable(X)
+        Computes the coefficient :math:`\left(\vec{a}(\vec{X})\cdot
+        \vec{\nabla}_{\vec{X}}\right)\vec{a}(\vec{X})`
+    b_b_dx_dx_b : callable(X)
+        Computes :math:`b^\nu b^\sigma\partial_\nu\partial_\sigma
+        b^\mu\hat{e}_\mu`.
+    b_b_dx_dx_a : callable(X)
+        Computes :math:`b^\nu b^\sigma\partial_\nu\partial_\sigma
+        a^\mu\hat{e}_\mu`.
+    X0 : numpy.array
+        Initial condition on X
+    ts : numpy.array
+        A sequence of time points for which to solve for X.  The initial value
+        point should be the first element of this sequence.
+    Us : numpy.array, shape=(len(t) - 1)
+        Normalized increments for each time step (e.g. from
+        ``three_point_increments`` or a standard normal distribution).
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
+
+    Returns
+    -------
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
+        initial value `X0` in the first row.
+
+    """
+
+    step = time_ind_weak_taylor_2_step(drift, diffusion, b_dx_b, b_dx_a,
+                                       a_dx_b, a_dx_a, b_b_dx_dx_b,
+                                       b_b_dx_dx_a)
+    return step_all(step, X0, ts, [Us], save_every)
+
+def platen_1_0(drift, diffusion, X0, ts, Us, save_every=1):
+    r"""Integrate a system of ordinary stochastic differential equations subject
+    to scalar noise:
+
+    .. math::
+
+       d\vec{X}=\vec{a}(\vec{X},t)\,dt+\vec{b}(\vec{X},t)\,dW_t
+
+    Uses Platen's derivative-free scheme of strong order 1.0, which replaces
+    the derivative in the Milstein correction by a difference of the
+    diffusion coefficient:
+
+    .. math::
+
+       \begin{align}
+       \vec{\Upsilon}_i&=\vec{X}_i+\vec{a}(\vec{X}_i,t_i)\Delta t_i+
+       \vec{b}(\vec{X}_i,t_i)\sqrt{\Delta t_i} \\
+       \vec{X}_{i+1}&=\vec{X}_i+\vec{a}(\vec{X}_i,t_i)\Delta t_i+
+       \vec{b}(\vec{X}_i,t_i)\Delta W_i+\frac{1}{2\sqrt{\Delta t_i}}
+       \left(\vec{b}(\vec{\Upsilon}_i,t_i)-\vec{b}(\vec{X}_i,t_i)\right)
+       \left((\Delta W_i)^2-\Delta t_i\right)
+       \end{align}
+
+    where :math:`\Delta W_i=U_i\sqrt{\Delta t}`, :math:`U` being a normally
+    distributed random variable with mean 0 and variance 1.
+
+    Parameters
+    ----------
+    drift : callable(X, t)
+        Computes the drift coefficient :math:`\vec{a}(\vec{X},t)`
+    diffusion : callable(X, t)
+        Computes the diffusion coefficient :math:`\vec{b}(\vec{X},t)`
+    X0 : numpy.array
+        Initial condition on X
+    ts : numpy.array
+        A sequence of time points for which to solve for X.  The initial value
+        point should be the first element of this sequence.
+    Us : array, shape=(len(t) - 1)
+        Normalized Weiner increments for each time step (i.e. samples from a
+        Gaussian distribution with mean 0 and variance 1).
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
+
+    Returns
+    -------
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
+        initial value `X0` in the first row.
+
+    """
+
+    return step_all(platen_1_0_step(drift, diffusion), X0, ts, [Us],
+                    save_every)
+
+def time_ind_platen_1_5(drift, diffusion, X0, ts, U1s, U2s, save_every=1):
+    r"""Integrate a system of ordinary stochastic differential equations with
+    time-independent coefficients subject to scalar noise:
+
+    .. math::
+
+       d\vec{X}=\vec{a}(\vec{X})\,dt+\vec{b}(\vec{X})\,dW_t
+
+    Uses Platen's explicit scheme of strong order 1.5, which replaces the
+    derivatives in the order 1.5 Taylor scheme (see ``time_ind_taylor_1_5``)
+    by differences of the coefficients at supporting values:
+
+    .. math::
+
+       \begin{align}
+       \vec{\Upsilon}^\pm_i&=\vec{X}_i+\vec{a}_i\Delta t_i\pm
+       \vec{b}_i\sqrt{\Delta t_i},\quad
+       \vec{\Phi}^\pm_i=\vec{\Upsilon}^+_i\pm
+       \vec{b}(\vec{\Upsilon}^+_i)\sqrt{\Delta t_i} \\
+       \vec{X}_{i+1}&=\vec{X}_i+\vec{b}_i\Delta W_i+
+       \frac{1}{2\sqrt{\Delta t_i}}\left(\vec{a}(\vec{\Upsilon}^+_i)-
+       \vec{a}(\vec{\Upsilon}^-_i)\right)\Delta Z_i+
+       \frac{1}{4}\left(\vec{a}(\vec{\Upsilon}^+_i)+2\vec{a}_i+
+       \vec{a}(\vec{\Upsilon}^-_i)\right)\Delta t_i \\
+       &\quad+\frac{1}{4\sqrt{\Delta t_i}}\left(
+       \vec{b}(\vec{\Upsilon}^+_i)-\vec{b}(\vec{\Upsilon}^-_i)\right)
+       \left((\Delta W_i)^2-\Delta t_i\right)+\frac{1}{2\Delta t_i}
+       \left(\vec{b}(\vec{\Upsilon}^+_i)-2\vec{b}_i+
+       \vec{b}(\vec{\Upsilon}^-_i)\right)\left(\Delta W_i\Delta t_i-
+       \Delta Z_i\right) \\
+       &\quad+\frac{1}{4\Delta t_i}\left(\vec{b}(\vec{\Phi}^+_i)-
+       \vec{b}(\vec{\Phi}^-_i)-\vec{b}(\vec{\Upsilon}^+_i)+
+       \vec{b}(\vec{\Upsilon}^-_i)\right)\left(\frac{1}{3}
+       (\Delta W_i)^2-\Delta t_i\right)\Delta W_i
+       \end{align}
+
+    with :math:`\Delta W_i` and :math:`\Delta Z_i` constructed from
+    :math:`U_{1,i}` and :math:`U_{2,i}` as in ``time_ind_taylor_1_5``.
+
+    Parameters
+    ----------
+    drift : callable(X)
+        Computes the drift coefficient :math:`\vec{a}(\vec{X})`
+    diffusion : callable(X)
+        Computes the diffusion coefficient :math:`\vec{b}(\vec{X})`
+    X0 : numpy.array
+        Initial condition on X
+    ts : numpy.array
+        A sequence of time points for which to solve for X.  The initial value
+        point should be the first element of this sequence.
+    U1s : numpy.array, shape=(len(t) - 1)
+        Normalized Weiner increments for each time step (i.e. samples from a
+        Gaussian distribution with mean 0 and variance 1).
+    U2s : numpy.array, shape=(len(t) - 1)
+        Normalized Weiner increments for each time step (i.e. samples from a
+        Gaussian distribution with mean 0 and variance 1).
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
+
+    Returns
+    -------
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
+        initial value `X0` in the first row.
+
+    """
+
+    return step_all(time_ind_platen_1_5_step(drift, diffusion), X0, ts,
+                    [U1s, U2s], save_every)
+
+def faulty_milstein(drift, diffusion, b_dx_b, X0, ts, Us, save_every=1):
     r"""Integrate a system of ordinary stochastic differential equations subject
     to scalar noise:
 
@@ -369,24 +1249,17 @@ def faulty_milstein(drift, diffusion, b_dx_b, X0, ts, Us):
     Us : numpy.array, shape=(len(t) - 1)
         Normalized Weiner increments for each time step (i.e. samples from a
         Gaussian distribution with mean 0 and variance 1).
+    save_every : int, optional
+        Store the state only at every `save_every`-th time point, i.e. at
+        ``ts[::save_every]``.
 
     Returns
     -------
-    numpy.array, shape=(len(t), len(X0))
-        Array containing the value of X for each desired time in t, with the
+    numpy.array, shape=(len(ts[::save_every]), len(X0))
+        Array containing the value of X for each saved time in t, with the
         initial value `X0` in the first row.
 
     """
 
-    dts = [tf - ti for tf, ti in zip(ts[1:], ts[:-1])]
-    # Scale the Weiner increments to the time increments.
-    sqrtdts = np.sqrt(dts)
-    dWs = np.product(np.array([sqrtdts, Us]), axis=0)
-
-    X = [np.array(X0)]
-
-    for t, dt, dW in zip(ts[:-1], dts, dWs):
-        X.append(X[-1] + drift(X[-1], t)*dt + diffusion(X[-1], t)*dW +
-                 b_dx_b(X[-1], t)*(dW**2 - dt))
-
-    return X
+    return step_all(faulty_milstein_step(drift, diffusion, b_dx_b), X0, ts,
+                    [Us], save_every)
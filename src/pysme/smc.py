@@ -23,32 +23,17 @@ except ImportError:
 
 def precomp_fn(coupling_op, M_sq, N, H0, partial_basis,
                **kwargs):
-    common_dict = sb.op_calc_setup(coupling_op, M_sq, N, H0, partial_basis)
-    D_c = sb.diffusion_op(**common_dict)
-    conjugate_dict = common_dict.copy()
-    conjugate_dict['C_vector'] = common_dict['C_vector'].conjugate()
-    D_c_dag = sb.diffusion_op(**conjugate_dict)
-    E = sb.double_comm_op(**common_dict)
-    F0 = sb.hamiltonian_op(**common_dict)
-    
-    Q_minus_F = (N + 1) * D_c + N * D_c_dag + E
-    G, k_T = sb.weiner_op(**common_dict)
-
-    return_vals = {
-                   'Q_minus_F': Q_minus_F,
-                   'F0': F0,
-                   'diffusion_reps': {'G': G, 'k_T': k_T}
-                  }
-    more_vals ={'c_op': coupling_op, 'M_sq': M_sq, 'N': N,
-                'H': H0, 'partial_basis': partial_basis}
-    return_vals.update(more_vals)
-    return return_vals
+    # The field strength B multiplies H0, so the drift is affine in B.
+    basis = list(partial_basis) + [np.eye(*partial_basis[0].shape)]
+    model = sb.AffineModel(coupling_op, M_sq, N,
+                           np.zeros(H0.shape, dtype=np.complex128), [H0],
+                           basis=basis)
+
+    return {'model': model, 'c_op': coupling_op, 'M_sq': M_sq, 'N': N,
+            'H': H0, 'partial_basis': partial_basis}
 
 def parameter_fn(B, precomp_data):
-    drift_rep = precomp_data['Q_minus_F'] + B * precomp_data['F0']
-    constructor_kwargs = precomp_data.copy()
-    constructor_kwargs.update({'drift_rep': drift_rep})
-    return constructor_kwargs
+    return sb.affine_parameter_fn(B, precomp_data['model'])
 
 class HomodyneQubitPrecessionModel(qi.Model):
     '''This is a `qinfer` `Model` for replicating the work of Chase and Geremia
@@ -0,0 +1,213 @@
+"""Analytic structure constants for the generalized Gell-Mann basis.
+
+  .. module:: structure.py
+     :synopsis: Analytic structure constants for the generalized Gell-Mann
+                basis
+  .. moduleauthor:: Jonathan Gross <jarthurgross@gmail.com>
+
+"""
+
+import os
+from collections import namedtuple
+import numpy as np
+import pysme.gellmann as gm
+from pysme.cache import atomic_write
+
+#: Version of the on-disk cache format. Increment whenever the layout or the
+#: basis ordering changes so that stale cache files are regenerated.
+CACHE_VERSION = 1
+
+SparseTensor = namedtuple('SparseTensor', ['coords', 'data', 'shape'])
+SparseTensor.__doc__ = """Sparse tensor in coordinate (COO) format.
+
+``coords`` is an integer array of shape ``(len(shape), nnz)`` and ``data`` the
+corresponding complex values.
+
+"""
+
+_struct_consts_cache = {}
+# (d, cache_dir) pairs whose cache file is known to be up to date, so the disk
+# is only consulted once per pair.
+_struct_consts_on_disk = set()
+
+def gellmann_entries(d):
+    r"""Return the nonzero matrix entries of the generalized Gell-Mann basis.
+
+    The basis is ordered as in ``gellmann.get_basis``, so the element
+    :math:`\Lambda^{jk}` has index :math:`d(j-1)+(k-1)`. Each element is
+    expressed as a sum of matrix units :math:`|r\rangle\langle c|` (see
+    ``gellmann.get_basis_entries``).
+
+    Parameters
+    ----------
+    d : int
+        The dimension of the Hilbert space.
+
+    Returns
+    -------
+    tuple of numpy.array
+        Arrays ``(elements, rows, cols, vals)`` such that basis element
+        ``elements[n]`` has the entry ``vals[n]`` at ``(rows[n], cols[n])``.
+
+    """
+    return gm.get_basis_entries(d)
+
+def _join(left_keys, right_keys):
+    """Return index pairs ``(l, r)`` for which ``left_keys[l] ==
+    right_keys[r]``."""
+    order = np.argsort(right_keys, kind='stable')
+    lo = np.searchsorted(right_keys[order], left_keys, side='left')
+    hi = np.searchsorted(right_keys[order], left_keys, side='right')
+    counts = hi - lo
+    left_idx = np.repeat(np.arange(len(left_keys)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                                  counts)
+    return left_idx, order[np.repeat(lo, counts) + offsets]
+
+def gellmann_struct_consts_compute(d):
+    r"""Compute the structure constants of the generalized Gell-Mann basis.
+
+    Returns the tensor :math:`S` defined by
+    :math:`\Lambda^i\Lambda^j=\sum_kS_{ijk}\Lambda^k` (the same quantity
+    ``system_builder.struct_consts`` computes numerically) without doing any
+    matrix multiplication. Products of basis elements are formed entry by
+    entry from their matrix-unit expansions using
+    :math:`|a\rangle\langle m|m\rangle\langle c|=|a\rangle\langle c|`, and the
+    resulting matrix units are projected back onto the basis using
+    :math:`\operatorname{Tr}[{\Lambda^k}^\dagger|a\rangle\langle c|]=
+    {\Lambda^k_{ac}}^*`.
+
+    Parameters
+    ----------
+    d : int
+        The dimension of the Hilbert space.
+
+    Returns
+    -------
+    SparseTensor
+        The nonzero structure constants.
+
+    """
+    dim = d**2
+    els, rows, cols, vals = gellmann_entries(d)
+    norms_sq = np.full(dim, 2.)
+    norms_sq[-1] = d
+
+    # Products of entries sharing the inner index.
+    left, right = _join(cols, rows)
+    prod_i = els[left]
+    prod_j = els[right]
+    prod_rows = rows[left]
+    prod_cols = cols[right]
+    prod_vals = vals[left] * vals[right]
+
+    # Project each resulting matrix unit onto the basis elements that have an
+    # entry in the same place.
+    prods, projs = _join(prod_rows * d + prod_cols, rows * d + cols)
+    i = prod_i[prods]
+    j = prod_j[prods]
+    k = els[projs]
+    terms = prod_vals[prods] * vals[projs].conj() / norms_sq[k]
+
+    flat, inverse = np.unique((i * dim + j) * dim + k, return_inverse=True)
+    data = (np.bincount(inverse, terms.real) +
+            1.j * np.bincount(inverse, terms.imag))
+    keep = np.abs(data) > 1e-12
+    coords = np.array(np.unravel_index(flat[keep], (dim, dim, dim)))
+
+    return SparseTensor(coords, data[keep], (dim, dim, dim))
+
+def _cache_path(d, cache_dir):
+    return os.path.join(cache_dir,
+                        'gellmann_struct_v{}_d{}.npz'.format(CACHE_VERSION, d))
+
+def gellmann_struct_consts(d, cache_dir=None):
+    r"""Return the structure constants of the generalized Gell-Mann basis.
+
+    Results are cached in memory for each dimension. If `cache_dir` is given
+    (or the ``PYSME_CACHE_DIR`` environment variable is set) they are also
+    read from and written to a versioned ``.npz`` file in that directory, so
+    separate processes only compute them once.
+
+    Parameters
+    ----------
+    d : int
+        The dimension of the Hilbert space.
+    cache_dir : str, optional
+        Directory for the on-disk cache.
+
+    Returns
+    -------
+    SparseTensor
+        The structure constants :math:`S_{ijk}` for the basis returned by
+        ``gellmann.get_basis(d)``.
+
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get('PYSME_CACHE_DIR')
+
+    # Check the disk even after a memory hit, so that passing `cache_dir`
+    # later still writes the file, but only the first time for each
+    # directory.
+    S = _struct_consts_cache.get(d)
+    if S is not None and (cache_dir is None or
+                          (d, cache_dir) in _struct_consts_on_disk):
+        return S
+    on_disk = False
+    if cache_dir is not None:
+        path = _cache_path(d, cache_dir)
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                on_disk = int(cached['version']) == CACHE_VERSION
+                if on_disk and S is None:
+                    S = SparseTensor(cached['coords'], cached['data'],
+                                     tuple(cached['shape']))
+
+    if S is None:
+        S = gellmann_struct_consts_compute(d)
+    if cache_dir is not None and not on_disk:
+        os.makedirs(cache_dir, exist_ok=True)
+        atomic_write(path, lambda f: np.savez(f, version=CACHE_VERSION,
+                                              coords=S.coords, data=S.data,
+                                              shape=S.shape))
+    if cache_dir is not None:
+        _struct_consts_on_disk.add((d, cache_dir))
+
+    _struct_consts_cache[d] = S
+    return S
+
+def gellmann_f_d(d, cache_dir=None):
+    r"""Return the antisymmetric and symmetric structure constants of su(d).
+
+    For the traceless generalized Gell-Mann matrices (normalized so that
+    :math:`\operatorname{Tr}[\Lambda^a\Lambda^b]=2\delta_{ab}`)
+
+    .. math::
+
+       \Lambda^a\Lambda^b=\frac{2}{d}\delta_{ab}I+
+       \sum_c(d_{abc}+if_{abc})\Lambda^c
+
+    Parameters
+    ----------
+    d : int
+        The dimension of the Hilbert space.
+    cache_dir : str, optional
+        Directory for the on-disk cache (see ``gellmann_struct_consts``).
+
+    Returns
+    -------
+    tuple of SparseTensor
+        The tensors :math:`f_{abc}` and :math:`d_{abc}`, indexed in the order
+        of ``gellmann.get_basis(d)[:-1]``.
+
+    """
+    S = gellmann_struct_consts(d, cache_dir)
+    traceless = np.all(S.coords < d**2 - 1, axis=0)
+    coords = S.coords[:,traceless]
+    data = S.data[traceless]
+    shape = (d**2 - 1,) * 3
+    f_nonzero = data.imag != 0
+    d_nonzero = data.real != 0
+
+    return (SparseTensor(coords[:,f_nonzero], data[f_nonzero].imag, shape),
+            SparseTensor(coords[:,d_nonzero], data[d_nonzero].real, shape))
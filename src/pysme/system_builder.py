@@ -9,6 +9,19 @@
 
 import numpy as np
 import itertools as it
+from scipy import sparse
+import pysme.gellmann as gm
+from pysme.cache import LRUCache, memoize
+
+#: Cache shared by the functions constructing superoperators, keeping at most
+#: 128 MiB of arrays in memory. Resize it with ``op_cache.maxsize`` and
+#: ``op_cache.max_bytes``, share results between processes by setting
+#: ``op_cache.cache_dir``, and inspect its performance with
+#: ``op_cache.stats()``. The memoized constructors (``op_calc_setup``,
+#: ``construct_Q``, ``construct_G_k_T``, and their Liouville-space
+#: counterparts) return the cached arrays themselves, which are read-only, so
+#: copy a result before modifying it in place.
+op_cache = LRUCache(maxsize=32, max_bytes=128*2**20)
 
 def recur_dot(mats):
     """Perform numpy.dot on a list in a right-associative manner."""
@@ -57,9 +70,7 @@ def vectorize(operator, basis):
         The vector components
 
     """
-    return np.array([np.tensordot(basis_el.conj().T, operator,
-                                  axes=[[1, 0], [0, 1]]) /
-                     norm_squared(basis_el) for basis_el in basis])
+    return vectorize_stack(operator, basis)
 
 def dualize(operator, basis):
     r"""Take an operator to its dual vectorized form in some operator basis.
@@ -86,16 +97,115 @@ def dualize(operator, basis):
         The vector components
 
     """
-    return np.array([np.tensordot(basis_el, operator.conj().T,
-                                  axes=[[1, 0], [0, 1]])
-                     for basis_el in basis])
+    return dualize_stack(operator, basis)
 
+def basis_matrix(basis):
+    r"""Return the basis elements flattened into the rows of a matrix.
+
+    Parameters
+    ----------
+    basis : list(numpy.array)
+        The operator basis
+
+    Returns
+    -------
+    numpy.array, shape=(len(basis), d**2)
+        The matrix :math:`B` with :math:`B_{x,\,dj+k}=\Lambda^x_{jk}`
+
+    """
+    basis = np.asarray(basis)
+    return basis.reshape(basis.shape[0], -1)
+
+def vectorize_stack(operators, basis):
+    r"""Vectorize a stack of operators in a particular operator basis.
+
+    Equivalent to calling ``vectorize`` on each operator, but done with a
+    single matrix product against ``basis_matrix(basis)`` (or against the
+    sparse entries of the basis if it is the one returned by
+    ``gellmann.get_basis_array``).
+
+    Parameters
+    ----------
+    operators : numpy.array, shape=(..., d, d)
+        The operators to vectorize
+    basis : list(numpy.array)
+        The basis to vectorize the operators in
+
+    Returns
+    -------
+    numpy.array, shape=(..., len(basis))
+        The vector components of each operator
+
+    """
+    if gm.is_basis(basis):
+        return gm.vectorize_stack(operators)
+    B = basis_matrix(basis)
+    operators = np.asarray(operators)
+    flat_ops = operators.reshape(operators.shape[:-2] + (B.shape[1],))
+    return np.dot(flat_ops, B.conj().T) / np.sum(np.abs(B)**2, axis=1)
+
+def dualize_stack(operators, basis):
+    r"""Take a stack of operators to their dual vectorized forms.
+
+    Equivalent to calling ``dualize`` on each operator, but done with a single
+    matrix product against ``basis_matrix(basis)`` (or against the sparse
+    entries of the basis if it is the one returned by
+    ``gellmann.get_basis_array``).
+
+    Parameters
+    ----------
+    operators : numpy.array, shape=(..., d, d)
+        The operators to dualize
+    basis : list(numpy.array)
+        The basis to vectorize the operators in
+
+    Returns
+    -------
+    numpy.array, shape=(..., len(basis))
+        The dual vector components of each operator
+
+    """
+    if gm.is_basis(basis):
+        return gm.dualize_stack(operators)
+    B = basis_matrix(basis)
+    operators = np.asarray(operators)
+    flat_ops = operators.reshape(operators.shape[:-2] + (B.shape[1],))
+    return np.dot(flat_ops.conj(), B.T)
+
+def devectorize_stack(vectors, basis):
+    r"""Reconstruct a stack of operators from their vector components.
+
+    Inverse of ``vectorize_stack``.
+
+    Parameters
+    ----------
+    vectors : numpy.array, shape=(..., len(basis))
+        The vector components of the operators
+    basis : list(numpy.array)
+        The basis the operators are vectorized in
+
+    Returns
+    -------
+    numpy.array, shape=(..., d, d)
+        The operators
+
+    """
+    basis = np.asarray(basis)
+    return np.dot(vectors, basis_matrix(basis)).reshape(
+            np.shape(vectors)[:-1] + basis.shape[1:])
+
+@memoize(op_cache)
 def op_calc_setup(coupling_op, M_sq, N, H, partial_basis):
-    """Do repeated tasks performed every time a superoperator is computed."""
+    """Do repeated tasks performed every time a superoperator is computed.
+
+    The result is memoized in ``op_cache`` and shared between callers, so its
+    arrays are read-only.
+
+    """
 
     # Add the identity to the end of the basis to complete it (important for
     # some tests for the identity to be the last basis element).
-    basis = partial_basis + [np.eye(*partial_basis[0].shape)]
+    basis = list(partial_basis) + [np.eye(*partial_basis[0].shape)]
 
     dim = len(basis)
 
@@ -118,26 +228,538 @@ def op_calc_setup(coupling_op, M_sq, N, H, partial_basis):
             'triple_prods': triple_prods, 'basis': basis, 'M_sq': M_sq, 'N': N,
             'H_vector': H_vector, 'basis_norms_sq': basis_norms_sq}
 
-def construct_Q(coupling_op, M_sq, N, H, partial_basis):
-    common_dict = op_calc_setup(coupling_op, M_sq, N, H, partial_basis)
-    D_c = diffusion_op(**common_dict)
+def struct_consts(basis):
+    r"""Return the structure constants of an operator basis.
+
+    Computes the tensor :math:`S` defined by
+
+    .. math::
+
+       \Lambda^i\Lambda^j=\sum_kS_{ijk}\Lambda^k
+
+    for a complete, orthogonal basis :math:`\{\Lambda^i\}` (the basis does
+    not need to be normalized). Products are taken one row of basis elements
+    at a time so that memory usage stays proportional to the size of the
+    returned tensor.
+
+    Parameters
+    ----------
+    basis : list(numpy.array)
+        A complete orthogonal basis for the operators
+
+    Returns
+    -------
+    numpy.array, shape=(len(basis), len(basis), len(basis))
+        The structure constants :math:`S_{ijk}`
+
+    """
+    basis = np.asarray(basis)
+    dim = basis.shape[0]
+    # Columns are the (conjugated, flattened) basis elements divided by their
+    # square norms, so a product with them extracts components.
+    flat_duals = (basis.conj().reshape(dim, -1).T /
+                  np.array([norm_squared(basis_el) for basis_el in basis]))
+
+    S = np.empty((dim, dim, dim), dtype=np.complex128)
+    for i in range(dim):
+        S[i] = np.dot(np.matmul(basis[i], basis).reshape(dim, -1), flat_duals)
+
+    return S
+
+def left_mult_rep(vec, S, use_sparse=False):
+    r"""Return the matrix representing left multiplication by an operator.
+
+    If :math:`A=\sum_iA_i\Lambda^i`, returns the matrix :math:`L` such that
+    :math:`\overrightarrow{A\rho}=L\vec{\rho}`.
+
+    Parameters
+    ----------
+    vec : numpy.array
+        The vectorized operator :math:`\vec{A}`
+    S : numpy.array or structure.SparseTensor
+        Structure constants for the basis (see ``struct_consts``)
+    use_sparse : bool, optional
+        Whether to return a ``scipy.sparse.csr_matrix``.
+
+    Returns
+    -------
+    numpy.array or scipy.sparse.csr_matrix
+        The (complex) matrix :math:`L`
+
+    """
+    if isinstance(S, np.ndarray):
+        L = np.tensordot(vec, S, axes=([0], [0])).T
+        return sparse.csr_matrix(L) if use_sparse else L
+    i, j, k = S.coords
+    L = sparse.coo_matrix((vec[i] * S.data, (k, j)), shape=S.shape[1:])
+    return L.tocsr() if use_sparse else L.toarray()
+
+def right_mult_rep(vec, S, use_sparse=False):
+    r"""Return the matrix representing right multiplication by an operator.
+
+    If :math:`A=\sum_iA_i\Lambda^i`, returns the matrix :math:`R` such that
+    :math:`\overrightarrow{\rho A}=R\vec{\rho}`.
+
+    Parameters
+    ----------
+    vec : numpy.array
+        The vectorized operator :math:`\vec{A}`
+    S : numpy.array or structure.SparseTensor
+        Structure constants for the basis (see ``struct_consts``)
+    use_sparse : bool, optional
+        Whether to return a ``scipy.sparse.csr_matrix``.
+
+    Returns
+    -------
+    numpy.array or scipy.sparse.csr_matrix
+        The (complex) matrix :math:`R`
+
+    """
+    if isinstance(S, np.ndarray):
+        R = np.tensordot(vec, S, axes=([0], [1])).T
+        return sparse.csr_matrix(R) if use_sparse else R
+    i, j, k = S.coords
+    R = sparse.coo_matrix((vec[j] * S.data, (k, i)), shape=S.shape[1:])
+    return R.tocsr() if use_sparse else R.toarray()
+
+def struct_calc_setup(coupling_op, M_sq, N, H, partial_basis, S=None,
+                      use_sparse=False):
+    """Do repeated tasks for computing superoperators from structure constants.
+
+    Plays the same role as ``op_calc_setup`` for the ``struct_*_op``
+    functions, replacing the dictionaries of basis products with the tensor
+    of structure constants. If the structure constants `S` of the basis are
+    already known (e.g. from ``structure.gellmann_struct_consts``) they are
+    used instead of being computed. If `use_sparse` is ``True`` the
+    superoperators are built and returned as ``scipy.sparse.csr_matrix``.
+
+    """
+    basis = list(partial_basis) + [np.eye(*partial_basis[0].shape)]
+    if S is None:
+        S = struct_consts(basis)
+
+    return {'dim': len(basis),
+            'C_vector': vectorize(coupling_op, basis),
+            'H_vector': vectorize(H, basis),
+            'struct_consts': S,
+            'basis': basis, 'M_sq': M_sq, 'N': N, 'use_sparse': use_sparse,
+            'basis_norms_sq': np.array([norm_squared(basis_el)
+                                        for basis_el in basis])}
+
+def struct_diffusion_op(C_vector, struct_consts, use_sparse=False, **kwargs):
+    r"""Return the matrix form of the diffusion linear operator.
+
+    Computes the same matrix :math:`D` as ``diffusion_op`` by composing left
+    and right multiplication matrices built from the structure constants:
+
+    .. math::
+
+       D=\Re\left\{L_cR_{c^\dagger}-\frac{1}{2}(L_{c^\dagger}L_c+
+       R_cR_{c^\dagger})\right\}
+
+    """
+    S = struct_consts
+    L_c = left_mult_rep(C_vector, S, use_sparse)
+    L_c_dag = left_mult_rep(C_vector.conj(), S, use_sparse)
+    R_c = right_mult_rep(C_vector, S, use_sparse)
+    R_c_dag = right_mult_rep(C_vector.conj(), S, use_sparse)
+
+    return (L_c.dot(R_c_dag) - 0.5 * L_c_dag.dot(L_c) -
+            0.5 * R_c.dot(R_c_dag)).real
+
+def struct_double_comm_op(C_vector, struct_consts, M_sq, use_sparse=False,
+                          **kwargs):
+    r"""Return the matrix form of the squeezing double commutator operator.
+
+    Computes the same matrix :math:`E` as ``double_comm_op`` from the
+    structure constants. Writing :math:`u=\sqrt{M^*}c`, the sums over pairs of
+    basis elements weighted by :math:`\Re\{M^*c_wc_z\}` in that function
+    factor into
+
+    .. math::
+
+       E=\frac{3}{2}\Re\left\{L_uL_u-L_uR_u+L_{u^\dagger}L_{u^\dagger}-
+       L_{u^\dagger}R_{u^\dagger}\right\}
+
+    """
+    S = struct_consts
+    u_vector = np.sqrt(np.conj(M_sq) + 0.j) * C_vector
+    L_u, L_u_dag = [left_mult_rep(vec, S, use_sparse)
+                    for vec in (u_vector, u_vector.conj())]
+    R_u, R_u_dag = [right_mult_rep(vec, S, use_sparse)
+                    for vec in (u_vector, u_vector.conj())]
+
+    return 1.5 * (L_u.dot(L_u - R_u) + L_u_dag.dot(L_u_dag - R_u_dag)).real
+
+def struct_hamiltonian_op(H_vector, struct_consts, use_sparse=False,
+                          **kwargs):
+    r"""Return the matrix form of the Hamiltonion evolution operator.
+
+    Computes the same matrix :math:`F` as ``hamiltonian_op`` from the
+    structure constants: :math:`F=\Im\{L_H-R_H\}`.
+
+    """
+    h_vector = H_vector.real
+    return (left_mult_rep(h_vector, struct_consts, use_sparse) -
+            right_mult_rep(h_vector, struct_consts, use_sparse)).imag
+
+def struct_weiner_op(C_vector, struct_consts, basis_norms_sq,
+                     use_sparse=False, **kwargs):
+    r"""Return the matrix and vector governing the stochastic evolution
+
+    Computes the same pair :math:`(G,\vec{k})` as ``weiner_op`` from the
+    structure constants: :math:`G=2\Re\{L_c\}`.
+
+    """
+    G_matrix = 2 * left_mult_rep(C_vector, struct_consts, use_sparse).real
+    k_vec = -2.0 * C_vector.real * basis_norms_sq
+
+    return G_matrix, k_vec
+
+def liouville_basis_change(basis):
+    r"""Return the matrices changing between Liouville space and a basis.
+
+    In Liouville space an operator :math:`X` is represented by stacking its
+    columns into the vector :math:`|X\rangle\rangle`, so that
+    :math:`|AXB\rangle\rangle=(B^T\otimes A)|X\rangle\rangle`. The returned
+    matrices take a Liouville-space superoperator :math:`\mathcal{L}` to its
+    matrix in the basis via :math:`P\mathcal{L}V`. They only depend on the
+    basis, so they can be computed once and reused.
+
+    Parameters
+    ----------
+    basis : list(numpy.array)
+        A complete orthogonal basis for the operators
+
+    Returns
+    -------
+    tuple(numpy.array)
+        The matrix :math:`V` whose columns are the basis elements in
+        Liouville space and the matrix :math:`P` whose rows extract components
+        in the basis from Liouville-space vectors.
+
+    """
+    basis = np.asarray(basis)
+    dim = basis.shape[0]
+    V = basis.transpose(0, 2, 1).reshape(dim, -1).T
+    norms_sq = np.array([norm_squared(basis_el) for basis_el in basis])
+    P = V.conj().T / norms_sq[:,np.newaxis]
+
+    return V, P
+
+def matrix_unit_basis(d):
+    r"""Return a Hermitian basis built from matrix units.
+
+    The element with index :math:`dj+k` is :math:`|j\rangle\langle j|` for
+    :math:`j=k`, :math:`|j\rangle\langle k|+|k\rangle\langle j|` for
+    :math:`j>k`, and :math:`-i|j\rangle\langle k|+i|k\rangle\langle j|` for
+    :math:`j<k` (the off-diagonal elements coincide with those of the
+    generalized Gell-Mann basis). Since every element only has entries at
+    :math:`(j,k)` and :math:`(k,j)`, operators that are sparse in the
+    computational basis (e.g. ladder operators on a truncated Fock space) give
+    sparse superoperators. Note the basis does not contain the identity.
+
+    Parameters
+    ----------
+    d : int
+        The dimension of the Hilbert space
+
+    Returns
+    -------
+    numpy.array, shape=(d**2, d, d)
+        The basis
+
+    """
+    els, rows, cols, vals = _matrix_unit_entries(d)
+    basis = np.zeros((d**2, d, d), dtype=np.complex128)
+    basis[els, rows, cols] = vals
+    return basis
+
+def _matrix_unit_entries(d):
+    j, k = np.divmod(np.arange(d**2), d)
+    off = j != k
+    return (np.concatenate([j * d + k, (j * d + k)[off]]),
+            np.concatenate([j, k[off]]), np.concatenate([k, j[off]]),
+            np.concatenate([np.where(j < k, -1.j, 1. + 0.j),
+                            np.where(j < k, 1.j, 1. + 0.j)[off]]))
+
+def matrix_unit_basis_change(d):
+    r"""Return the sparse change of basis between Liouville space and
+    ``matrix_unit_basis(d)``.
+
+    Equal to ``liouville_basis_change(matrix_unit_basis(d))``, but built
+    directly in sparse form without ever forming dense :math:`d^2\times d^2`
+    matrices.
+
+    Parameters
+    ----------
+    d : int
+        The dimension of the Hilbert space
+
+    Returns
+    -------
+    tuple(scipy.sparse.csr_matrix)
+        The matrices :math:`V` and :math:`P` (see ``liouville_basis_change``)
+
+    """
+    els, rows, cols, vals = _matrix_unit_entries(d)
+    # Column stacking puts entry (r, c) at index d*c + r.
+    V = sparse.csr_matrix((vals, (d * cols + rows, els)), shape=(d**2, d**2))
+    norms_sq = np.where(np.arange(d**2) % (d + 1) == 0, 1., 2.)
+    P = sparse.csr_matrix(V.conj().T.multiply(1 / norms_sq[:,np.newaxis]))
+
+    return V, P
+
+def matrix_unit_integrator_kwargs(c_op, M_sq, N, H, use_sparse=False):
+    r"""Return keyword arguments for constructing an integrator that works in
+    ``matrix_unit_basis``.
+
+    The superoperators are built in Liouville space and changed into the
+    basis with ``matrix_unit_basis_change``, so with `use_sparse` nothing
+    dense of size :math:`d^2\times d^2` is formed. The resulting
+    :class:`integrate.Solution` objects carry the matrix-unit basis, so
+    expectation values and density matrices are computed as usual.
+
+    Parameters
+    ----------
+    c_op : numpy.array
+        The coupling operator
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H : numpy.array
+        The plant Hamiltonian
+    use_sparse : bool, optional
+        Whether to build the superoperators as ``scipy.sparse.csr_matrix``.
+
+    Returns
+    -------
+    dict
+        Arguments for the constructor of any integrator in ``integrate``
+
+    """
+    d = c_op.shape[0]
+    basis_change = matrix_unit_basis_change(d)
+    G, k_T = construct_G_k_T_liouville(c_op, M_sq, N, H, None, basis_change,
+                                       use_sparse)
+    return {'c_op': c_op, 'M_sq': M_sq, 'N': N, 'H': H,
+            'basis': matrix_unit_basis(d),
+            'drift_rep': construct_Q_liouville(c_op, M_sq, N, H, None,
+                                               basis_change, use_sparse),
+            'diffusion_reps': {'G': G, 'k_T': k_T},
+            'use_sparse': use_sparse}
+
+def _kron(A, B, use_sparse):
+    if use_sparse:
+        return sparse.kron(A, B, format='csr')
+    return np.kron(A, B)
+
+def liouville_diffusion_op(c_op, use_sparse=False):
+    r"""Return :math:`\mathcal{D}[c]` as a Liouville-space matrix.
+
+    .. math::
+
+       \bar{c}\otimes c-\frac{1}{2}\left(I\otimes c^\dagger c+
+       (c^\dagger c)^T\otimes I\right)
+
+    """
+    Id = np.eye(*c_op.shape)
+    c_dag_c = np.dot(c_op.conj().T, c_op)
+    return (_kron(c_op.conj(), c_op, use_sparse) -
+            0.5 * _kron(Id, c_dag_c, use_sparse) -
+            0.5 * _kron(c_dag_c.T, Id, use_sparse))
+
+def liouville_double_comm_op(c_op, M_sq, use_sparse=False):
+    r"""Return the squeezing superoperator as a Liouville-space matrix.
+
+    Gives the same matrix :math:`E` as ``double_comm_op`` after the change of
+    basis. Writing :math:`u=\sqrt{M^*}c` this is
+
+    .. math::
+
+       \frac{3}{2}\left(I\otimes u^2-u^T\otimes u+
+       I\otimes(u^\dagger)^2-\bar{u}\otimes u^\dagger\right)
+
+    """
+    Id = np.eye(*c_op.shape)
+    u = np.sqrt(np.conj(M_sq) + 0.j) * c_op
+    E = 0
+    for op in (u, u.conj().T):
+        E = E + (_kron(Id, np.dot(op, op), use_sparse) -
+                 _kron(op.T, op, use_sparse))
+    return 1.5 * E
+
+def liouville_hamiltonian_op(H, use_sparse=False):
+    r"""Return :math:`-i[H,\cdot]` as a Liouville-space matrix.
+
+    Only the Hermitian part of `H` is used, matching ``hamiltonian_op``.
+
+    """
+    Id = np.eye(*H.shape)
+    H_herm = (H + H.conj().T) / 2
+    return -1.j * (_kron(Id, H_herm, use_sparse) -
+                   _kron(H_herm.T, Id, use_sparse))
+
+def liouville_weiner_op(c_op, use_sparse=False):
+    r"""Return :math:`c\cdot+\cdot c^\dagger` as a Liouville-space matrix."""
+    Id = np.eye(*c_op.shape)
+    return (_kron(Id, c_op, use_sparse) +
+            _kron(c_op.conj(), Id, use_sparse))
+
+def _liouville_setup(partial_basis, basis_change, use_sparse):
+    if basis_change is None:
+        basis_change = liouville_basis_change(
+                list(partial_basis) + [np.eye(*partial_basis[0].shape)])
+    V, P = basis_change
+    if use_sparse:
+        V, P = sparse.csr_matrix(V), sparse.csr_matrix(P)
+    elif sparse.issparse(V):
+        V, P = V.toarray(), P.toarray()
+    return V, P
+
+@memoize(op_cache)
+def construct_Q_liouville(coupling_op, M_sq, N, H, partial_basis,
+                          basis_change=None, use_sparse=False):
+    r"""Construct the drift matrix by way of Liouville space.
+
+    Gives the same matrix as ``construct_Q``, but builds the superoperator
+    from Kronecker products in Liouville space and changes into the basis with
+    two matrix products instead of using structure constants.
+
+    Parameters
+    ----------
+    coupling_op : numpy.array
+        The coupling operator
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H : numpy.array
+        The plant Hamiltonian
+    partial_basis : list(numpy.array)
+        An almost complete (minus identity), Hermitian, traceless, orthogonal
+        basis for the operators (does not need to be normalized). Ignored if
+        `basis_change` is given.
+    basis_change : tuple(numpy.array), optional
+        The output of ``liouville_basis_change`` for the complete basis, if
+        already computed. Any complete Hermitian orthogonal basis may be used
+        this way, including ones without the identity such as
+        ``matrix_unit_basis``.
+    use_sparse : bool, optional
+        Whether to return a ``scipy.sparse.csr_matrix``.
+
+    Returns
+    -------
+    numpy.array
+        The matrix :math:`Q`
+
+    """
+    V, P = _liouville_setup(partial_basis, basis_change, use_sparse)
+    L = ((N + 1) * liouville_diffusion_op(coupling_op, use_sparse) +
+         N * liouville_diffusion_op(coupling_op.conj().T, use_sparse) +
+         liouville_double_comm_op(coupling_op, M_sq, use_sparse) +
+         liouville_hamiltonian_op(H, use_sparse))
+    Q = P.dot(L.dot(V)).real
+    if use_sparse:
+        Q.eliminate_zeros()
+
+    return Q
+
+@memoize(op_cache)
+def construct_G_k_T_liouville(c_op, M_sq, N, H, partial_basis,
+                              basis_change=None, use_sparse=False):
+    r"""Construct the diffusion matrix and vector by way of Liouville space.
+
+    Gives the same pair as ``construct_G_k_T`` (see
+    ``construct_Q_liouville``).
+
+    """
+    V, P = _liouville_setup(partial_basis, basis_change, use_sparse)
+    c_eff = (N + np.conj(M_sq) + 1) * c_op - (N + M_sq) * c_op.conj().T
+    G = P.dot(liouville_weiner_op(c_eff, use_sparse).dot(V)).real
+    if use_sparse:
+        G.eliminate_zeros()
+    C_vector = P.dot(c_eff.T.reshape(-1))
+    # The columns of V are the basis elements, so give their norms.
+    if use_sparse:
+        norms_sq = np.asarray(abs(V).power(2).sum(axis=0)).ravel()
+    else:
+        norms_sq = np.sum(np.abs(V)**2, axis=0)
+    k_T = -2.0 * C_vector.real * norms_sq
+
+    return G, k_T
+
+@memoize(op_cache)
+def construct_Q(coupling_op, M_sq, N, H, partial_basis, S=None,
+                use_sparse=False):
+    r"""Construct the drift matrix :math:`Q` from structure constants.
+
+    The result is memoized in ``op_cache`` and shared between callers, so it
+    is read-only (use ``Q.copy()`` to modify it in place).
+
+    Parameters
+    ----------
+    coupling_op : numpy.array
+        The coupling operator
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H : numpy.array
+        The plant Hamiltonian
+    partial_basis : list(numpy.array)
+        An almost complete (minus identity), Hermitian, traceless, orthogonal
+        basis for the operators (does not need to be normalized).
+    S : numpy.array, optional
+        The structure constants of the complete basis, if already known
+    use_sparse : bool, optional
+        Whether to return a ``scipy.sparse.csr_matrix``.
+
+    Returns
+    -------
+    numpy.array
+        The read-only matrix :math:`Q`
+
+    """
+    common_dict = struct_calc_setup(coupling_op, M_sq, N, H, partial_basis, S,
+                                    use_sparse)
+    D_c = struct_diffusion_op(**common_dict)
     conjugate_dict = common_dict.copy()
     conjugate_dict['C_vector'] = common_dict['C_vector'].conjugate()
-    D_c_dag = diffusion_op(**conjugate_dict)
-    E = double_comm_op(**common_dict)
-    F = hamiltonian_op(**common_dict)
+    D_c_dag = struct_diffusion_op(**conjugate_dict)
+    E = struct_double_comm_op(**common_dict)
+    F = struct_hamiltonian_op(**common_dict)
 
     Q = (N + 1) * D_c + N * D_c_dag + E + F
+    if use_sparse:
+        Q.eliminate_zeros()
 
     return Q
 
 
-def construct_G_k_T(c_op, M_sq, N, H, partial_basis):
-    common_dict = op_calc_setup((N + M_sq.conjugate() + 1) * c_op -
-                                (N + M_sq) * c_op.conj().T, M_sq, N, H,
-                                partial_basis)
+@memoize(op_cache)
+def construct_G_k_T(c_op, M_sq, N, H, partial_basis, S=None,
+                    use_sparse=False):
+    r"""Construct the diffusion matrix :math:`G` and vector
+    :math:`\vec{k}^T` from structure constants.
+
+    Takes the same arguments as ``construct_Q``. The result is memoized in
+    ``op_cache`` and shared between callers, so its arrays are read-only.
 
-    G, k_T = weiner_op(**common_dict)
+    Returns
+    -------
+    tuple(numpy.array)
+        The read-only :math:`G` and :math:`\vec{k}^T`
+
+    """
+    common_dict = struct_calc_setup((N + M_sq.conjugate() + 1) * c_op -
+                                    (N + M_sq) * c_op.conj().T, M_sq, N, H,
+                                    partial_basis, S, use_sparse)
+
+    G, k_T = struct_weiner_op(**common_dict)
+    if use_sparse:
+        G.eliminate_zeros()
 
     return G, k_T
 
@@ -367,3 +989,196 @@ def weiner_op(dim, C_vector, double_prods, basis_norms_sq, basis, **kwargs):
                                       basis_norms_sq[row])
 
     return G_matrix, k_vec
+
+class AffineModel:
+    r"""Superoperators for a family of systems with affine parameter dependence.
+
+    Describes the family of systems with Hamiltonians
+
+    .. math::
+
+       H(\vec{\theta})=H_0+\sum_i\theta_iH_i
+
+    and optionally a coupling rate :math:`\gamma`, so that the coupling
+    operator is :math:`\sqrt{\gamma}c`. All the superoperator pieces are
+    computed once on construction, so the drift and diffusion representations
+    (and the products used by higher-order integrators) for particular
+    parameters are just linear combinations of cached matrices:
+
+    .. math::
+
+       \begin{align}
+       Q(\vec{\theta}) &= \gamma Q_c+F_0+\sum_i\theta_iF_i \\
+       G(\vec{\theta}) &= \sqrt{\gamma}G_c \\
+       \vec{k}(\vec{\theta}) &= \sqrt{\gamma}\vec{k}_c
+       \end{align}
+
+    Parameters
+    ----------
+    c_op : numpy.array
+        The coupling operator :math:`c`
+    M_sq : complex float
+        The squeezing parameter
+    N : non-negative float
+        The thermal parameter
+    H0 : numpy.array
+        The parameter-independent part of the Hamiltonian
+    H_terms : list of numpy.array
+        The Hamiltonian terms :math:`H_i` multiplied by the parameters
+    basis : list of numpy.array, optional
+        The Hermitian basis to vectorize the operators in terms of (with the
+        component proportional to the identity in last place). If no basis is
+        provided the generalized Gell-Mann basis will be used.
+    rate_param : bool, optional
+        Whether the last parameter is the coupling rate :math:`\gamma`
+        (otherwise :math:`\gamma=1`).
+    order : float, optional
+        The strong order (0.5, 1, or 1.5) of the integrators to be
+        constructed, which determines what products are precomputed.
+    use_sparse : bool, optional
+        Whether to build the superoperators as ``scipy.sparse.csr_matrix``.
+
+    """
+    def __init__(self, c_op, M_sq, N, H0, H_terms, basis=None,
+                 rate_param=False, order=1, use_sparse=False):
+        # Importing here to avoid circular dependencies
+        import pysme.structure as structure
+
+        d = c_op.shape[0]
+        if basis is None:
+            basis = gm.get_basis_array(d)
+            S = structure.gellmann_struct_consts(d)
+            def build_Q(c, H):
+                return construct_Q(c, M_sq, N, H, basis[:-1], S, use_sparse)
+            G, k_T = construct_G_k_T(c_op, M_sq, N, H0, basis[:-1], S,
+                                     use_sparse)
+        else:
+            basis_change = liouville_basis_change(basis)
+            def build_Q(c, H):
+                return construct_Q_liouville(c, M_sq, N, H, basis[:-1],
+                                             basis_change, use_sparse)
+            G, k_T = construct_G_k_T_liouville(c_op, M_sq, N, H0,
+                                               basis[:-1], basis_change,
+                                               use_sparse)
+
+        zero_op = np.zeros(c_op.shape, dtype=np.complex128)
+        self.c_op = c_op
+        self.M_sq = M_sq
+        self.N = N
+        self.H0 = H0
+        self.H_terms = list(H_terms)
+        self.basis = basis
+        self.rate_param = rate_param
+        self.order = order
+        self.Q_pieces = ([build_Q(c_op, zero_op), build_Q(zero_op, H0)] +
+                         [build_Q(zero_op, H) for H in self.H_terms])
+        self.G = G
+        self.k_T = k_T
+
+        if order >= 1:
+            self.k_T_G = G.T.dot(k_T)
+            self.G2 = G.dot(G)
+        if order >= 1.5:
+            self.G3 = self.G2.dot(G)
+            self.k_T_G2 = self.G2.T.dot(k_T)
+            self.Q2_pieces = [[Q_a.dot(Q_b) for Q_b in self.Q_pieces]
+                              for Q_a in self.Q_pieces]
+            self.QG_pieces = [Q_a.dot(G) for Q_a in self.Q_pieces]
+            self.GQ_pieces = [G.dot(Q_a) for Q_a in self.Q_pieces]
+            self.k_T_Q_pieces = [Q_a.T.dot(k_T) for Q_a in self.Q_pieces]
+
+    def weights(self, params):
+        r"""Return the weights of the drift pieces and the diffusion pieces.
+
+        Returns
+        -------
+        tuple
+            The coefficients :math:`(\gamma, 1, \theta_1, \dots)` multiplying
+            :math:`(Q_c, F_0, F_1, \dots)` and the coefficient
+            :math:`\sqrt{\gamma}` multiplying :math:`G_c` and
+            :math:`\vec{k}_c`.
+
+        """
+        params = np.atleast_1d(params)
+        if self.rate_param:
+            rate = params[-1]
+            params = params[:-1]
+        else:
+            rate = 1
+        return np.concatenate([[rate, 1], params]), np.sqrt(rate)
+
+    def drift_rep(self, params):
+        r"""Return the matrix :math:`Q` for particular parameters."""
+        Q_weights, _ = self.weights(params)
+        return _lin_comb(Q_weights, self.Q_pieces)
+
+    def diffusion_reps(self, params):
+        r"""Return :math:`G` and :math:`\vec{k}^T` for particular parameters.
+
+        Returns
+        -------
+        dict of numpy.array
+            Dictionary in the form expected by the `diffusion_reps` argument of
+            integrator constructors.
+
+        """
+        _, G_weight = self.weights(params)
+        return {'G': G_weight * self.G, 'k_T': G_weight * self.k_T}
+
+    def product_reps(self, params):
+        r"""Return products used by higher-order integrators.
+
+        Returns
+        -------
+        dict of numpy.array
+            Dictionary in the form expected by the `product_reps` argument of
+            integrator constructors.
+
+        """
+        Q_weights, G_weight = self.weights(params)
+        products = {}
+        if self.order >= 1:
+            products['k_T_G'] = G_weight**2 * self.k_T_G
+            products['G2'] = G_weight**2 * self.G2
+        if self.order >= 1.5:
+            products['G3'] = G_weight**3 * self.G3
+            products['k_T_G2'] = G_weight**3 * self.k_T_G2
+            products['Q2'] = _lin_comb(np.outer(Q_weights, Q_weights).ravel(),
+                                       [Q_ab for Q_a in self.Q2_pieces
+                                        for Q_ab in Q_a])
+            products['QG'] = G_weight * _lin_comb(Q_weights, self.QG_pieces)
+            products['GQ'] = G_weight * _lin_comb(Q_weights, self.GQ_pieces)
+            products['k_T_Q'] = G_weight * _lin_comb(Q_weights,
+                                                     self.k_T_Q_pieces)
+        return products
+
+    def constructor_kwargs(self, params):
+        r"""Return keyword arguments for constructing an integrator.
+
+        Returns
+        -------
+        dict
+            Arguments for the constructor of an integrator for the system with
+            the given parameters that need no further superoperator
+            computation.
+
+        """
+        Q_weights, G_weight = self.weights(params)
+        return {'c_op': G_weight * self.c_op, 'M_sq': self.M_sq, 'N': self.N,
+                'H': _lin_comb(Q_weights[1:], [self.H0] + self.H_terms),
+                'basis': self.basis,
+                'drift_rep': self.drift_rep(params),
+                'diffusion_reps': self.diffusion_reps(params),
+                'product_reps': self.product_reps(params)}
+
+def _lin_comb(weights, pieces):
+    result = weights[0] * pieces[0]
+    for weight, piece in zip(weights[1:], pieces[1:]):
+        if weight != 0:
+            result = result + weight * piece
+    return result
+
+def affine_parameter_fn(params, model):
+    """Parameter function for ``integrate.IntegratorFactory`` using an
+    ``AffineModel`` as the precomputed data."""
+    return model.constructor_kwargs(params)
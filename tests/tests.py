@@ -1,10 +1,18 @@
-from nose.tools import assert_almost_equal, assert_equal, assert_true
+from nose.tools import (assert_almost_equal, assert_equal, assert_true,
+                        assert_raises)
+from unittest import SkipTest
 import pysme.gellmann as gm
 import pysme.gramschmidt as gs
 import pysme.system_builder as sb
 import pysme.grid_conv as gc
 import pysme.integrate as integrate
+import pysme.structure as struct
+import pysme.cache as cache
+import pysme.composite as composite
+import pysme.noise as noise
 import numpy as np
+import os
+import tempfile
 
 def check_orthogonal(A, B):
     dot_prod = np.sqrt(np.trace(np.dot(A.conj().T, B)))
@@ -39,6 +47,30 @@ def test_gellmann():
                             check_orthogonal(matrices[j - 1][k - 1],
                                 matrices[jj - 1][kk - 1])
 
+def test_gellmann_basis_array():
+    np.random.seed(2236)
+    for d in range(1, 5 + 1):
+        basis = gm.get_basis_array(d)
+        assert_true(basis is gm.get_basis_array(d))
+        assert_true(not basis.flags.writeable)
+        # get_basis still hands out a list of fresh, writeable operators.
+        basis_list = gm.get_basis(d)
+        assert_true(isinstance(basis_list, list))
+        assert_equal(len(basis_list[:-1] + [np.eye(d)]), d**2)
+        assert_true(all(op.flags.writeable for op in basis_list))
+        for j in range(1, d + 1):
+            for k in range(1, d + 1):
+                check_mat_eq(basis[d*(j - 1) + k - 1], gm.gellmann(j, k, d))
+        ops = np.random.randn(3, d, d) + 1.j*np.random.randn(3, d, d)
+        assert_almost_equal(np.max(np.abs(sb.vectorize_stack(ops, basis) -
+                                          sb.vectorize_stack(ops,
+                                                             list(basis)))),
+                            0, 7)
+        assert_almost_equal(np.max(np.abs(sb.dualize_stack(ops, basis) -
+                                          sb.dualize_stack(ops,
+                                                           list(basis)))),
+                            0, 7)
+
 def check_recon(A, basis):
     A_coeffs = [ np.trace(np.dot(vect, A)) for vect in basis[0:3] ]
     A_recon = sum([ coeff*vect for coeff, vect in zip(A_coeffs, basis) ])
@@ -68,6 +100,8 @@ def test_gramschmidt():
     for test_matrix in test_matrices:
         d = test_matrix.shape[0]
         basis = gs.orthonormalize(test_matrix)
+        assert_true(isinstance(basis, list))
+        assert_equal(len(basis), d**2)
         check_recon(test_matrix, basis)
         for m in range(len(basis)):
             if m == 0:
@@ -81,6 +115,22 @@ def test_gramschmidt():
                 else:
                     check_norm(basis[m], 1)
 
+def test_gramschmidt_multiple():
+    np.random.seed(1414)
+    d = 4
+    ops = [np.random.randn(d, d) + 1.j*np.random.randn(d, d) for _ in range(2)]
+    basis, transform = gs.orthonormalize(ops, return_transform=True,
+                                         identity_last=True)
+    check_mat_eq(np.dot(transform, transform.T), np.eye(d**2))
+    check_mat_eq(basis[-1], np.eye(d)/np.sqrt(d))
+    for m in range(len(basis)):
+        check_hermitian(basis[m])
+        check_norm(basis[m], 1)
+    for op in ops:
+        vec = sb.vectorize(op, basis)
+        assert_almost_equal(np.max(np.abs(vec[4:-1])), 0, 7)
+        check_mat_eq(sb.devectorize_stack(vec, basis), op)
+
 def basis(n):
     """Return an orthogonal basis for n-by-n operators, with the identity in the
     last position.
@@ -130,6 +180,29 @@ def check_vectorize(operators, basis):
         diff = reconstruction - operator
         assert_almost_equal(np.trace(np.dot(diff.conj().T, diff)), 0, 7)
 
+def test_vectorize_stack():
+    r'''Make sure stacked vectorization agrees with taking the trace against
+    each basis element and that devectorization inverts it.
+
+    '''
+    np.random.seed(577)
+    dim = 3
+    operators = (np.random.randn(5, dim, dim) +
+                 1.j*np.random.randn(5, dim, dim))
+    for op_basis in [basis(dim), gm.get_basis_array(dim)]:
+        vecs = sb.vectorize_stack(operators, op_basis)
+        duals = sb.dualize_stack(operators, op_basis)
+        for operator, vec, dual in zip(operators, vecs, duals):
+            expected_vec = [np.trace(np.dot(basis_el.conj().T, operator))/
+                            np.trace(np.dot(basis_el.conj().T, basis_el))
+                            for basis_el in op_basis]
+            expected_dual = [np.trace(np.dot(basis_el, operator.conj().T))
+                             for basis_el in op_basis]
+            assert_almost_equal(np.max(np.abs(vec - expected_vec)), 0, 7)
+            assert_almost_equal(np.max(np.abs(dual - expected_dual)), 0, 7)
+        reconstructions = sb.devectorize_stack(vecs, op_basis)
+        assert_almost_equal(np.max(np.abs(reconstructions - operators)), 0, 7)
+
 def test_system_builder():
     check_trace_preservation(sb.diffusion_op, lambda c_op, partial_basis:
                              sb.op_calc_setup(c_op, 0, 0, np.zeros(c_op.shape),
@@ -177,6 +250,167 @@ def test_system_builder():
     check_vectorize(c2_operators, mixed_basis2)
     check_vectorize(c3_operators, basis(3))
 
+def check_struct_ops(c_op, M_sq, N, H, partial_basis):
+    loop_dict = sb.op_calc_setup(c_op, M_sq, N, H, partial_basis)
+    struct_dict = sb.struct_calc_setup(c_op, M_sq, N, H, partial_basis)
+    op_pairs = [(sb.diffusion_op, sb.struct_diffusion_op),
+                (sb.double_comm_op, sb.struct_double_comm_op),
+                (sb.hamiltonian_op, sb.struct_hamiltonian_op)]
+    for loop_op, struct_op in op_pairs:
+        diff = loop_op(**loop_dict) - struct_op(**struct_dict)
+        assert_almost_equal(np.max(np.abs(diff)), 0, 7)
+    G_loop, k_T_loop = sb.weiner_op(**loop_dict)
+    G_struct, k_T_struct = sb.struct_weiner_op(**struct_dict)
+    assert_almost_equal(np.max(np.abs(G_loop - G_struct)), 0, 7)
+    assert_almost_equal(np.max(np.abs(k_T_loop - k_T_struct)), 0, 7)
+
+def test_struct_ops():
+    r'''Make sure superoperators assembled from structure constants agree with
+    those assembled from explicit products of basis elements.
+
+    '''
+    np.random.seed(2718)
+    for dim in range(2, 4 + 1):
+        c_op = np.random.randn(dim, dim) + 1.j*np.random.randn(dim, dim)
+        H = np.random.randn(dim, dim) + 1.j*np.random.randn(dim, dim)
+        H = H + H.conj().T
+        for M_sq in [0, 0.3 + 0.4j, -1.j]:
+            check_struct_ops(c_op, M_sq, 0.7, H, basis(dim)[:-1])
+
+def test_liouville_construction():
+    r'''Make sure superoperators built in Liouville space and changed into an
+    operator basis agree with those built from structure constants.
+
+    '''
+    np.random.seed(1618)
+    for dim in range(2, 4 + 1):
+        orth_mat = np.linalg.qr(np.random.randn(dim**2 - 1, dim**2 - 1))[0]
+        mixed_basis = [sum([entry*basis_el for entry, basis_el in
+                            zip(row, basis(dim)[:-1])]) for row in orth_mat]
+        for partial_basis in [basis(dim)[:-1], mixed_basis]:
+            c_op = np.random.randn(dim, dim) + 1.j*np.random.randn(dim, dim)
+            H = np.random.randn(dim, dim) + 1.j*np.random.randn(dim, dim)
+            for M_sq in [0, 0.3 + 0.4j]:
+                Q_struct = sb.construct_Q(c_op, M_sq, 0.3, H, partial_basis)
+                Q_liouville = sb.construct_Q_liouville(c_op, M_sq, 0.3, H,
+                                                       partial_basis)
+                assert_almost_equal(np.max(np.abs(Q_struct - Q_liouville)),
+                                    0, 7)
+                G_struct, k_T_struct = sb.construct_G_k_T(c_op, M_sq, 0.3, H,
+                                                          partial_basis)
+                G_liouville, k_T_liouville = sb.construct_G_k_T_liouville(
+                        c_op, M_sq, 0.3, H, partial_basis)
+                assert_almost_equal(np.max(np.abs(G_struct - G_liouville)),
+                                    0, 7)
+                assert_almost_equal(np.max(np.abs(k_T_struct -
+                                                  k_T_liouville)), 0, 7)
+
+def test_matrix_unit_basis():
+    r'''Make sure integrating in the matrix-unit basis gives the same
+    trajectory as integrating in the Gell-Mann basis.
+
+    '''
+    dim = 4
+    V, P = sb.matrix_unit_basis_change(dim)
+    V_dense, P_dense = sb.liouville_basis_change(sb.matrix_unit_basis(dim))
+    assert_almost_equal(np.max(np.abs(V.toarray() - V_dense)), 0, 7)
+    assert_almost_equal(np.max(np.abs(P.toarray() - P_dense)), 0, 7)
+
+    a = np.diag(np.sqrt(np.arange(1, dim)), 1).astype(np.complex128)
+    H = np.dot(a.conj().T, a) + 0.3*(a + a.conj().T)
+    rho_0 = np.zeros((dim, dim), dtype=np.complex128)
+    rho_0[0,0] = 1
+    times = np.linspace(0, 1, 201)
+    np.random.seed(31415)
+    U1s = np.random.randn(len(times) - 1)
+    gm_soln = integrate.MilsteinHomodyneIntegrator(
+            a, 0.2 + 0.1j, 0.3, H).integrate(rho_0, times, U1s)
+    for use_sparse in [False, True]:
+        kwargs = sb.matrix_unit_integrator_kwargs(a, 0.2 + 0.1j, 0.3, H,
+                                                  use_sparse)
+        mu_soln = integrate.MilsteinHomodyneIntegrator(**kwargs).integrate(
+                rho_0, times, U1s)
+        assert_almost_equal(np.max(np.abs(mu_soln.get_density_matrices() -
+                                          gm_soln.get_density_matrices())),
+                            0, 7)
+        assert_almost_equal(np.max(np.abs(mu_soln.get_purities() -
+                                          gm_soln.get_purities())), 0, 7)
+
+def test_composite_construction():
+    r'''Make sure superoperators assembled from subsystem structure constants
+    agree with those built from the full operators in the product basis.
+
+    '''
+    np.random.seed(2718)
+    rand_op = lambda d: np.random.randn(d, d) + 1.j*np.random.randn(d, d)
+    dims = [2, 3]
+    c_terms = [(rand_op(2), None), (rand_op(2), rand_op(3))]
+    H_terms = [(None, rand_op(3)), (rand_op(2), rand_op(3))]
+    c_op = composite.product_op(c_terms, dims)
+    H = composite.product_op(H_terms, dims)
+    partial_basis = composite.product_basis(dims)[:-1]
+    M_sq = 0.3 + 0.4j
+    Q = sb.construct_Q(c_op, M_sq, 0.3, H, partial_basis)
+    G, k_T = sb.construct_G_k_T(c_op, M_sq, 0.3, H, partial_basis)
+    for use_sparse in [False, True]:
+        Q_prod = composite.construct_product_Q(c_terms, M_sq, 0.3, H_terms,
+                                               dims, use_sparse)
+        G_prod, k_T_prod = composite.construct_product_G_k_T(c_terms, M_sq,
+                                                             0.3, dims,
+                                                             use_sparse)
+        if use_sparse:
+            Q_prod = Q_prod.toarray()
+            G_prod = G_prod.toarray()
+        assert_almost_equal(np.max(np.abs(Q - Q_prod)), 0, 7)
+        assert_almost_equal(np.max(np.abs(G - G_prod)), 0, 7)
+        assert_almost_equal(np.max(np.abs(k_T - k_T_prod)), 0, 7)
+
+def dense_tensor(sparse_tensor):
+    dense = np.zeros(sparse_tensor.shape, dtype=np.complex128)
+    dense[tuple(sparse_tensor.coords)] = sparse_tensor.data
+    return dense
+
+def test_gellmann_struct_consts():
+    r'''Compare the analytic Gell-Mann structure constants to those computed
+    from products of basis matrices, and make sure the on-disk cache returns
+    the same values.
+
+    '''
+    for dim in range(1, 5 + 1):
+        analytic = dense_tensor(struct.gellmann_struct_consts_compute(dim))
+        numeric = sb.struct_consts(basis(dim))
+        assert_almost_equal(np.max(np.abs(analytic - numeric)), 0, 7)
+
+    f, d = struct.gellmann_f_d(3)
+    f_dense = dense_tensor(f).real
+    d_dense = dense_tensor(d).real
+    assert_almost_equal(np.max(np.abs(f_dense + f_dense.transpose(1, 0, 2))),
+                        0, 7)
+    assert_almost_equal(np.max(np.abs(d_dense - d_dense.transpose(1, 0, 2))),
+                        0, 7)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        computed = struct.gellmann_struct_consts_compute(4)
+        struct._struct_consts_cache.pop(4, None)
+        struct.gellmann_struct_consts(4, cache_dir)
+        # Written through a temporary file, leaving only the entry itself.
+        assert_equal(os.listdir(cache_dir),
+                     [os.path.basename(struct._cache_path(4, cache_dir))])
+        struct._struct_consts_cache.pop(4, None)
+        loaded = struct.gellmann_struct_consts(4, cache_dir)
+        assert_true(np.array_equal(computed.coords, loaded.coords))
+        assert_true(np.array_equal(computed.data, loaded.data))
+
+    # Passing a cache directory after a memory hit still writes the file.
+    struct.gellmann_struct_consts(3)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        struct.gellmann_struct_consts(3, cache_dir)
+        assert_true(os.path.exists(struct._cache_path(3, cache_dir)))
+        # Later memory hits don't go back to the disk.
+        os.remove(struct._cache_path(3, cache_dir))
+        struct.gellmann_struct_consts(3, cache_dir)
+        assert_true(not os.path.exists(struct._cache_path(3, cache_dir)))
+
 def new_dW_from_dW(dW_2n, dW_2n_1):
     return dW_2n + dW_2n_1
 
@@ -218,6 +452,44 @@ def test_double_increments():
         assert_almost_equal(new_dZ_from_dZ(dZs[2*n], dZs[2*n+1], dWs[2*n], dt),
                             new_dZ_from_U(new_U1s[n], new_U2s[n], new_dt), 7)
 
+def test_noise_source():
+    r'''Make sure noise streams depend only on the seed and trajectory, not on
+    how they are chunked, and that coarsened streams agree with doubling the
+    fine increments.
+
+    '''
+    source = noise.NoiseSource(1472, chunk_size=7)
+    U1s = source.U1s(3, 40)
+    assert_true(np.array_equal(U1s, noise.NoiseSource(1472).U1s(3, 40)))
+    assert_true(np.array_equal(source.U1s([2, 3], 40)[1], U1s))
+    assert_true(not np.array_equal(source.U1s(2, 40), U1s))
+    assert_true(not np.array_equal(source.U2s(3, 40), U1s))
+    assert_true(np.array_equal(
+        np.fromiter(source.iter_U1s(3), float, 40), U1s))
+
+    times = np.linspace(0, 1, 41)
+    U2s = source.U2s(3, 40)
+    _, U1s_2, U2s_2 = gc.double_increments(times, U1s, U2s)
+    _, U1s_4, U2s_4 = gc.double_increments(times[::2], U1s_2, U2s_2)
+    assert_almost_equal(np.max(np.abs(source.U1s(3, 10, coarsen=2) - U1s_4)),
+                        0, 12)
+    assert_almost_equal(np.max(np.abs(source.U2s(3, 10, coarsen=2) - U2s_4)),
+                        0, 12)
+
+    # Convergence rates drawn from a source are reproducible.
+    integrator = integrate.MilsteinHomodyneIntegrator(
+            np.array([[0, 1], [0, 0]], dtype=np.complex128), 0, 0,
+            np.zeros((2, 2), dtype=np.complex128))
+    rho_0 = np.array([[0.5, 0.5], [0.5, 0.5]])
+    assert_equal(gc.calc_rate(integrator, rho_0, times, noise_source=source,
+                              trajectory=3),
+                 gc.calc_rate(integrator, rho_0, times, U1s, U2s))
+    # Without a source the increments follow the global numpy.random seed.
+    np.random.seed(1983)
+    rate = gc.calc_rate(integrator, rho_0, times)
+    np.random.seed(1983)
+    assert_equal(gc.calc_rate(integrator, rho_0, times), rate)
+
 def check_convergence_rate(expected_rate, integrator, rho_0, times, U1s_arr,
                            U2s_arr):
     rates = [gc.calc_rate(integrator, rho_0, times, U1s, U2s)
@@ -304,6 +576,15 @@ def test_solution_functions():
     check_density_matrices(t15_soln)
     check_purities(t15_soln)
 
+    observables = np.array([X, Y, Z, Id])
+    expectations = t15_soln.get_expectations(observables)
+    assert_equal(expectations.shape, (len(times), 4))
+    for k, observable in enumerate(observables):
+        dual = sb.dualize(observable, t15_soln.basis).real
+        assert_almost_equal(np.max(np.abs(expectations[:,k] -
+                                          np.dot(t15_soln.vec_soln, dual))),
+                            0, 12)
+
 def test_against_matrix_implementation():
     r'''Compare an Euler trajectory computed naively using matrices to the
     Euler trajectory computed by our implementation for a particular
@@ -329,3 +610,529 @@ def test_against_matrix_implementation():
     error_norms = [sb.norm_squared(test_errors[j])
                    for j in range(test_errors.shape[0])]
     assert_almost_equal(max(error_norms), 0.0, 7)
+
+def random_system(seed, dim=3, n_times=101, n_traj=None):
+    r'''Return a random coupling operator and Hamiltonian, the maximally mixed
+    state, times evenly spaced between 0 and 0.1, and standard-normal noise
+    for them (one row per trajectory if `n_traj` is given) for exercising
+    the integrators.
+
+    '''
+    np.random.seed(seed)
+    c_op = np.random.randn(dim, dim) + 1.j*np.random.randn(dim, dim)
+    H = np.random.randn(dim, dim) + 1.j*np.random.randn(dim, dim)
+    H = H + H.conj().T
+    rho_0 = np.eye(dim)/dim
+    times = np.linspace(0, 0.1, n_times)
+    noise_shape = ((len(times) - 1,) if n_traj is None else
+                   (n_traj, len(times) - 1))
+    U1s = np.random.randn(*noise_shape)
+    U2s = np.random.randn(*noise_shape)
+    return c_op, H, rho_0, times, U1s, U2s
+
+def test_save_every():
+    r'''Make sure decimated trajectories are subsamples of the full ones.
+
+    '''
+    c_op, H, rho_0, times, U1s, U2s = random_system(1732)
+    for IntClass in [integrate.EulerHomodyneIntegrator,
+                     integrate.MilsteinHomodyneIntegrator,
+                     integrate.Taylor_1_5_HomodyneIntegrator]:
+        integrator = IntClass(c_op, 0, 0, H)
+        full = integrator.integrate(rho_0, times, U1s, U2s).vec_soln
+        for save_every in [1, 7, 10]:
+            saved = integrator.integrate(rho_0, times, U1s, U2s,
+                                         save_every).vec_soln
+            assert_equal(saved.shape, full[::save_every].shape)
+            assert_almost_equal(np.max(np.abs(saved - full[::save_every])),
+                                0, 12)
+
+def test_compiled_kernels():
+    r'''Make sure the compiled time loops (if built) agree with stepping in
+    NumPy.
+
+    '''
+    if integrate._kernels is None:
+        raise SkipTest('compiled kernels are not built')
+    c_op, H, rho_0, times, U1s, U2s = random_system(1733)
+    for IntClass in [integrate.EulerHomodyneIntegrator,
+                     integrate.MilsteinHomodyneIntegrator,
+                     integrate.Taylor_1_5_HomodyneIntegrator]:
+        integrator = IntClass(c_op, 0.3, 0.2, H)
+        compiled = integrator.integrate(rho_0, times, U1s, U2s, 3).vec_soln
+        _, stepped = next(integrator.iter_integrate(rho_0, times, iter(U1s),
+                                                    iter(U2s), save_every=3))
+        assert_almost_equal(np.max(np.abs(compiled - stepped.vec_soln)), 0, 12)
+        # Bad arguments are caught before they reach the unchecked loops.
+        assert_raises(ValueError, integrator.integrate, rho_0, times,
+                      U1s[:3], U2s)
+        assert_raises(ValueError, integrator.integrate, rho_0, times, U1s,
+                      U2s, 0)
+    assert_raises(ValueError, integrator.integrate, rho_0, times, U1s,
+                  U2s[:3])
+
+def test_uniform_grid():
+    r'''Make sure the pre-scaled uniform-grid path agrees with the generic
+    stepping functions.
+
+    '''
+    c_op, H, rho_0, times, U1s, U2s = random_system(1737)
+    rho_0_vec = sb.vectorize(rho_0, gm.get_basis(3)).real
+    kernels = integrate._kernels
+    integrate._kernels = None
+    try:
+        euler = integrate.EulerHomodyneIntegrator(c_op, 0.3, 0.2, H)
+        milstein = integrate.MilsteinHomodyneIntegrator(c_op, 0.3, 0.2, H)
+        taylor = integrate.Taylor_1_5_HomodyneIntegrator(c_op, 0.3, 0.2, H)
+        pairs = [
+            (euler.integrate(rho_0, times, U1s, save_every=4).vec_soln,
+             integrate.sde.euler(euler.a_fn, euler.b_fn, rho_0_vec, times,
+                                 U1s, 4)),
+            (milstein.integrate(rho_0, times, U1s, save_every=4).vec_soln,
+             integrate.sde.milstein(milstein.a_fn, milstein.b_fn,
+                                    milstein.b_dx_b_fn, rho_0_vec, times, U1s,
+                                    4)),
+            (taylor.integrate(rho_0, times, U1s, U2s, 4).vec_soln,
+             integrate.sde.time_ind_taylor_1_5(
+                 taylor.a_fn, taylor.b_fn, taylor.b_dx_b_fn, taylor.b_dx_a_fn,
+                 taylor.a_dx_b_fn, taylor.a_dx_a_fn, taylor.b_dx_b_dx_b_fn,
+                 taylor.b_b_dx_dx_b_fn, taylor.b_b_dx_dx_a_fn, rho_0_vec,
+                 times, U1s, U2s, 4))]
+        # Noise beyond the last interval is ignored, and too little rejected.
+        long_U1s = np.concatenate([U1s, np.random.randn(20)])
+        long_U2s = np.concatenate([U2s, np.random.randn(20)])
+        for integrator, (uniform, _) in zip([euler, milstein, taylor], pairs):
+            oversized = integrator.integrate(rho_0, times, long_U1s, long_U2s,
+                                             4).vec_soln
+            assert_equal(oversized.shape, (len(times[::4]), 9))
+            assert_almost_equal(np.max(np.abs(oversized - uniform)), 0, 12)
+            assert_raises(ValueError, integrator.integrate, rho_0, times,
+                          U1s[:3], U2s[:3])
+    finally:
+        integrate._kernels = kernels
+    for uniform, generic in pairs:
+        assert_almost_equal(np.max(np.abs(uniform - generic)), 0, 12)
+    # Subclasses with their own step rule don't take the fast paths.
+    platen = integrate.Platen_1_0_HomodyneIntegrator(c_op, 0.3, 0.2, H)
+    assert_almost_equal(np.max(np.abs(
+        platen.integrate(rho_0, times, U1s, save_every=4).vec_soln -
+        integrate.sde.platen_1_0(platen.a_fn, platen.b_fn, rho_0_vec, times,
+                                 U1s, 4))), 0, 12)
+
+def test_taylor_1_5_step():
+    r'''Make sure the fused Taylor step gives exactly the same trajectory as
+    composing the separate coefficient functions.
+
+    '''
+    c_op, H, rho_0, times, U1s, U2s = random_system(1738)
+    integrator = integrate.Taylor_1_5_HomodyneIntegrator(c_op, 0.3, 0.2, H)
+    rho_0_vec = sb.vectorize(rho_0, integrator.basis).real
+    composed = integrate.sde.time_ind_taylor_1_5_step(
+            integrator.a_fn, integrator.b_fn, integrator.b_dx_b_fn,
+            integrator.b_dx_a_fn, integrator.a_dx_b_fn, integrator.a_dx_a_fn,
+            integrator.b_dx_b_dx_b_fn, integrator.b_b_dx_dx_b_fn,
+            integrator.b_b_dx_dx_a_fn)
+    fused = integrate.taylor_1_5_step(
+            integrator.Q, integrator.G, integrator.k_T, integrator.G2,
+            integrator.k_T_G, integrator.G3, integrator.k_T_G2, integrator.Q2,
+            integrator.QG, integrator.GQ, integrator.k_T_Q)
+    assert_true(np.array_equal(
+        integrate.sde.step_all(composed, rho_0_vec, times, [U1s, U2s]),
+        integrate.sde.step_all(fused, rho_0_vec, times, [U1s, U2s])))
+
+def test_weak_taylor_2_0():
+    r'''Make sure the weak order 2.0 integrator matches the generic scheme and
+    that its ensemble averages approach the unconditional evolution.
+
+    '''
+    c_op, H, rho_0, times, _, _ = random_system(1739)
+    integrator = integrate.WeakTaylor_2_0_HomodyneIntegrator(c_op, 0.3, 0.2,
+                                                             H)
+    assert_true(not hasattr(integrator, 'G3'))
+    assert_true(not hasattr(integrator, 'k_T_G2'))
+    assert_true(not hasattr(integrator, 'b_b_dx_dx_a_fn'))
+    rho_0_vec = sb.vectorize(rho_0, integrator.basis).real
+    Us = integrate.sde.three_point_increments(len(times) - 1)
+    generic = integrate.sde.time_ind_weak_taylor_2(
+            integrator.a_fn, integrator.b_fn, integrator.b_dx_b_fn,
+            integrator.b_dx_a_fn, integrator.a_dx_b_fn, integrator.a_dx_a_fn,
+            integrator.b_b_dx_dx_b_fn, lambda rho: 0, rho_0_vec, times, Us)
+    assert_almost_equal(np.max(np.abs(
+        integrator.integrate(rho_0, times, Us).vec_soln - generic)),
+        0, 12)
+
+    c_op = np.array([[0, 1], [0, 0]], dtype=np.complex128)
+    H = 2*np.array([[0, 1], [1, 0]], dtype=np.complex128)
+    rho_0 = np.array([[0, 0], [0, 1]], dtype=np.complex128)
+    obs = np.diag([0, 1])
+    times = np.linspace(0, 1, 33)
+    exact = integrate.UncondGaussIntegrator(c_op, 0, 0, H).integrate(
+            rho_0, times).get_expectations(obs)[-1]
+    weak = integrate.WeakTaylor_2_0_HomodyneIntegrator(c_op, 0, 0, H)
+    Us = integrate.sde.three_point_increments((50000, len(times) - 1))
+    averaged = np.mean(weak.integrate_ensemble(rho_0, times, Us)
+                       .get_expectations(obs)[:,-1])
+    assert_true(abs(averaged - exact) < 6e-3)
+
+def test_platen():
+    r'''Make sure the derivative-free integrators need none of the precomputed
+    products and stay as close to a fine-grid solution as the Milstein and
+    Taylor integrators they replace.
+
+    '''
+    np.random.seed(1740)
+    c_op = np.array([[0, 1], [0, 0]], dtype=np.complex128)
+    H = np.array([[0, 1], [1, 0]], dtype=np.complex128)
+    rho_0 = np.array([[0.5, 0.5], [0.5, 0.5]])
+    fine_times = np.linspace(0, 1, 2**12 + 1)
+    fine_dt = fine_times[1]
+    fine_dWs = np.sqrt(fine_dt)*np.random.randn(len(fine_times) - 1)
+    reference = integrate.Taylor_1_5_HomodyneIntegrator(
+            c_op, 0.2, 0.1, H).integrate(rho_0, fine_times,
+                                         fine_dWs/np.sqrt(fine_dt))
+    # Coarsen the noise, constructing Delta Z from the fine Wiener path.
+    times = fine_times[::32]
+    dt = times[1]
+    dWs = fine_dWs.reshape(len(times) - 1, 32)
+    dZs = np.sum((np.cumsum(dWs, axis=1) - dWs/2)*fine_dt, axis=1)
+    U1s = np.sum(dWs, axis=1)/np.sqrt(dt)
+    U2s = np.sqrt(3)*(2*dZs/dt**1.5 - U1s)
+
+    platen_1_0 = integrate.Platen_1_0_HomodyneIntegrator(c_op, 0.2, 0.1, H)
+    platen_1_5 = integrate.Platen_1_5_HomodyneIntegrator(c_op, 0.2, 0.1, H)
+    assert_true(not hasattr(platen_1_0, 'G2'))
+    assert_true(not hasattr(platen_1_5, 'G3'))
+    exact = reference.vec_soln[::32]
+    milstein_err = np.max(np.abs(integrate.MilsteinHomodyneIntegrator(
+        c_op, 0.2, 0.1, H).integrate(rho_0, times, U1s).vec_soln - exact))
+    taylor_err = np.max(np.abs(integrate.Taylor_1_5_HomodyneIntegrator(
+        c_op, 0.2, 0.1, H).integrate(rho_0, times, U1s, U2s).vec_soln -
+        exact))
+    platen_1_0_err = np.max(np.abs(
+        platen_1_0.integrate(rho_0, times, U1s).vec_soln - exact))
+    platen_1_5_err = np.max(np.abs(
+        platen_1_5.integrate(rho_0, times, U1s, U2s).vec_soln - exact))
+    assert_true(platen_1_0_err < 2*milstein_err)
+    assert_true(platen_1_5_err < 2*taylor_err)
+    assert_true(platen_1_5_err < platen_1_0_err)
+    # Too little noise is an error on the generic path too.
+    assert_raises(ValueError, platen_1_0.integrate, rho_0, times, U1s[:3])
+    assert_raises(ValueError, platen_1_5.integrate_ensemble, rho_0, times,
+                  U1s[np.newaxis,:3], U2s[np.newaxis])
+
+    ensemble = platen_1_5.integrate_ensemble(rho_0, times, U1s[np.newaxis],
+                                             U2s[np.newaxis])
+    assert_almost_equal(np.max(np.abs(
+        ensemble.vec_soln[0] -
+        platen_1_5.integrate(rho_0, times, U1s, U2s).vec_soln)), 0, 12)
+
+def test_adaptive_milstein():
+    r'''Make sure the adaptive integrator reduces to fixed steps for a loose
+    tolerance and stays close to a fine-grid solution for a tight one.
+
+    '''
+    np.random.seed(1734)
+    c_op = np.array([[0, 1], [0, 0]], dtype=np.complex128)
+    H = np.zeros((2, 2), dtype=np.complex128)
+    rho_0 = np.array([[0.5, 0.5], [0.5, 0.5]])
+    times = np.linspace(0, 6, 25)
+    U1s = np.random.randn(len(times) - 1)
+    fixed = integrate.MilsteinHomodyneIntegrator(c_op, 0, 0, H)
+    loose = integrate.AdaptiveMilsteinHomodyneIntegrator(c_op, 0, 0, H,
+                                                         atol=np.inf)
+    assert_almost_equal(np.max(np.abs(
+        loose.integrate(rho_0, times, U1s).vec_soln -
+        fixed.integrate(rho_0, times, U1s).vec_soln)), 0, 12)
+    tight = integrate.AdaptiveMilsteinHomodyneIntegrator(c_op, 0, 0, H,
+                                                         atol=1e-5, rtol=0)
+    soln = tight.integrate(rho_0, times, U1s)
+    # Trace is preserved exactly and the excited population decays.
+    assert_almost_equal(np.max(np.abs(soln.vec_soln[:,-1] - 0.5)), 0, 12)
+    assert_true(soln.get_expectations(np.diag([0, 1]))[-1] < 0.05)
+
+    # Drift-dominated dynamics must be refined too, even though the Milstein
+    # correction is negligible.
+    c_op = 0.01*np.array([[0, 1], [0, 0]], dtype=np.complex128)
+    H = 10*np.diag([1, -1]).astype(np.complex128)
+    times = np.linspace(0, 1, 11)
+    U1s = np.random.randn(len(times) - 1)
+    fixed = integrate.MilsteinHomodyneIntegrator(c_op, 0, 0, H)
+    assert_true(np.max(np.abs(fixed.integrate(rho_0, times,
+                                              U1s).vec_soln[:,:3])) > 1)
+    tight = integrate.AdaptiveMilsteinHomodyneIntegrator(c_op, 0, 0, H,
+                                                         atol=1e-5, rtol=0)
+    soln = tight.integrate(rho_0, times, U1s)
+    assert_true(np.max(np.abs(soln.vec_soln[:,:3])) < 0.55)
+
+def test_drift_implicit():
+    r'''Make sure the drift-implicit integrators agree with the explicit ones
+    for small steps and stay stable for steps too large for them.
+
+    '''
+    np.random.seed(1735)
+    c_op = np.array([[0, 1], [0, 0]], dtype=np.complex128)
+    H = np.diag([1., -1.]).astype(np.complex128)
+    rho_0 = np.array([[0.5, 0.5], [0.5, 0.5]])
+    times = np.linspace(0, 1, 1001)
+    U1s = np.random.randn(len(times) - 1)
+    for ExplicitClass, ImplicitClass in [
+            (integrate.EulerHomodyneIntegrator,
+             integrate.DriftImplicitEulerHomodyneIntegrator),
+            (integrate.MilsteinHomodyneIntegrator,
+             integrate.DriftImplicitMilsteinHomodyneIntegrator)]:
+        explicit = ExplicitClass(c_op, 0, 0, H).integrate(rho_0, times, U1s)
+        implicit = ImplicitClass(c_op, 0, 0, H, theta=0.5).integrate(rho_0,
+                                                                     times,
+                                                                     U1s)
+        assert_almost_equal(np.max(np.abs(explicit.vec_soln -
+                                          implicit.vec_soln)), 0, 2)
+    # Steps of 5/omega for the Hamiltonian
+    times = np.linspace(0, 2, 201)
+    U1s = np.random.randn(len(times) - 1)
+    stiff = integrate.DriftImplicitEulerHomodyneIntegrator(c_op, 0, 0, 500*H)
+    soln = stiff.integrate(rho_0, times, U1s)
+    assert_true(np.all(np.isfinite(soln.vec_soln)))
+    assert_almost_equal(np.max(np.abs(soln.vec_soln[:,-1] - 0.5)), 0, 12)
+
+def test_exponential():
+    r'''Make sure the exponential integrators are accurate for steps too large
+    for the explicit ones, with sparse and dense superoperators.
+
+    '''
+    np.random.seed(1736)
+    c_op = np.array([[0, 1], [0, 0]], dtype=np.complex128)
+    H = 10*np.diag([1., -1.]).astype(np.complex128)
+    rho_0 = np.array([[0.5, 0.5], [0.5, 0.5]])
+    fine_times = np.linspace(0, 1, 2**14 + 1)
+    fine_U1s = np.random.randn(len(fine_times) - 1)
+    fine = integrate.MilsteinHomodyneIntegrator(c_op, 0, 0, H).integrate(
+            rho_0, fine_times, fine_U1s).vec_soln
+    times = fine_times[::64]
+    U1s = fine_U1s.reshape(-1, 64).sum(axis=1)/8
+    for IntClass in [integrate.ExponentialEulerHomodyneIntegrator,
+                     integrate.ExponentialMilsteinHomodyneIntegrator]:
+        dense = IntClass(c_op, 0, 0, H).integrate(rho_0, times, U1s).vec_soln
+        sparse = IntClass(c_op, 0, 0, H, use_sparse=True).integrate(
+                rho_0, times, U1s).vec_soln
+        assert_almost_equal(np.max(np.abs(dense - sparse)), 0, 7)
+        assert_true(np.max(np.abs(dense - fine[::64])) < 0.05)
+
+def test_iter_integrate():
+    r'''Make sure streamed blocks reassemble into the trajectory computed all
+    at once, with times and noise given as generators.
+
+    '''
+    c_op, H, rho_0, times, U1s, U2s = random_system(1801)
+    for IntClass in [integrate.EulerHomodyneIntegrator,
+                     integrate.MilsteinHomodyneIntegrator,
+                     integrate.Taylor_1_5_HomodyneIntegrator,
+                     integrate.FaultyMilsteinHomodyneIntegrator]:
+        integrator = IntClass(c_op, 0, 0, H)
+        full = integrator.integrate(rho_0, times, U1s, U2s, 3).vec_soln
+        blocks = list(integrator.iter_integrate(rho_0, (t for t in times),
+                                                iter(U1s), iter(U2s),
+                                                chunk_size=8, save_every=3))
+        assert_true(all(len(ts) <= 8 for ts, _ in blocks))
+        streamed_times = np.concatenate([ts for ts, _ in blocks])
+        streamed = np.vstack([soln.vec_soln for _, soln in blocks])
+        assert_almost_equal(np.max(np.abs(streamed_times - times[::3])), 0, 12)
+        assert_almost_equal(np.max(np.abs(streamed - full)), 0, 12)
+        if hasattr(integrator, 'integrate_measurements'):
+            dMs = np.random.randn(len(times) - 1)*0.1
+            full = integrator.integrate_measurements(rho_0, times,
+                                                     dMs).vec_soln
+            streamed = np.vstack([soln.vec_soln for _, soln in
+                                  integrator.iter_integrate_measurements(
+                                      rho_0, times, iter(dMs), chunk_size=8)])
+            assert_almost_equal(np.max(np.abs(streamed - full)), 0, 12)
+
+def test_integrate_observables():
+    r'''Make sure recording expectation values while stepping agrees with
+    computing them from the stored trajectory.
+
+    '''
+    c_op, H, rho_0, times, U1s, _ = random_system(1802)
+    observables = np.array([H, c_op + c_op.conj().T, np.eye(3)])
+    integrator = integrate.MilsteinHomodyneIntegrator(c_op, 0, 0, H)
+    soln = integrator.integrate(rho_0, times, U1s, save_every=2)
+    record = integrator.integrate_observables(rho_0, times, observables, U1s,
+                                              purity=True, chunk_size=8,
+                                              save_every=2)
+    assert_almost_equal(np.max(np.abs(record.times - times[::2])), 0, 12)
+    for k, observable in enumerate(observables):
+        assert_almost_equal(np.max(np.abs(record.expectations[:,k] -
+                                          soln.get_expectations(observable))),
+                            0, 12)
+    assert_almost_equal(np.max(np.abs(record.purities -
+                                      soln.get_purities())), 0, 12)
+    assert_almost_equal(np.max(np.abs(record.get_final_density_matrix() -
+                                      soln.get_density_matrices()[-1])), 0, 12)
+
+    dMs = np.random.randn(len(times) - 1)*0.1
+    soln = integrator.integrate_measurements(rho_0, times, dMs)
+    record = integrator.integrate_measurements_observables(rho_0, times, dMs,
+                                                           observables[:1])
+    assert_true(record.purities is None)
+    assert_almost_equal(np.max(np.abs(record.expectations[:,0] -
+                                      soln.get_expectations(H))), 0, 12)
+
+    taylor = integrate.Taylor_1_5_HomodyneIntegrator(c_op, 0, 0, H)
+    assert_raises(NotImplementedError,
+                  taylor.integrate_measurements_observables, rho_0, times,
+                  dMs, observables)
+    rho_0_vec = sb.vectorize(rho_0, integrator.basis).real
+    empty = integrate._record_expectations(iter([]), observables, True,
+                                           integrator.basis, rho_0_vec)
+    assert_equal(empty.expectations.shape, (0, len(observables)))
+    assert_almost_equal(np.max(np.abs(empty.final_vec - rho_0_vec)), 0, 12)
+
+def test_integrate_ensemble():
+    r'''Make sure integrating a block of trajectories agrees with integrating
+    them one at a time.
+
+    '''
+    c_op, H, rho_0, times, U1s, U2s = random_system(1887, dim=2, n_times=51,
+                                                    n_traj=4)
+    for IntClass in [integrate.EulerHomodyneIntegrator,
+                     integrate.MilsteinHomodyneIntegrator,
+                     integrate.Taylor_1_5_HomodyneIntegrator,
+                     integrate.FaultyMilsteinHomodyneIntegrator]:
+        for use_sparse in [False, True]:
+            integrator = IntClass(c_op, 0.1, 0.2, H, use_sparse=use_sparse)
+            ensemble = integrator.integrate_ensemble(rho_0, times, U1s, U2s,
+                                                     save_every=5)
+            for n in range(len(U1s)):
+                single = integrator.integrate(rho_0, times, U1s[n], U2s[n],
+                                              5)
+                assert_almost_equal(np.max(np.abs(ensemble.vec_soln[n] -
+                                                  single.vec_soln)), 0, 12)
+
+def test_sparse_integrators():
+    r'''Make sure integrators using sparse superoperators produce the same
+    trajectories as those using dense superoperators.
+
+    '''
+    d = 5
+    a = np.diag(np.sqrt(np.arange(1, d)), 1).astype(np.complex128)
+    H = np.diag(np.arange(d)).astype(np.complex128)
+    rho_0 = np.zeros((d, d), dtype=np.complex128)
+    rho_0[1,1] = 1
+    times = np.linspace(0, 1, 33)
+    np.random.seed(31415)
+    U1s = np.random.randn(len(times) - 1)
+    U2s = np.random.randn(len(times) - 1)
+    for IntClass in [integrate.EulerHomodyneIntegrator,
+                     integrate.MilsteinHomodyneIntegrator,
+                     integrate.Taylor_1_5_HomodyneIntegrator]:
+        dense_integrator = IntClass(a, 0.1, 0.2, H)
+        sparse_integrator = IntClass(a, 0.1, 0.2, H, use_sparse=True)
+        dense_soln = dense_integrator.integrate(rho_0, times, U1s, U2s)
+        sparse_soln = sparse_integrator.integrate(rho_0, times, U1s, U2s)
+        assert_almost_equal(np.max(np.abs(dense_soln.vec_soln -
+                                          sparse_soln.vec_soln)), 0, 7)
+
+def test_affine_model():
+    r'''Make sure integrators made from an affine model have the same
+    superoperators as integrators constructed directly.
+
+    '''
+    np.random.seed(1123)
+    d = 3
+    c_op = np.random.randn(d, d) + 1.j*np.random.randn(d, d)
+    H_ops = [np.random.randn(d, d) + 1.j*np.random.randn(d, d)
+             for n in range(3)]
+    H_ops = [H + H.conj().T for H in H_ops]
+    params = [0.7, -1.3, 2.5]
+    H = H_ops[0] + params[0]*H_ops[1] + params[1]*H_ops[2]
+    direct = integrate.Taylor_1_5_HomodyneIntegrator(np.sqrt(params[2])*c_op,
+                                                     0.2, 0.3, H)
+    for partial_basis in [None, basis(d)]:
+        model = sb.AffineModel(c_op, 0.2, 0.3, H_ops[0], H_ops[1:],
+                               basis=partial_basis, rate_param=True,
+                               order=1.5)
+        factory = integrate.IntegratorFactory(
+                integrate.Taylor_1_5_HomodyneIntegrator, model,
+                sb.affine_parameter_fn)
+        from_model = factory.make_integrator(params)
+        for attr in ['Q', 'G', 'k_T', 'k_T_G', 'G2', 'G3', 'Q2', 'QG', 'GQ',
+                     'k_T_G2', 'k_T_Q']:
+            diff = getattr(direct, attr) - getattr(from_model, attr)
+            scale = np.max(np.abs(getattr(direct, attr)))
+            assert_almost_equal(np.max(np.abs(diff))/scale, 0, 7)
+
+def test_op_cache():
+    r'''Make sure superoperator construction is memoized by the contents of
+    its arguments, with LRU eviction and a shared on-disk tier.
+
+    '''
+    c_op = np.array([[0, 1], [0, 0]], dtype=np.complex128)
+    H = np.array([[1, 0], [0, -1]], dtype=np.complex128)
+    old_cache_state = sb.op_cache.maxsize, sb.op_cache.cache_dir
+    try:
+        sb.op_cache.maxsize = 1
+        sb.op_cache.cache_dir = None
+        sb.op_cache.clear()
+        sb.op_cache.reset_stats()
+        Q = sb.construct_Q(c_op, 0, 0, H, basis(2)[:-1])
+        Q_again = sb.construct_Q(c_op.copy(), 0, 0, H.copy(), basis(2)[:-1])
+        assert_true(Q is Q_again)
+        assert_true(not Q.flags.writeable)
+        assert_equal(sb.op_cache.stats()['hits'], 1)
+        assert_equal(sb.op_cache.stats()['misses'], 1)
+        # Keyword arguments, defaults, and equal floats share the entry.
+        assert_true(sb.construct_Q(c_op, 0., 0j, H=H,
+                                   partial_basis=basis(2)[:-1],
+                                   use_sparse=False) is Q)
+        assert_equal(sb.op_cache.stats()['hits'], 2)
+        sb.construct_Q(c_op, 0, 0, 2*H, basis(2)[:-1])
+        assert_equal(sb.op_cache.stats()['evictions'], 1)
+
+        # Results are frozen without copying, but arguments the caller still
+        # owns are left writeable.
+        partial_basis = [np.array(op) for op in basis(2)[:-1]]
+        setup = sb.op_calc_setup(c_op, 0, 0, H, partial_basis)
+        assert_true(all(op.flags.writeable for op in partial_basis))
+        assert_true(not setup['basis'][0].flags.writeable)
+        computed = np.arange(4.)
+        assert_true(cache.LRUCache().put('computed', computed) is computed)
+        assert_true(not computed.flags.writeable)
+        small = cache.LRUCache(maxsize=4, max_bytes=40)
+        small.put('a', np.zeros(4))
+        small.put('b', np.zeros(4))
+        assert_equal(small.stats()['size'], 1)
+        assert_equal(small.stats()['nbytes'], 32)
+
+        # Sparse results are frozen too, so they can't be zeroed in place.
+        Q_sparse = sb.construct_Q(c_op, 0, 0, H, basis(2)[:-1],
+                                  use_sparse=True)
+        assert_raises(ValueError, Q_sparse.data.__setitem__, slice(None), 0)
+        check_mat_eq(sb.construct_Q(c_op, 0, 0, H, basis(2)[:-1],
+                                    use_sparse=True).toarray(), Q)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            writer = cache.LRUCache(maxsize=4, cache_dir=cache_dir)
+            reader = cache.LRUCache(maxsize=4, cache_dir=cache_dir)
+            key = cache.content_key('construct_Q', c_op, H)
+            writer.put(key, Q)
+            found, loaded = reader.get(key)
+            assert_true(found)
+            assert_equal(reader.stats()['disk_hits'], 1)
+            check_mat_eq(loaded, Q)
+            # Entries are plain .npz files, loaded without unpickling.
+            setup = sb.op_calc_setup(c_op, 0.5j, 0.1, H, basis(2)[:-1])
+            writer.put('setup', setup)
+            writer.put('sparse', Q_sparse)
+            assert_equal(cache.content_key(reader.get('setup')[1]),
+                         cache.content_key(setup))
+            check_mat_eq(reader.get('sparse')[1].toarray(), Q)
+            assert_true(all(name.endswith('.npz')
+                            for name in os.listdir(cache_dir)))
+
+            def fail(f):
+                raise RuntimeError('disk full')
+            assert_raises(RuntimeError, cache.atomic_write,
+                          os.path.join(cache_dir, 'entry.npz'), fail)
+            assert_equal(len(os.listdir(cache_dir)), 3)
+    finally:
+        sb.op_cache.maxsize, sb.op_cache.cache_dir = old_cache_state
+        sb.op_cache.clear()